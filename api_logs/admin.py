@@ -1,11 +1,84 @@
 from django.contrib import admin
+from django.db.models import Q
 from unfold.admin import ModelAdmin
 
 from .models import APIRequestLog
+from .models import APIRequestRollup
+from .pagination import EstimatedCountPaginator
+from .pagination import KeysetChangeList
+from .rollups import percentile
+
+
+class MethodFilter(admin.SimpleListFilter):
+    """HTTP method filter with fixed choices instead of a DISTINCT scan."""
+
+    title = "method"
+    parameter_name = "method"
+
+    METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+    def lookups(self, request, model_admin):
+        return [(method, method) for method in self.METHODS]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(method=self.value())
+        return queryset
+
+
+class ResponseStatusCodeFilter(admin.SimpleListFilter):
+    """Status code classes as ranges on the indexed ``response_status_code``."""
+
+    title = "response status code"
+    parameter_name = "response_status"
+
+    RANGES = {
+        "2xx": (200, 300),
+        "3xx": (300, 400),
+        "4xx": (400, 500),
+        "429": (429, 430),
+        "5xx": (500, 600),
+    }
+
+    def lookups(self, request, model_admin):
+        return [
+            ("2xx", "2xx Success"),
+            ("3xx", "3xx Redirect"),
+            ("4xx", "4xx Client error"),
+            ("429", "429 Too many requests"),
+            ("5xx", "5xx Server error"),
+            ("none", "No response"),
+        ]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == "none":
+            return queryset.filter(response_status_code__isnull=True)
+        if value in self.RANGES:
+            low, high = self.RANGES[value]
+            return queryset.filter(
+                Q(response_status_code__gte=low) & Q(response_status_code__lt=high),
+            )
+        return queryset
 
 
 @admin.register(APIRequestLog)
 class APIRequestLogAdmin(ModelAdmin):
+    # The table holds millions of rows: counts are estimated, filters have
+    # fixed choices, large columns are not loaded for the list and deep pages
+    # are reached with a keyset cursor ("Older entries") instead of OFFSET
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_after_template = "admin/api_logs/apirequestlog/keyset_pagination.html"
+    list_deferred_fields = [
+        "request_headers",
+        "request_params",
+        "request_body",
+        "response_headers",
+        "response_body",
+        "error_message",
+    ]
+
     list_display = [
         "method",
         "url",
@@ -14,10 +87,10 @@ class APIRequestLogAdmin(ModelAdmin):
         "duration_ms",
         "created_at",
     ]
-    list_filter = ["status", "method", "response_status_code", "created_at"]
+    list_filter = ["status", MethodFilter, ResponseStatusCodeFilter, "created_at"]
     search_fields = ["url", "error_message"]
     readonly_fields = ["created_at", "updated_at"]
-    ordering = ["-created_at"]
+    ordering = ["-created_at", "-id"]
 
     fieldsets = [
         (
@@ -51,6 +124,17 @@ class APIRequestLogAdmin(ModelAdmin):
         ),
     ]
 
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith(
+            "_changelist",
+        ):
+            queryset = queryset.defer(*self.list_deferred_fields)
+        return queryset
+
     def has_add_permission(self, request):
         return False
 
@@ -59,3 +143,58 @@ class APIRequestLogAdmin(ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(APIRequestRollup)
+class APIRequestRollupAdmin(ModelAdmin):
+    list_display = [
+        "bucket_start",
+        "granularity",
+        "endpoint",
+        "requests_display",
+        "errors_display",
+        "error_rate_display",
+        "p50_display",
+        "p95_display",
+        "p99_display",
+        "duration_max_ms",
+    ]
+    list_filter = ["granularity", "endpoint", "bucket_start"]
+    search_fields = ["endpoint"]
+    ordering = ["-bucket_start", "endpoint"]
+    date_hierarchy = "bucket_start"
+
+    # Counts are estimates weighted by the sample rate, see APIRequestRollup
+    @admin.display(description="Requests", ordering="requests")
+    def requests_display(self, obj):
+        return f"{obj.requests:.0f}"
+
+    @admin.display(description="Errors", ordering="errors")
+    def errors_display(self, obj):
+        return f"{obj.errors:.0f}"
+
+    @admin.display(description="Error rate")
+    def error_rate_display(self, obj):
+        return f"{obj.error_rate:.1%}"
+
+    def _percentile(self, obj, q):
+        value = percentile(obj.duration_histogram, q, obj.duration_max_ms)
+        return "-" if value is None else f"{value:.0f} ms"
+
+    @admin.display(description="p50")
+    def p50_display(self, obj):
+        return self._percentile(obj, 0.5)
+
+    @admin.display(description="p95")
+    def p95_display(self, obj):
+        return self._percentile(obj, 0.95)
+
+    @admin.display(description="p99")
+    def p99_display(self, obj):
+        return self._percentile(obj, 0.99)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
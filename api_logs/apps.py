@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ApiLogsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api_logs"
+
+    def ready(self):
+        import api_logs.signals  # noqa: F401, PLC0415
@@ -0,0 +1,330 @@
+"""Archive of old API request logs as zstd-compressed NDJSON segments.
+
+Rows older than a cutoff are streamed, in primary-key order, into segment
+files in the default storage (one JSON object per line, zstd compressed).
+Each segment gets a ``.manifest.json`` next to it with its row count, id and
+time range and the SHA-256 of the compressed file. Rows are deleted only
+after the stored segment was read back and matched its manifest.
+
+Layout::
+
+    <API_LOG_ARCHIVE_PREFIX>/<YYYY>/<MM>/<first id>-<last id>.ndjson.zst
+    <API_LOG_ARCHIVE_PREFIX>/<YYYY>/<MM>/<first id>-<last id>.manifest.json
+"""
+
+import hashlib
+import json
+import logging
+import tempfile
+from collections.abc import Iterator
+from dataclasses import asdict
+from dataclasses import dataclass
+from datetime import datetime
+
+import zstandard
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import APIRequestLog
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+SEGMENT_SUFFIX = ".ndjson.zst"
+MANIFEST_SUFFIX = ".manifest.json"
+READ_CHUNK_SIZE = 1024 * 1024
+# Segments are compressed in memory up to this size, then spooled to disk
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+
+FIELDS = [field.attname for field in APIRequestLog._meta.concrete_fields]  # noqa: SLF001
+
+
+class ArchiveVerificationError(Exception):
+    """Raised when a stored segment does not match what was written."""
+
+
+@dataclass
+class Manifest:
+    segment: str
+    format_version: int
+    fields: list[str]
+    row_count: int
+    min_id: int
+    max_id: int
+    min_created_at: str
+    max_created_at: str
+    uncompressed_bytes: int
+    compressed_bytes: int
+    sha256: str
+    archived_at: str
+
+    @property
+    def name(self) -> str:
+        return self.segment.removesuffix(SEGMENT_SUFFIX) + MANIFEST_SUFFIX
+
+
+def _json_default(value):
+    # Full precision, unlike DjangoJSONEncoder which drops the microseconds
+    if isinstance(value, datetime):
+        return value.isoformat()
+    msg = f"Object of type {type(value).__name__} is not JSON serializable"
+    raise TypeError(msg)
+
+
+def _segment_name(prefix: str, first_created_at: datetime, min_id: int, max_id: int):
+    return (
+        f"{prefix}/{first_created_at:%Y/%m}/{min_id:012d}-{max_id:012d}{SEGMENT_SUFFIX}"
+    )
+
+
+def _hash_file(file) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := file.read(READ_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _write_segment(rows: Iterator[dict], tmp) -> dict | None:
+    """Compress ``rows`` as NDJSON into ``tmp``; return stats, or None if empty."""
+    stats = None
+    compressor = zstandard.ZstdCompressor(level=settings.API_LOG_ARCHIVE_ZSTD_LEVEL)
+    with compressor.stream_writer(tmp, closefd=False) as writer:
+        for row in rows:
+            line = json.dumps(row, default=_json_default).encode() + b"\n"
+            writer.write(line)
+            if stats is None:
+                stats = {
+                    "pks": [],
+                    "uncompressed_bytes": 0,
+                    "min_created_at": row["created_at"],
+                    "max_created_at": row["created_at"],
+                }
+            stats["pks"].append(row["id"])
+            stats["uncompressed_bytes"] += len(line)
+            stats["min_created_at"] = min(stats["min_created_at"], row["created_at"])
+            stats["max_created_at"] = max(stats["max_created_at"], row["created_at"])
+    return stats
+
+
+def verify_segment(manifest: Manifest, storage=None) -> None:
+    """Read a stored segment back and check it against its manifest.
+
+    Raises:
+        ArchiveVerificationError: If the hash, size or row count differ
+    """
+    storage = storage or default_storage
+    digest = hashlib.sha256()
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    compressed_bytes = 0
+    rows = 0
+    try:
+        with storage.open(manifest.segment, "rb") as segment:
+            while chunk := segment.read(READ_CHUNK_SIZE):
+                digest.update(chunk)
+                compressed_bytes += len(chunk)
+                rows += decompressor.decompress(chunk).count(b"\n")
+    except zstandard.ZstdError as e:
+        msg = f"Segment {manifest.segment} cannot be decompressed: {e}"
+        raise ArchiveVerificationError(msg) from e
+
+    if (
+        digest.hexdigest() != manifest.sha256
+        or compressed_bytes != manifest.compressed_bytes
+        or rows != manifest.row_count
+    ):
+        msg = (
+            f"Segment {manifest.segment} does not match its manifest "
+            f"({rows} rows, {compressed_bytes} bytes)"
+        )
+        raise ArchiveVerificationError(msg)
+
+
+def _delete_rows(pks: list[int], chunk_size: int) -> int:
+    deleted = 0
+    for start in range(0, len(pks), chunk_size):
+        count, _ = APIRequestLog.objects.filter(
+            pk__in=pks[start : start + chunk_size],
+        ).delete()
+        deleted += count
+    return deleted
+
+
+def archive_segment(
+    cutoff: datetime,
+    *,
+    after_pk: int = 0,
+    segment_rows: int,
+    storage=None,
+    delete: bool = True,
+) -> Manifest | None:
+    """Archive the next ``segment_rows`` logs created before ``cutoff``.
+
+    Rows are read with a server-side cursor (``iterator``), so memory use
+    does not depend on the segment size beyond the list of archived ids.
+
+    Returns:
+        The manifest of the written segment, or None when nothing is left
+    """
+    storage = storage or default_storage
+    rows = (
+        APIRequestLog.objects.filter(created_at__lt=cutoff, pk__gt=after_pk)
+        .order_by("pk")
+        .values(*FIELDS)[:segment_rows]
+        .iterator(chunk_size=settings.API_LOG_ARCHIVE_CHUNK_SIZE)
+    )
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as tmp:
+        stats = _write_segment(rows, tmp)
+        if stats is None:
+            return None
+
+        tmp.seek(0)
+        sha256, compressed_bytes = _hash_file(tmp)
+        tmp.seek(0)
+        pks = stats["pks"]
+        name = _segment_name(
+            settings.API_LOG_ARCHIVE_PREFIX,
+            stats["min_created_at"],
+            pks[0],
+            pks[-1],
+        )
+        name = storage.save(name, File(tmp, name=name))
+
+    manifest = Manifest(
+        segment=name,
+        format_version=FORMAT_VERSION,
+        fields=FIELDS,
+        row_count=len(pks),
+        min_id=pks[0],
+        max_id=pks[-1],
+        min_created_at=stats["min_created_at"].isoformat(),
+        max_created_at=stats["max_created_at"].isoformat(),
+        uncompressed_bytes=stats["uncompressed_bytes"],
+        compressed_bytes=compressed_bytes,
+        sha256=sha256,
+        archived_at=timezone.now().isoformat(),
+    )
+    verify_segment(manifest, storage)
+    storage.save(manifest.name, ContentFile(json.dumps(asdict(manifest), indent=2)))
+
+    if delete:
+        _delete_rows(pks, settings.API_LOG_PURGE_CHUNK_SIZE)
+    logger.info("Archived %d API logs to %s", manifest.row_count, name)
+    return manifest
+
+
+def archive_logs(
+    cutoff: datetime,
+    *,
+    segment_rows: int | None = None,
+    max_segments: int | None = None,
+    storage=None,
+    delete: bool = True,
+) -> list[Manifest]:
+    """Archive logs created before ``cutoff`` segment by segment.
+
+    Stops after ``max_segments`` segments (None for no limit); the next run
+    carries on with the remaining rows.
+    """
+    segment_rows = segment_rows or settings.API_LOG_ARCHIVE_SEGMENT_ROWS
+    manifests: list[Manifest] = []
+    after_pk = 0
+    while max_segments is None or len(manifests) < max_segments:
+        manifest = archive_segment(
+            cutoff,
+            after_pk=after_pk,
+            segment_rows=segment_rows,
+            storage=storage,
+            delete=delete,
+        )
+        if manifest is None:
+            break
+        manifests.append(manifest)
+        after_pk = manifest.max_id
+    return manifests
+
+
+def list_manifests(prefix: str | None = None, storage=None) -> list[Manifest]:
+    """Return the manifests of every archived segment under ``prefix``."""
+    storage = storage or default_storage
+    prefix = prefix or settings.API_LOG_ARCHIVE_PREFIX
+
+    manifests = []
+    pending = [prefix]
+    while pending:
+        directory = pending.pop()
+        try:
+            directories, files = storage.listdir(directory)
+        except FileNotFoundError:
+            continue
+        pending.extend(f"{directory}/{name}" for name in directories)
+        for name in files:
+            if name.endswith(MANIFEST_SUFFIX):
+                with storage.open(f"{directory}/{name}", "rb") as f:
+                    manifests.append(Manifest(**json.load(f)))
+    return sorted(manifests, key=lambda manifest: manifest.min_id)
+
+
+def oldest_unarchived_log(prefix: str | None = None, storage=None) -> datetime | None:
+    """Return when the oldest log not archived yet was created, if any is left.
+
+    Logs are archived in primary-key order, so every log above the highest
+    archived id counts as not archived.
+    """
+    archived_max_id = max(
+        (manifest.max_id for manifest in list_manifests(prefix, storage)),
+        default=0,
+    )
+    return APIRequestLog.objects.filter(pk__gt=archived_max_id).aggregate(
+        oldest=Min("created_at"),
+    )["oldest"]
+
+
+def read_segment(manifest: Manifest, storage=None) -> Iterator[dict]:
+    """Yield the rows of a segment, with timestamps parsed back to datetimes."""
+    storage = storage or default_storage
+    with storage.open(manifest.segment, "rb") as segment:
+        reader = zstandard.ZstdDecompressor().stream_reader(segment)
+        buffer = b""
+        while chunk := reader.read(READ_CHUNK_SIZE):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                row = json.loads(line)
+                for name in ("created_at", "updated_at"):
+                    if row.get(name):
+                        row[name] = parse_datetime(row[name])
+                yield row
+
+
+def read_archived_logs(
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    prefix: str | None = None,
+    storage=None,
+) -> Iterator[dict]:
+    """Yield archived rows created in ``[since, until)``, oldest segments first.
+
+    Segments entirely outside the range are skipped using their manifests.
+    """
+    for manifest in list_manifests(prefix, storage):
+        newest = parse_datetime(manifest.max_created_at)
+        oldest = parse_datetime(manifest.min_created_at)
+        if since and newest and newest < since:
+            continue
+        if until and oldest and oldest >= until:
+            continue
+        for row in read_segment(manifest, storage):
+            if since and row["created_at"] < since:
+                continue
+            if until and row["created_at"] >= until:
+                continue
+            yield row
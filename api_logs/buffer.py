@@ -0,0 +1,277 @@
+"""Buffered, batched writes of ``APIRequestLog`` rows.
+
+When ``API_LOG_BUFFER`` is set, finished request logs are collected instead of
+being saved one by one, and written with ``bulk_create`` once
+``API_LOG_BUFFER_BATCH_SIZE`` logs are waiting or every
+``API_LOG_BUFFER_FLUSH_INTERVAL`` seconds. Buffers are flushed when the
+process exits and when a Celery worker shuts down.
+
+- ``memory``: logs are kept in the process until flushed
+- ``redis``: logs are appended to a Redis stream shared by all processes and
+  written by whichever process flushes next, so a crashed process does not
+  lose what it logged
+"""
+
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.db import close_old_connections
+from django.utils.dateparse import parse_datetime
+
+from .models import APIRequestLog
+
+logger = logging.getLogger(__name__)
+
+BUFFER_MEMORY = "memory"
+BUFFER_REDIS = "redis"
+
+STREAM_KEY = "api_logs:buffer"
+STREAM_GROUP = "api_logs:writers"
+# Entries read by a writer that died before acknowledging them are taken over
+# after this many milliseconds
+STREAM_CLAIM_IDLE_MS = 60_000
+
+_FIELDS = [
+    field.attname
+    for field in APIRequestLog._meta.concrete_fields  # noqa: SLF001
+    if not field.primary_key
+]
+
+
+def serialize_log(api_log: APIRequestLog) -> str:
+    data = {}
+    for name in _FIELDS:
+        value = getattr(api_log, name)
+        data[name] = value.isoformat() if isinstance(value, datetime) else value
+    return json.dumps(data)
+
+
+def deserialize_log(payload: str | bytes) -> APIRequestLog:
+    data = json.loads(payload)
+    for name in ("created_at", "updated_at"):
+        if data.get(name):
+            data[name] = parse_datetime(data[name])
+    return APIRequestLog(**{name: data[name] for name in _FIELDS if name in data})
+
+
+class MemoryLogBuffer:
+    """Keeps logs in the current process until they are flushed."""
+
+    def __init__(self, batch_size: int, max_size: int):
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._logs: list[APIRequestLog] = []
+
+    def __len__(self):
+        return len(self._logs)
+
+    def add(self, api_log: APIRequestLog) -> None:
+        with self._lock:
+            self._logs.append(api_log)
+            full = len(self._logs) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every buffered log, returning the number written."""
+        with self._flush_lock:
+            with self._lock:
+                logs, self._logs = self._logs, []
+            if not logs:
+                return 0
+
+            try:
+                APIRequestLog.objects.bulk_create(logs, batch_size=self.batch_size)
+            except DatabaseError:
+                logger.exception("Failed to write %d buffered API logs", len(logs))
+                with self._lock:
+                    # Keep them for the next flush, dropping the oldest if full
+                    self._logs = (logs + self._logs)[-self.max_size :]
+                return 0
+            return len(logs)
+
+
+class RedisStreamLogBuffer:
+    """Appends logs to a Redis stream; any process may write them out.
+
+    Writers read through a consumer group, so each entry is written by one
+    process and only acknowledged after ``bulk_create`` succeeded.
+    """
+
+    def __init__(self, batch_size: int, max_size: int):
+        from django_redis import get_redis_connection  # noqa: PLC0415
+
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.consumer = f"{socket.gethostname()}:{os.getpid()}"
+        self._client = get_redis_connection("default")
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._added = 0
+        self._group_ready = False
+
+    def __len__(self):
+        return self._client.xlen(STREAM_KEY)
+
+    def add(self, api_log: APIRequestLog) -> None:
+        self._client.xadd(
+            STREAM_KEY,
+            {"log": serialize_log(api_log)},
+            maxlen=self.max_size,
+            approximate=True,
+        )
+        with self._lock:
+            self._added += 1
+            full = self._added >= self.batch_size
+        if full:
+            self.flush()
+
+    def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            self._client.xgroup_create(STREAM_KEY, STREAM_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def _write(self, entries) -> int:
+        if not entries:
+            return 0
+        ids = [entry_id for entry_id, _ in entries]
+        logs = [deserialize_log(fields[b"log"]) for _, fields in entries]
+        APIRequestLog.objects.bulk_create(logs, batch_size=self.batch_size)
+        self._client.xack(STREAM_KEY, STREAM_GROUP, *ids)
+        self._client.xdel(STREAM_KEY, *ids)
+        return len(logs)
+
+    def flush(self) -> int:
+        """Write every log waiting in the stream, returning the number written."""
+        with self._flush_lock:
+            with self._lock:
+                self._added = 0
+            self._ensure_group()
+
+            written = 0
+            try:
+                # Take over entries a dead writer read but never acknowledged
+                _, claimed, *_ = self._client.xautoclaim(
+                    STREAM_KEY,
+                    STREAM_GROUP,
+                    self.consumer,
+                    min_idle_time=STREAM_CLAIM_IDLE_MS,
+                    count=self.batch_size,
+                )
+                written += self._write(claimed)
+
+                while True:
+                    response = self._client.xreadgroup(
+                        STREAM_GROUP,
+                        self.consumer,
+                        {STREAM_KEY: ">"},
+                        count=self.batch_size,
+                    )
+                    entries = response[0][1] if response else []
+                    if not entries:
+                        break
+                    written += self._write(entries)
+            except DatabaseError:
+                # Unacknowledged entries are retried by the next flush
+                logger.exception("Failed to write buffered API logs")
+            return written
+
+
+class _Flusher(threading.Thread):
+    """Flushes a buffer every ``interval`` seconds."""
+
+    def __init__(self, buffer, interval: float):
+        super().__init__(name="api-log-flusher", daemon=True)
+        self.buffer = buffer
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                close_old_connections()
+                self.buffer.flush()
+            except Exception:
+                logger.exception("Periodic API log flush failed")
+
+
+_buffer: MemoryLogBuffer | RedisStreamLogBuffer | None = None
+_flusher = None
+_buffer_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # A forked child must not write (again) the logs its parent buffered
+    global _buffer, _flusher, _buffer_lock  # noqa: PLW0603
+    _buffer = None
+    _flusher = None
+    _buffer_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_log_buffer():
+    """Return the process-wide log buffer, or None when buffering is off."""
+    global _buffer, _flusher  # noqa: PLW0603
+    mode = settings.API_LOG_BUFFER
+    if not mode:
+        return None
+
+    with _buffer_lock:
+        if _buffer is None:
+            buffer_class: type[MemoryLogBuffer | RedisStreamLogBuffer]
+            if mode == BUFFER_MEMORY:
+                buffer_class = MemoryLogBuffer
+            elif mode == BUFFER_REDIS:
+                buffer_class = RedisStreamLogBuffer
+            else:
+                msg = f"Unknown API_LOG_BUFFER mode: {mode}"
+                raise ImproperlyConfigured(msg)
+
+            _buffer = buffer_class(
+                batch_size=settings.API_LOG_BUFFER_BATCH_SIZE,
+                max_size=settings.API_LOG_BUFFER_MAX_SIZE,
+            )
+            if settings.API_LOG_BUFFER_FLUSH_INTERVAL > 0:
+                _flusher = _Flusher(_buffer, settings.API_LOG_BUFFER_FLUSH_INTERVAL)
+                _flusher.start()
+        return _buffer
+
+
+def flush_log_buffer() -> int:
+    """Write out everything buffered by this process, if buffering is in use."""
+    buffer = _buffer
+    if buffer is None:
+        return 0
+    written = buffer.flush()
+    if written:
+        logger.info("Flushed %d buffered API logs", written)
+    return written
+
+
+def save_log(api_log: APIRequestLog) -> None:
+    """Persist a finished request log, through the buffer when enabled."""
+    buffer = get_log_buffer()
+    if buffer is None:
+        api_log.save()
+    else:
+        buffer.add(api_log)
+
+
+atexit.register(flush_log_buffer)
@@ -0,0 +1,476 @@
+"""Local stand-in for the Core API.
+
+Serves the ``/api/v1/instagram/web_app/*`` endpoints used by
+``core.utils.instagram_api`` from an in-process HTTP server, so the refresh
+pipeline can be load tested and exercised end to end without spending real
+Core API quota. Response bodies are replayed from recorded ``APIRequestLog``
+rows or produced by a synthetic generator, and a :class:`FaultProfile` adds
+latency, server errors and bursts of 429 responses.
+
+Run it with ``manage.py fake_core_api`` or use the ``fake_core_api`` pytest
+fixture.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+from .models import APIRequestLog
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT_PREFIX = "/api/v1/instagram/web_app/"
+HEALTH_CHECK_PATH = "/api/v1/health/check"
+MEDIA_PREFIX = "/media/"
+
+# Query parameter identifying the requested account, per endpoint
+ENDPOINT_PARAMS = {
+    "fetch_user_info_by_username_v2": "username",
+    "fetch_user_info_by_user_id": "user_id",
+    "fetch_user_stories_by_username": "username",
+}
+
+LATENCY_FIXED = "fixed"
+LATENCY_UNIFORM = "uniform"
+LATENCY_LOGNORMAL = "lognormal"
+LATENCY_DISTRIBUTIONS = (LATENCY_FIXED, LATENCY_UNIFORM, LATENCY_LOGNORMAL)
+
+SERVER_ERROR_STATUSES = (
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+
+
+@dataclass
+class FaultProfile:
+    """Latency and failure behaviour of the fake server.
+
+    Attributes:
+        latency_ms: Fixed latency, or the median for the random distributions
+        latency_distribution: ``fixed``, ``uniform`` or ``lognormal``
+        latency_jitter_ms: Half-width of the ``uniform`` distribution
+        latency_sigma: Shape of the ``lognormal`` distribution (long tail)
+        error_rate: Fraction of API requests answered with a 502/503/504
+        burst_every: Length of a rate-limit cycle in requests (0 disables 429s)
+        burst_length: Requests at the end of each cycle answered with a 429
+        retry_after: ``Retry-After`` seconds sent with 429 responses
+        seed: Seed for reproducible latency and error sequences
+    """
+
+    latency_ms: float = 0.0
+    latency_distribution: str = LATENCY_FIXED
+    latency_jitter_ms: float = 0.0
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    burst_every: int = 0
+    burst_length: int = 0
+    retry_after: float = 1.0
+    seed: int | None = None
+
+    def __post_init__(self):
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            msg = f"Unknown latency distribution: {self.latency_distribution}"
+            raise ValueError(msg)
+
+    def latency(self, rng: random.Random) -> float:
+        """Draw the latency of one response, in seconds."""
+        if self.latency_distribution == LATENCY_UNIFORM:
+            latency_ms = rng.uniform(
+                self.latency_ms - self.latency_jitter_ms,
+                self.latency_ms + self.latency_jitter_ms,
+            )
+        elif self.latency_distribution == LATENCY_LOGNORMAL and self.latency_ms > 0:
+            latency_ms = self.latency_ms * rng.lognormvariate(0, self.latency_sigma)
+        else:
+            latency_ms = self.latency_ms
+        return max(latency_ms, 0) / 1000
+
+    def is_rate_limited(self, request_number: int) -> bool:
+        """Whether the ``request_number``-th API request (1-based) gets a 429."""
+        if self.burst_every <= 0 or self.burst_length <= 0:
+            return False
+        position = (request_number - 1) % self.burst_every
+        return position >= self.burst_every - self.burst_length
+
+
+class SyntheticResponses:
+    """Generates plausible responses, stable for a given account.
+
+    Picture and story URLs point back at the fake server so media downloads
+    stay local too.
+    """
+
+    def __init__(self, max_stories: int = 5):
+        self.max_stories = max_stories
+
+    def _rng(self, *parts: str) -> random.Random:
+        digest = hashlib.sha256(":".join(parts).encode()).hexdigest()
+        return random.Random(int(digest[:16], 16))  # noqa: S311
+
+    def get(self, endpoint_name: str, value: str, base_url: str) -> dict | None:
+        if endpoint_name == "fetch_user_info_by_username_v2":
+            return self._profile_v2(value, base_url)
+        if endpoint_name == "fetch_user_info_by_user_id":
+            return self._profile_by_id(value, base_url)
+        if endpoint_name == "fetch_user_stories_by_username":
+            return self._stories(value, base_url)
+        return None
+
+    def _account(self, key: str) -> dict[str, Any]:
+        rng = self._rng("account", key)
+        return {
+            "pk": str(rng.randint(10**9, 10**11)),
+            "full_name": f"Fake {key.title()}",
+            "biography": f"Synthetic profile for {key}",
+            "is_private": rng.random() < 0.1,  # noqa: PLR2004
+            "is_verified": rng.random() < 0.05,  # noqa: PLR2004
+            "media_count": rng.randint(0, 2000),
+            "follower_count": rng.randint(0, 10**6),
+            "following_count": rng.randint(0, 5000),
+        }
+
+    def _profile_v2(self, username: str, base_url: str) -> dict:
+        account = self._account(username)
+        return {
+            "data": {
+                "status": True,
+                "username": username,
+                "profile_pic_url": f"{base_url}{MEDIA_PREFIX}{username}/profile.jpg",
+                **account,
+            },
+        }
+
+    def _profile_by_id(self, user_id: str, base_url: str) -> dict:
+        account = self._account(user_id)
+        username = f"user_{user_id}"
+        return {
+            "data": {
+                "status": True,
+                "id": user_id,
+                "username": username,
+                "full_name": account["full_name"],
+                "biography": account["biography"],
+                "is_private": account["is_private"],
+                "is_verified": account["is_verified"],
+                "profile_pic_url": f"{base_url}{MEDIA_PREFIX}{username}/profile.jpg",
+                "edge_owner_to_timeline_media": {"count": account["media_count"]},
+                "edge_followed_by": {"count": account["follower_count"]},
+                "edge_follow": {"count": account["following_count"]},
+            },
+        }
+
+    def _stories(self, username: str, base_url: str) -> dict:
+        rng = self._rng("stories", username)
+        account = self._account(username)
+        # Anchored to the hour so repeated calls return the same stories
+        now = int(time.time()) // 3600 * 3600
+        items = []
+        for index in range(rng.randint(0, self.max_stories)):
+            story_id = f"{account['pk']}{index:03d}"
+            taken_at = now - rng.randint(0, 24 * 3600)
+            items.append(
+                {
+                    "id": story_id,
+                    "thumbnail_url_original": (
+                        f"{base_url}{MEDIA_PREFIX}{username}/{story_id}.jpg"
+                    ),
+                    "video_url_original": None,
+                    "taken_at": taken_at,
+                    "taken_at_date": time.strftime(
+                        "%Y-%m-%dT%H:%M:%SZ",
+                        time.gmtime(taken_at),
+                    ),
+                },
+            )
+        return {"data": {"status": True, "data": {"items": items}}}
+
+
+class RecordedResponses:
+    """Replays response bodies of successful ``APIRequestLog`` rows.
+
+    Rows are loaded once, up front, so serving threads never touch the
+    database. A request for an account that was recorded gets that account's
+    latest body; any other account gets the recorded bodies of the endpoint in
+    rotation.
+    """
+
+    def __init__(self, limit: int = 10_000):
+        self._by_account: dict[tuple[str, str], dict] = {}
+        self._by_endpoint: dict[str, list[dict]] = {}
+        self._positions: Counter = Counter()
+        self._lock = threading.Lock()
+
+        rows = (
+            APIRequestLog.objects.filter(
+                status=APIRequestLog.STATUS_SUCCESS,
+                response_status_code=HTTPStatus.OK,
+                url__contains=ENDPOINT_PREFIX,
+            )
+            .order_by("-created_at")
+            .values_list("url", "request_params", "response_body")[:limit]
+        )
+        for url, params, body in rows:
+            endpoint_name = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+            param = ENDPOINT_PARAMS.get(endpoint_name)
+            if not param or not body:
+                continue
+            value = str((params or {}).get(param, ""))
+            self._by_account.setdefault((endpoint_name, value), body)
+            self._by_endpoint.setdefault(endpoint_name, []).append(body)
+
+    def __len__(self):
+        return sum(len(bodies) for bodies in self._by_endpoint.values())
+
+    def get(self, endpoint_name: str, value: str, base_url: str) -> dict | None:
+        body = self._by_account.get((endpoint_name, value))
+        if body is not None:
+            return body
+
+        bodies = self._by_endpoint.get(endpoint_name)
+        if not bodies:
+            return None
+        with self._lock:
+            position = self._positions[endpoint_name]
+            self._positions[endpoint_name] += 1
+        return bodies[position % len(bodies)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_HTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        self.server.fake.handle(self)
+
+    do_POST = do_GET  # noqa: N815
+
+    def send_json(
+        self,
+        status: int,
+        body: dict,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        payload = json.dumps(body).encode()
+        self.send_bytes(status, payload, "application/json", headers)
+
+    def send_bytes(
+        self,
+        status: int,
+        payload: bytes,
+        content_type: str,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fake):
+        self.fake = fake
+        super().__init__(address, _Handler)
+
+
+@dataclass
+class FakeCoreAPIServer:
+    """Threaded HTTP server impersonating the Core API.
+
+    Use it as a context manager, or call :meth:`start` / :meth:`stop`. The
+    fault profile can be swapped while the server runs.
+
+    Attributes:
+        host: Interface to bind
+        port: Port to bind, 0 picks a free one
+        sources: Response sources tried in order, see :class:`SyntheticResponses`
+        faults: Latency and failure behaviour
+        token: Bearer token required from clients, None accepts any
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 0
+    sources: list = field(default_factory=lambda: [SyntheticResponses()])
+    faults: FaultProfile = field(default_factory=FaultProfile)
+    token: str | None = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.faults.seed)  # noqa: S311
+        self._server: _HTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        self.reset_stats()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeCoreAPIServer":
+        self._server = _HTTPServer((self.host, self.port), self)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="fake-core-api",
+            daemon=True,
+        )
+        self._thread.start()
+        logger.info("Fake Core API listening on %s", self.url)
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until interrupted."""
+        self._server = _HTTPServer((self.host, self.port), self)
+        self.port = self._server.server_address[1]
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(5)
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._api_requests = 0
+            self._started_at = time.monotonic()
+            self._statuses: Counter = Counter()
+            self._endpoints: Counter = Counter()
+
+    def stats(self) -> dict[str, Any]:
+        """Request counters since start or the last :meth:`reset_stats`."""
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at
+            return {
+                "requests": self._api_requests,
+                "requests_per_second": (
+                    self._api_requests / elapsed if elapsed > 0 else 0.0
+                ),
+                "statuses": dict(self._statuses),
+                "endpoints": dict(self._endpoints),
+            }
+
+    def _count(self, endpoint_name: str | None, status: int) -> None:
+        with self._lock:
+            self._statuses[int(status)] += 1
+            if endpoint_name:
+                self._endpoints[endpoint_name] += 1
+
+    def _draw_faults(self) -> tuple[float, bool, bool, HTTPStatus]:
+        """Pick latency and failure outcome of the next API request."""
+        with self._lock:
+            self._api_requests += 1
+            latency = self.faults.latency(self._rng)
+            rate_limited = self.faults.is_rate_limited(self._api_requests)
+            failed = self._rng.random() < self.faults.error_rate
+            error_status = self._rng.choice(SERVER_ERROR_STATUSES)
+        return latency, rate_limited, failed, error_status
+
+    def _lookup(self, endpoint_name: str, value: str) -> dict | None:
+        for source in self.sources:
+            body = source.get(endpoint_name, value, self.url)
+            if body is not None:
+                return body
+        return None
+
+    def _send_media(self, request: _Handler, path: str) -> None:
+        # Deterministic placeholder bytes for picture and story downloads,
+        # with an ETag so conditional requests can be answered with a 304
+        payload = hashlib.sha256(path.encode()).digest() * 64
+        etag = f'"{hashlib.md5(payload).hexdigest()}"'  # noqa: S324
+        if request.headers.get("If-None-Match") == etag:
+            self._count(None, HTTPStatus.NOT_MODIFIED)
+            request.send_bytes(
+                HTTPStatus.NOT_MODIFIED,
+                b"",
+                "image/jpeg",
+                {"ETag": etag},
+            )
+            return
+        self._count(None, HTTPStatus.OK)
+        request.send_bytes(HTTPStatus.OK, payload, "image/jpeg", {"ETag": etag})
+
+    def handle(self, request: _Handler) -> None:
+        parts = urlsplit(request.path)
+
+        if parts.path.startswith(MEDIA_PREFIX):
+            self._send_media(request, parts.path)
+            return
+
+        if self.token and request.headers.get("Authorization") != (
+            f"Bearer {self.token}"
+        ):
+            self._count(None, HTTPStatus.UNAUTHORIZED)
+            request.send_json(HTTPStatus.UNAUTHORIZED, {"detail": "Invalid token"})
+            return
+
+        if parts.path.rstrip("/") == HEALTH_CHECK_PATH:
+            self._count(None, HTTPStatus.OK)
+            request.send_json(HTTPStatus.OK, {"status": "ok"})
+            return
+
+        endpoint_name = parts.path.rstrip("/").rsplit("/", 1)[-1]
+        if not parts.path.startswith(ENDPOINT_PREFIX) or (
+            endpoint_name not in ENDPOINT_PARAMS
+        ):
+            self._count(None, HTTPStatus.NOT_FOUND)
+            request.send_json(HTTPStatus.NOT_FOUND, {"detail": "Not found"})
+            return
+
+        latency, rate_limited, failed, error_status = self._draw_faults()
+        if latency:
+            time.sleep(latency)
+
+        if rate_limited:
+            self._count(endpoint_name, HTTPStatus.TOO_MANY_REQUESTS)
+            request.send_json(
+                HTTPStatus.TOO_MANY_REQUESTS,
+                {"detail": "Rate limit exceeded"},
+                {"Retry-After": f"{self.faults.retry_after:g}"},
+            )
+            return
+
+        if failed:
+            self._count(endpoint_name, error_status)
+            request.send_json(error_status, {"detail": error_status.phrase})
+            return
+
+        query = parse_qs(parts.query)
+        value = (query.get(ENDPOINT_PARAMS[endpoint_name]) or [""])[0]
+        body = self._lookup(endpoint_name, value)
+        if body is None:
+            body = {"data": {"status": False, "errorMessage": "User not found"}}
+
+        self._count(endpoint_name, HTTPStatus.OK)
+        request.send_json(HTTPStatus.OK, body)
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api_logs.archive import archive_logs
+from api_logs.partitions import retention_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive API request logs older than a cutoff to zstd NDJSON segments "
+        "in storage, deleting rows once each segment is verified."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.API_LOG_ARCHIVE_AFTER_DAYS,
+        )
+        parser.add_argument(
+            "--segment-rows",
+            type=int,
+            default=settings.API_LOG_ARCHIVE_SEGMENT_ROWS,
+        )
+        parser.add_argument(
+            "--max-segments",
+            type=int,
+            help="Stop after this many segments (default: archive everything)",
+        )
+        parser.add_argument(
+            "--keep-rows",
+            action="store_true",
+            help="Write and verify segments without deleting the archived rows",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff(options["older_than_days"])
+        self.stdout.write(f"Archiving API logs created before {cutoff.isoformat()}")
+
+        manifests = archive_logs(
+            cutoff,
+            segment_rows=options["segment_rows"],
+            max_segments=options["max_segments"],
+            delete=not options["keep_rows"],
+        )
+        for manifest in manifests:
+            self.stdout.write(
+                f"{manifest.segment}: {manifest.row_count} rows, "
+                f"{manifest.compressed_bytes} bytes",
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {sum(m.row_count for m in manifests)} rows "
+                f"in {len(manifests)} segments",
+            ),
+        )
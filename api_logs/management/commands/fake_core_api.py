@@ -0,0 +1,127 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from api_logs.fake_core_api import LATENCY_DISTRIBUTIONS
+from api_logs.fake_core_api import FakeCoreAPIServer
+from api_logs.fake_core_api import FaultProfile
+from api_logs.fake_core_api import RecordedResponses
+from api_logs.fake_core_api import SyntheticResponses
+from settings.models import CoreAPISetting
+
+SOURCE_RECORDED = "recorded"
+SOURCE_SYNTHETIC = "synthetic"
+SOURCE_BOTH = "both"
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local fake Core API serving recorded or synthetic Instagram "
+        "responses, with configurable latency, errors and 429 bursts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument(
+            "--source",
+            choices=(SOURCE_RECORDED, SOURCE_SYNTHETIC, SOURCE_BOTH),
+            default=SOURCE_BOTH,
+            help="Where response bodies come from; 'both' prefers recorded ones",
+        )
+        parser.add_argument(
+            "--recorded-limit",
+            type=int,
+            default=10_000,
+            help="Maximum number of recorded API logs to load",
+        )
+        parser.add_argument("--token", help="Require this bearer token")
+        parser.add_argument("--latency-ms", type=float, default=0.0)
+        parser.add_argument(
+            "--latency-distribution",
+            choices=LATENCY_DISTRIBUTIONS,
+            default="fixed",
+        )
+        parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+        parser.add_argument("--latency-sigma", type=float, default=0.5)
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of requests answered with a 502/503/504",
+        )
+        parser.add_argument(
+            "--burst-every",
+            type=int,
+            default=0,
+            help="Length of a rate-limit cycle in requests",
+        )
+        parser.add_argument(
+            "--burst-length",
+            type=int,
+            default=0,
+            help="Requests at the end of each cycle answered with a 429",
+        )
+        parser.add_argument("--retry-after", type=float, default=1.0)
+        parser.add_argument("--seed", type=int)
+        parser.add_argument(
+            "--configure",
+            action="store_true",
+            help="Point the Core API settings at this server (and token)",
+        )
+
+    def handle(self, *args, **options):
+        sources: list[RecordedResponses | SyntheticResponses] = []
+        if options["source"] in (SOURCE_RECORDED, SOURCE_BOTH):
+            recorded = RecordedResponses(limit=options["recorded_limit"])
+            self.stdout.write(f"Loaded {len(recorded)} recorded responses")
+            sources.append(recorded)
+        if options["source"] in (SOURCE_SYNTHETIC, SOURCE_BOTH):
+            sources.append(SyntheticResponses())
+
+        try:
+            faults = FaultProfile(
+                latency_ms=options["latency_ms"],
+                latency_distribution=options["latency_distribution"],
+                latency_jitter_ms=options["latency_jitter_ms"],
+                latency_sigma=options["latency_sigma"],
+                error_rate=options["error_rate"],
+                burst_every=options["burst_every"],
+                burst_length=options["burst_length"],
+                retry_after=options["retry_after"],
+                seed=options["seed"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        server = FakeCoreAPIServer(
+            host=options["host"],
+            port=options["port"],
+            sources=sources,
+            faults=faults,
+            token=options["token"],
+        )
+
+        if options["configure"]:
+            self._configure_settings(server.url, options["token"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Fake Core API listening on {server.url}"),
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stdout.write(json.dumps(server.stats(), indent=2))
+
+    def _configure_settings(self, url, token):
+        setting = CoreAPISetting.get_solo()
+        setting.api_url = url
+        if token:
+            setting.api_token = token
+        elif not setting.api_token:
+            setting.api_token = "fake-core-api"  # noqa: S105
+        setting.save()
+        self.stdout.write(f"Core API settings now point at {url}")
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+
+from api_logs.archive import list_manifests
+from api_logs.archive import read_archived_logs
+
+
+def _datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        msg = f"Invalid datetime: {value}"
+        raise CommandError(msg)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Print archived API request logs as NDJSON (pipe into jq, duckdb, ...), "
+        "or list the archived segments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=_datetime, help="ISO 8601 datetime")
+        parser.add_argument("--until", type=_datetime, help="ISO 8601 datetime")
+        parser.add_argument("--url-contains", help="Only logs whose URL contains this")
+        parser.add_argument("--status", help="Only logs with this status")
+        parser.add_argument(
+            "--list",
+            action="store_true",
+            help="List segment manifests instead of rows",
+        )
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for manifest in list_manifests():
+                self.stdout.write(
+                    f"{manifest.segment}\t{manifest.row_count}\t"
+                    f"{manifest.min_created_at}\t{manifest.max_created_at}",
+                )
+            return
+
+        for row in read_archived_logs(since=options["since"], until=options["until"]):
+            if options["url_contains"] and options["url_contains"] not in row["url"]:
+                continue
+            if options["status"] and row["status"] != options["status"]:
+                continue
+            self.stdout.write(json.dumps(row, cls=DjangoJSONEncoder))
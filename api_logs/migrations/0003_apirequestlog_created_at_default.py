@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logs', '0002_remove_apirequestlog_api_logs_ap_endpoin_622263_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apirequestlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,148 @@
+# Converts api_logs_apirequestlog into a table range-partitioned by month on
+# created_at (PostgreSQL only, other databases keep the plain table).
+#
+# The existing table is kept as-is and attached as the "legacy" partition
+# covering everything before next month, so no rows are copied. Partitions for
+# the following months are created here and then kept ahead by the
+# purge_expired_api_logs task. The primary key becomes (id, created_at), as
+# PostgreSQL requires the partition key in every unique constraint; Django
+# still treats id as the primary key.
+#
+# Nothing that reads the whole table runs under an ACCESS EXCLUSIVE lock, so
+# logging keeps working while this migrates: the new primary key index is
+# built CONCURRENTLY, and a CHECK constraint matching the legacy partition's
+# bound is validated beforehand, so ATTACH PARTITION does not scan the table.
+# Only the catalog changes then run in one short transaction.
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db import transaction
+from django.utils import timezone
+
+TABLE = "api_logs_apirequestlog"
+INDEXES = {
+    "api_logs_ap_created_d743de_idx": "(created_at DESC)",
+    "api_logs_ap_status_7ebd00_idx": "(status)",
+    "api_logs_ap_respons_afba59_idx": "(response_status_code)",
+}
+MONTHS_AHEAD = 3
+PRIMARY_KEY_INDEX = f"{TABLE}_id_created_at_uniq"
+BOUND_CHECK = f"{TABLE}_legacy_bound"
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _is_partitioned(cursor):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+        [TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def _prepare_legacy_table(cursor, bound):
+    # A failed earlier run may have left an invalid index behind
+    cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {PRIMARY_KEY_INDEX}")
+    cursor.execute(
+        f"CREATE UNIQUE INDEX CONCURRENTLY {PRIMARY_KEY_INDEX} "
+        f"ON {TABLE} (id, created_at)",
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS {BOUND_CHECK}")
+    cursor.execute(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {BOUND_CHECK} "
+        f"CHECK (created_at IS NOT NULL AND created_at < '{bound}') NOT VALID",
+    )
+    # Only takes a SHARE UPDATE EXCLUSIVE lock: writes go on meanwhile
+    cursor.execute(f"ALTER TABLE {TABLE} VALIDATE CONSTRAINT {BOUND_CHECK}")
+
+
+def partition_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    start = _next_month(timezone.now().date())
+    bound = f"{start.isoformat()} 00:00:00+00"
+    with connection.cursor() as cursor:
+        if _is_partitioned(cursor):
+            return
+        _prepare_legacy_table(cursor, bound)
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        legacy = f"{TABLE}_legacy"
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {legacy}")
+        for index in INDEXES:
+            cursor.execute(f"ALTER INDEX {index} RENAME TO {index}_legacy")
+
+        # Move the id sequence from the old table to the partitioned parent
+        cursor.execute(f"ALTER TABLE {legacy} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+        cursor.execute(f"ALTER TABLE {legacy} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {TABLE}_id_seq")
+        cursor.execute(
+            f"SELECT setval('{TABLE}_id_seq', "
+            f"COALESCE((SELECT max(id) FROM {legacy}), 0) + 1, false)",
+        )
+
+        cursor.execute(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'p'",
+            [legacy],
+        )
+        (primary_key,) = cursor.fetchone()
+        cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {primary_key}")
+        cursor.execute(
+            f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey "
+            f"PRIMARY KEY USING INDEX {PRIMARY_KEY_INDEX}",
+        )
+
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING STORAGE) "
+            "PARTITION BY RANGE (created_at)",
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')",
+        )
+        cursor.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+        # The parent is empty, and attaching reuses the legacy table's
+        # matching indexes instead of building new ones
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey "
+            "PRIMARY KEY (id, created_at)",
+        )
+        for index, columns in INDEXES.items():
+            cursor.execute(f"CREATE INDEX {index} ON {TABLE} {columns}")
+
+        # The validated bound check proves the range, so this does not scan
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {legacy} "
+            f"FOR VALUES FROM (MINVALUE) TO ('{bound}')",
+        )
+        cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {BOUND_CHECK}")
+        for _ in range(MONTHS_AHEAD):
+            end = _next_month(start)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE}_p{start:%Y%m} "
+                f"PARTITION OF {TABLE} FOR VALUES "
+                f"FROM ('{start.isoformat()} 00:00:00+00') "
+                f"TO ('{end.isoformat()} 00:00:00+00')",
+            )
+            start = end
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction; the catalog
+    # changes get their own, see partition_table
+    atomic = False
+
+    dependencies = [
+        ('api_logs', '0003_apirequestlog_created_at_default'),
+    ]
+
+    operations = [
+        # Not reversible in place: the partitioned table keeps working with
+        # the previous model state, so unapplying leaves it as it is.
+        migrations.RunPython(partition_table, migrations.RunPython.noop),
+    ]
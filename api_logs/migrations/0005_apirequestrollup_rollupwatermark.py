@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logs', '0004_partition_apirequestlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Watermark',
+                'verbose_name_plural': 'Rollup Watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='APIRequestRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=100)),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('status_counts', models.JSONField(blank=True, default=dict)),
+                ('status_code_counts', models.JSONField(blank=True, default=dict)),
+                ('duration_count', models.PositiveIntegerField(default=0)),
+                ('duration_sum_ms', models.BigIntegerField(default=0)),
+                ('duration_max_ms', models.IntegerField(blank=True, null=True)),
+                ('duration_histogram', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'API Request Rollup',
+                'verbose_name_plural': 'API Request Rollups',
+                'ordering': ['-bucket_start', 'endpoint'],
+                'indexes': [models.Index(fields=['granularity', '-bucket_start'], name='api_logs_ap_granula_ea002c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('endpoint', 'granularity', 'bucket_start'), name='api_logs_rollup_unique_bucket')],
+            },
+        ),
+    ]
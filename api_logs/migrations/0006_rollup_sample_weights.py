@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logs', '0005_apirequestrollup_rollupwatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apirequestlog',
+            name='sample_rate',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AlterField(
+            model_name='apirequestrollup',
+            name='duration_count',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='apirequestrollup',
+            name='duration_sum_ms',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='apirequestrollup',
+            name='errors',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='apirequestrollup',
+            name='requests',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from rest_framework import status as drf_status
 
 
@@ -32,8 +33,12 @@ class APIRequestLog(models.Model):
     )
     duration_ms = models.IntegerField(null=True, blank=True)
     error_message = models.TextField(blank=True)
+    # Share of calls like this one that are logged: successful calls are
+    # sampled (see api_logs.policy), errors and timeouts always kept
+    sample_rate = models.FloatField(default=1.0)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the log object is built, not when a buffered batch is written
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -62,3 +67,82 @@ class APIRequestLog(models.Model):
     @property
     def duration_seconds(self):
         return self.duration_ms / 1000 if self.duration_ms else None
+
+
+class APIRequestRollup(models.Model):
+    """Aggregated Core API calls of one endpoint over one minute or hour.
+
+    Durations are kept as a sparse histogram over the fixed log-scale buckets
+    of ``api_logs.rollups.HISTOGRAM_BOUNDS`` so percentiles can be estimated
+    and rows of any time range can be merged.
+    """
+
+    GRANULARITY_MINUTE = "minute"
+    GRANULARITY_HOUR = "hour"
+
+    GRANULARITY_CHOICES = [
+        (GRANULARITY_MINUTE, "Minute"),
+        (GRANULARITY_HOUR, "Hour"),
+    ]
+
+    endpoint = models.CharField(max_length=100)
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+
+    # Counts estimate all calls, not just the logged ones: each log weighs
+    # 1 / its sample rate, so they may be fractional
+    requests = models.FloatField(default=0)
+    errors = models.FloatField(default=0)
+    # Counts by APIRequestLog.status and by HTTP status code
+    status_counts = models.JSONField(default=dict, blank=True)
+    status_code_counts = models.JSONField(default=dict, blank=True)
+
+    duration_count = models.FloatField(default=0)
+    duration_sum_ms = models.FloatField(default=0)
+    duration_max_ms = models.IntegerField(null=True, blank=True)
+    # Counts keyed by the index of the duration bucket
+    duration_histogram = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-bucket_start", "endpoint"]
+        verbose_name = "API Request Rollup"
+        verbose_name_plural = "API Request Rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["endpoint", "granularity", "bucket_start"],
+                name="api_logs_rollup_unique_bucket",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["granularity", "-bucket_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M}"
+
+    @property
+    def error_rate(self):
+        return self.errors / self.requests if self.requests else 0.0
+
+    @property
+    def mean_duration_ms(self):
+        return (
+            self.duration_sum_ms / self.duration_count if self.duration_count else None
+        )
+
+
+class RollupWatermark(models.Model):
+    """Highest ``APIRequestLog`` id already folded into the rollups."""
+
+    name = models.CharField(max_length=50, unique=True)
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Rollup Watermark"
+        verbose_name_plural = "Rollup Watermarks"
+
+    def __str__(self):
+        return f"{self.name}: {self.last_log_id}"
@@ -0,0 +1,145 @@
+"""Admin changelist helpers for very large tables.
+
+- ``EstimatedCountPaginator`` uses the planner's row estimates on PostgreSQL
+  instead of ``COUNT(*)`` once a table is large
+- ``KeysetChangeList`` pages through ``-created_at, -id`` with a "before"
+  cursor instead of ``OFFSET``, so deep pages cost the same as the first
+"""
+
+import json
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from unfold.views import ChangeList
+
+CURSOR_VAR = "before"
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def _table_estimate(cursor, table: str) -> float | None:
+    # A partitioned parent has no statistics of its own, so sum its partitions
+    cursor.execute(
+        "SELECT c.reltuples FROM pg_class c WHERE c.oid = %s::regclass "
+        "UNION ALL "
+        "SELECT sum(c.reltuples) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = %s::regclass AND c.reltuples > 0",
+        [table, table],
+    )
+    estimates = [row[0] for row in cursor.fetchall() if row[0] is not None]
+    return max(estimates, default=None)
+
+
+def _plan_estimate(cursor, queryset) -> float | None:
+    sql, params = queryset.query.sql_with_params()
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+def estimate_count(queryset) -> int | None:
+    """Estimate the rows of ``queryset`` from PostgreSQL statistics.
+
+    Unfiltered querysets use ``pg_class.reltuples``, filtered ones the row
+    estimate of the query plan. Returns None on other databases or when the
+    table has never been analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        if queryset.query.where:
+            estimate = _plan_estimate(cursor, queryset.order_by())
+        else:
+            estimate = _table_estimate(cursor, queryset.model._meta.db_table)  # noqa: SLF001
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that reports an estimated count for large result sets.
+
+    Results estimated below ``API_LOG_ADMIN_EXACT_COUNT_BELOW`` rows are
+    still counted exactly, which is cheap at that size.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.API_LOG_ADMIN_EXACT_COUNT_BELOW:
+            return super().count
+        return estimate
+
+
+def encode_cursor(obj) -> str:
+    """Return ``<id>_<created_at in microseconds since the epoch>``."""
+    return f"{obj.pk}_{(obj.created_at - EPOCH) // timedelta(microseconds=1)}"
+
+
+def decode_cursor(value: str) -> tuple[int, datetime]:
+    pk, _, micros = value.partition("_")
+    if not pk.isdigit() or not micros.isdigit():
+        msg = f"Invalid cursor: {value}"
+        raise IncorrectLookupParameters(msg)
+    return int(pk), EPOCH + timedelta(microseconds=int(micros))
+
+
+class KeysetChangeList(ChangeList):
+    """Changelist that can continue after the last row of the previous page.
+
+    With the default ordering, ``?before=<cursor>`` restricts the results to
+    rows older than the cursor row. The cursor is dropped from every other
+    link (filters, sorting, page numbers).
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        new_params = new_params or {}
+        if CURSOR_VAR not in new_params:
+            remove = [*(remove or []), CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    @property
+    def keyset_enabled(self):
+        return ORDER_VAR not in self.params
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        cursor = self.params.get(CURSOR_VAR)
+        if cursor and self.keyset_enabled:
+            pk, created_at = decode_cursor(cursor)
+            # Rows sharing the cursor's timestamp are ordered by id
+            queryset = queryset.filter(created_at__lte=created_at).exclude(
+                created_at=created_at,
+                pk__gte=pk,
+            )
+        return queryset
+
+    @property
+    def next_cursor_url(self):
+        """Link to the rows after this page, or None on the last page."""
+        if not self.keyset_enabled:
+            return None
+        rows = list(self.result_list)
+        if len(rows) < self.list_per_page:
+            return None
+        return self.get_query_string(
+            {CURSOR_VAR: encode_cursor(rows[-1])},
+            remove=[PAGE_VAR],
+        )
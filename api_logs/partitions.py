@@ -0,0 +1,190 @@
+"""Monthly range partitions of the API request log table and retention.
+
+On PostgreSQL the log table is partitioned by month on ``created_at`` (see
+migration 0004), so expired months are removed by detaching and dropping
+whole partitions: no row-by-row ``DELETE``, no table-wide lock and no WAL
+bloat. Elsewhere (SQLite in tests, or a database that was never
+partitioned) expired rows are deleted in bounded primary-key chunks instead.
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import UTC
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+
+from django.db import connection
+
+from .models import APIRequestLog
+
+logger = logging.getLogger(__name__)
+
+TABLE = APIRequestLog._meta.db_table  # noqa: SLF001
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+# DETACH PARTITION ... CONCURRENTLY only takes a SHARE UPDATE EXCLUSIVE lock
+DETACH_CONCURRENTLY_MIN_VERSION = (14,)
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    upper_bound: datetime | None
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(start: date) -> str:
+    return f"{TABLE}_p{start:%Y%m}"
+
+
+def _bound(day: date) -> str:
+    return f"{day.isoformat()} 00:00:00+00"
+
+
+def is_partitioned() -> bool:
+    """Whether the log table is a partitioned PostgreSQL table."""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> list[Partition]:
+    """Return the attached partitions, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _UPPER_BOUND.search(bound or "")
+        upper_bound = datetime.fromisoformat(match.group(1)) if match else None
+        partitions.append(Partition(name, upper_bound))
+    return sorted(
+        partitions,
+        key=lambda partition: partition.upper_bound or datetime.max.replace(tzinfo=UTC),
+    )
+
+
+def ensure_partitions(months_ahead: int, today: date | None = None) -> list[str]:
+    """Create the partitions for the current month and ``months_ahead`` more.
+
+    Months already covered by a partition (including the legacy one) are
+    skipped. Returns the names of the partitions that were created.
+    """
+    if not is_partitioned():
+        return []
+
+    today = today or datetime.now(tz=UTC).date()
+    covered_until = max(
+        (p.upper_bound.date() for p in list_partitions() if p.upper_bound),
+        default=None,
+    )
+
+    created = []
+    start = month_start(today)
+    with connection.cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            end = add_months(start, 1)
+            if covered_until is None or start >= covered_until:
+                name = partition_name(start)
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+                    f"FOR VALUES FROM ('{_bound(start)}') TO ('{_bound(end)}')",
+                )
+                created.append(name)
+            start = end
+
+    if created:
+        logger.info("Created API log partitions: %s", ", ".join(created))
+    return created
+
+
+def drop_expired_partitions(
+    cutoff: datetime,
+    *,
+    detach_only: bool = False,
+) -> list[str]:
+    """Detach, and unless ``detach_only`` drop, partitions entirely before ``cutoff``.
+
+    Detached tables are left in place when ``detach_only`` is set; they are
+    no longer read by the archive. Returns the names of the partitions
+    removed from the log table.
+    """
+    concurrently = (
+        connection.get_database_version() >= DETACH_CONCURRENTLY_MIN_VERSION
+        and not connection.in_atomic_block
+    )
+
+    removed = []
+    for partition in list_partitions():
+        if partition.upper_bound is None or partition.upper_bound > cutoff:
+            continue
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {TABLE} DETACH PARTITION {partition.name}"
+                f"{' CONCURRENTLY' if concurrently else ''}",
+            )
+            if not detach_only:
+                cursor.execute(f"DROP TABLE {partition.name}")
+        removed.append(partition.name)
+        logger.info(
+            "%s expired API log partition %s",
+            "Detached" if detach_only else "Dropped",
+            partition.name,
+        )
+    return removed
+
+
+def purge_in_chunks(
+    cutoff: datetime,
+    *,
+    chunk_size: int,
+    max_chunks: int,
+    pause: float = 0,
+) -> int:
+    """Delete logs created before ``cutoff`` in primary-key chunks.
+
+    Each chunk is its own short statement over at most ``chunk_size`` rows,
+    with ``pause`` seconds in between so vacuum and replicas keep up. Stops
+    after ``max_chunks`` chunks; the next run continues where this one ended.
+    Returns the number of deleted rows.
+    """
+    expired = APIRequestLog.objects.filter(created_at__lt=cutoff).order_by("pk")
+    deleted = 0
+    for chunk in range(max_chunks):
+        pks = list(expired.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            break
+        if chunk and pause:
+            time.sleep(pause)
+        count, _ = APIRequestLog.objects.filter(pk__in=pks).delete()
+        deleted += count
+    return deleted
+
+
+def retention_cutoff(retention_days: int) -> datetime:
+    return datetime.now(tz=UTC) - timedelta(days=retention_days)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import random
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from settings.cache import get_setting
+from settings.models import APILogSetting
+
+from .models import APIRequestLog
+
+BODY_FIELDS = ("request_body", "response_body")
+
+
+def endpoint_name_from_url(url: str) -> str:
+    return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+def truncate_body(body, max_bytes: int):
+    """Cap a JSON body at ``max_bytes`` of its serialized form.
+
+    Oversized bodies are replaced by a marker holding the kept prefix (as
+    text), the original size and a SHA-256 digest of the dropped remainder.
+    """
+    if not max_bytes or not body:
+        return body
+    encoded = json.dumps(body, separators=(",", ":")).encode()
+    if len(encoded) <= max_bytes:
+        return body
+    head, remainder = encoded[:max_bytes], encoded[max_bytes:]
+    return {
+        "truncated": True,
+        "size": len(encoded),
+        "head": head.decode(errors="ignore"),
+        "remainder_sha256": hashlib.sha256(remainder).hexdigest(),
+    }
+
+
+@dataclass(frozen=True)
+class LoggingPolicy:
+    """Which Core API calls are logged, and which parts of them are kept.
+
+    Errors and timeouts are always logged; successful calls are sampled.
+    Built from ``APILogSetting`` with :meth:`from_settings`.
+    """
+
+    success_sample_rate: float
+    max_body_bytes: int
+    keep: frozenset
+    endpoint_policies: dict
+
+    @classmethod
+    def from_settings(cls):
+        setting = get_setting(APILogSetting)
+        return cls(
+            success_sample_rate=setting.success_sample_rate,
+            max_body_bytes=setting.max_body_bytes,
+            keep=frozenset(
+                part
+                for part in APILogSetting.LOG_PARTS
+                if getattr(setting, f"keep_{part}")
+            ),
+            endpoint_policies=dict(setting.endpoint_policies or {}),
+        )
+
+    def for_endpoint(self, endpoint_name: str) -> tuple[float, int, frozenset]:
+        """Return ``(sample_rate, max_body_bytes, kept_parts)`` for an endpoint."""
+        override = self.endpoint_policies.get(endpoint_name) or {}
+        keep = override.get("keep")
+        return (
+            float(override.get("sample_rate", self.success_sample_rate)),
+            int(override.get("max_body_bytes", self.max_body_bytes)),
+            self.keep if keep is None else frozenset(keep),
+        )
+
+    def sample(self, endpoint_name: str) -> bool:
+        """Decide up front whether a successful call to the endpoint is logged."""
+        sample_rate, _, _ = self.for_endpoint(endpoint_name)
+        return sample_rate >= 1 or random.random() < sample_rate  # noqa: S311
+
+    def should_log(self, api_log: APIRequestLog, *, sampled: bool) -> bool:
+        return sampled or api_log.status != APIRequestLog.STATUS_SUCCESS
+
+    def apply(self, api_log: APIRequestLog) -> None:
+        """Record the sample rate, drop the parts not kept and cap the bodies."""
+        sample_rate, max_body_bytes, keep = self.for_endpoint(
+            endpoint_name_from_url(api_log.url),
+        )
+        if api_log.status == APIRequestLog.STATUS_SUCCESS:
+            api_log.sample_rate = min(sample_rate, 1.0)
+        else:
+            api_log.sample_rate = 1.0
+        for part in APILogSetting.LOG_PARTS:
+            if part not in keep:
+                setattr(api_log, part, {})
+        for part in BODY_FIELDS:
+            setattr(
+                api_log,
+                part,
+                truncate_body(getattr(api_log, part), max_body_bytes),
+            )
+
+    def filter_logs(self, api_logs: list[APIRequestLog]) -> list[APIRequestLog]:
+        """Sample and trim already finished logs (e.g. from the batch engine)."""
+        kept = []
+        for api_log in api_logs:
+            sampled = self.sample(endpoint_name_from_url(api_log.url))
+            if self.should_log(api_log, sampled=sampled):
+                self.apply(api_log)
+                kept.append(api_log)
+        return kept
@@ -0,0 +1,319 @@
+"""Per-endpoint minute and hour rollups of ``APIRequestLog``.
+
+New logs are folded into ``APIRequestRollup`` rows incrementally: a
+``RollupWatermark`` holds the highest log id already counted, and each run
+reads logs past it in id order. Logs younger than ``API_LOG_ROLLUP_LAG_SECONDS``
+are left for the next run, together with every log after them, so rows still
+being written (a pending log is updated when its request finishes) are not
+counted early.
+
+Durations go into a histogram over fixed log-scale buckets (ten per decade,
+1 ms to 100 s), which lets rows be merged over any time range and
+percentiles be estimated from the merged histogram.
+"""
+
+import bisect
+import logging
+from collections import Counter
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import APIRequestLog
+from .models import APIRequestRollup
+from .models import RollupWatermark
+from .policy import endpoint_name_from_url
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "api_request_rollups"
+# Length of the buckets of each granularity, in seconds
+GRANULARITIES = {
+    APIRequestRollup.GRANULARITY_MINUTE: 60,
+    APIRequestRollup.GRANULARITY_HOUR: 60 * 60,
+}
+ERROR_STATUSES = (APIRequestLog.STATUS_ERROR, APIRequestLog.STATUS_TIMEOUT)
+
+# Upper bounds (ms) of the duration buckets; longer calls go in one last
+# overflow bucket
+HISTOGRAM_BOUNDS = tuple(round(10 ** (i / 10), 2) for i in range(51))
+
+
+def bucket_index(duration_ms: float) -> int:
+    return bisect.bisect_left(HISTOGRAM_BOUNDS, duration_ms)
+
+
+def percentile(histogram: dict, q: float, max_ms: float | None = None) -> float | None:
+    """Estimate the ``q`` quantile (0..1) of a duration histogram.
+
+    Interpolates linearly inside the bucket holding the quantile; the
+    overflow bucket is bounded by ``max_ms`` when given.
+    """
+    counts = sorted((int(index), count) for index, count in histogram.items())
+    total = sum(count for _, count in counts)
+    if not total:
+        return None
+
+    rank = q * total
+    seen = 0
+    for index, count in counts:
+        if seen + count >= rank:
+            lower = HISTOGRAM_BOUNDS[index - 1] if index else 0.0
+            if index < len(HISTOGRAM_BOUNDS):
+                upper = HISTOGRAM_BOUNDS[index]
+            else:
+                upper = max(max_ms or lower, lower)
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return None
+
+
+def _add_counts(into: dict, counts: dict) -> dict:
+    merged = Counter(into)
+    merged.update(counts)
+    return dict(merged)
+
+
+def merge_rollup(into: APIRequestRollup, other: APIRequestRollup) -> None:
+    """Add the counts of ``other`` to ``into``."""
+    into.requests += other.requests
+    into.errors += other.errors
+    into.status_counts = _add_counts(into.status_counts, other.status_counts)
+    into.status_code_counts = _add_counts(
+        into.status_code_counts,
+        other.status_code_counts,
+    )
+    into.duration_count += other.duration_count
+    into.duration_sum_ms += other.duration_sum_ms
+    into.duration_histogram = _add_counts(
+        into.duration_histogram,
+        other.duration_histogram,
+    )
+    if other.duration_max_ms is not None:
+        into.duration_max_ms = max(into.duration_max_ms or 0, other.duration_max_ms)
+
+
+def _truncate(moment: datetime, granularity: str) -> datetime:
+    seconds = GRANULARITIES[granularity]
+    return datetime.fromtimestamp(moment.timestamp() // seconds * seconds, tz=UTC)
+
+
+def aggregate_logs(rows) -> dict[tuple, APIRequestRollup]:
+    """Aggregate ``(url, status, response_status_code, duration_ms, created_at,
+    sample_rate)`` rows into unsaved rollups keyed by ``(endpoint, granularity,
+    bucket_start)``.
+
+    Each row stands for ``1 / sample_rate`` calls, so sampled successes are
+    not outweighed by the errors and timeouts that are always logged.
+    """
+    rollups: dict[tuple, APIRequestRollup] = {}
+    for url, status, status_code, duration_ms, created_at, sample_rate in rows:
+        weight = 1 / sample_rate if sample_rate and sample_rate > 0 else 1.0
+        endpoint = endpoint_name_from_url(url)[:100]
+        for granularity in GRANULARITIES:
+            key = (endpoint, granularity, _truncate(created_at, granularity))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = APIRequestRollup(
+                    endpoint=endpoint,
+                    granularity=granularity,
+                    bucket_start=key[2],
+                    status_counts={},
+                    status_code_counts={},
+                    duration_histogram={},
+                )
+            rollup.requests += weight
+            if status in ERROR_STATUSES:
+                rollup.errors += weight
+            rollup.status_counts[status] = rollup.status_counts.get(status, 0) + weight
+            if status_code is not None:
+                code = str(status_code)
+                rollup.status_code_counts[code] = (
+                    rollup.status_code_counts.get(code, 0) + weight
+                )
+            if duration_ms is not None:
+                index = str(bucket_index(duration_ms))
+                rollup.duration_histogram[index] = (
+                    rollup.duration_histogram.get(index, 0) + weight
+                )
+                rollup.duration_count += weight
+                rollup.duration_sum_ms += duration_ms * weight
+                rollup.duration_max_ms = max(rollup.duration_max_ms or 0, duration_ms)
+    return rollups
+
+
+def _save_rollups(rollups: dict[tuple, APIRequestRollup]) -> int:
+    """Merge freshly aggregated rollups into the stored rows."""
+    existing = APIRequestRollup.objects.filter(
+        endpoint__in={key[0] for key in rollups},
+        bucket_start__in={key[2] for key in rollups},
+    )
+    to_update = []
+    now = timezone.now()
+    for stored in existing:
+        key = (stored.endpoint, stored.granularity, stored.bucket_start)
+        fresh = rollups.pop(key, None)
+        if fresh is not None:
+            merge_rollup(stored, fresh)
+            stored.updated_at = now  # bulk_update skips auto_now
+            to_update.append(stored)
+
+    APIRequestRollup.objects.bulk_update(
+        to_update,
+        [
+            "requests",
+            "errors",
+            "status_counts",
+            "status_code_counts",
+            "duration_count",
+            "duration_sum_ms",
+            "duration_max_ms",
+            "duration_histogram",
+            "updated_at",
+        ],
+    )
+    APIRequestRollup.objects.bulk_create(rollups.values())
+    return len(to_update) + len(rollups)
+
+
+def _next_batch(after_id: int, horizon: datetime, batch_size: int) -> list[tuple]:
+    pending = APIRequestLog.objects.filter(pk__gt=after_id)
+    # Stop at the first log that is still too recent, so the watermark never
+    # moves past a row that may not be final yet
+    stop_id = pending.filter(created_at__gte=horizon).aggregate(first=Min("pk"))[
+        "first"
+    ]
+    if stop_id is not None:
+        pending = pending.filter(pk__lt=stop_id)
+    return list(
+        pending.order_by("pk").values_list(
+            "pk",
+            "url",
+            "status",
+            "response_status_code",
+            "duration_ms",
+            "created_at",
+            "sample_rate",
+        )[:batch_size],
+    )
+
+
+def rollup_new_logs(
+    *,
+    batch_size: int | None = None,
+    max_batches: int | None = None,
+    now: datetime | None = None,
+) -> dict:
+    """Fold logs past the watermark into the rollups, batch by batch.
+
+    Each batch is aggregated and merged while holding the watermark row lock,
+    so concurrent runs never count a log twice.
+
+    Returns:
+        dict: Logs processed, rollup rows written and the new watermark
+    """
+    batch_size = batch_size or settings.API_LOG_ROLLUP_BATCH_SIZE
+    max_batches = max_batches or settings.API_LOG_ROLLUP_MAX_BATCHES
+    horizon = (now or timezone.now()) - timedelta(
+        seconds=settings.API_LOG_ROLLUP_LAG_SECONDS,
+    )
+    RollupWatermark.objects.get_or_create(name=WATERMARK_NAME)
+
+    processed = written = 0
+    for _ in range(max_batches):
+        with transaction.atomic():
+            watermark = RollupWatermark.objects.select_for_update().get(
+                name=WATERMARK_NAME,
+            )
+            batch = _next_batch(watermark.last_log_id, horizon, batch_size)
+            if not batch:
+                break
+            written += _save_rollups(aggregate_logs(row[1:] for row in batch))
+            watermark.last_log_id = batch[-1][0]
+            watermark.save(update_fields=["last_log_id", "updated_at"])
+        processed += len(batch)
+        if len(batch) < batch_size:
+            break
+
+    if processed:
+        logger.info(
+            "Rolled up %d API logs into %d rollup rows (watermark %d)",
+            processed,
+            written,
+            watermark.last_log_id,
+        )
+    return {
+        "processed": processed,
+        "rollups_written": written,
+        "last_log_id": watermark.last_log_id,
+    }
+
+
+def purge_minute_rollups(retention_days: int | None = None) -> int:
+    """Delete minute rollups older than the retention; hour rollups are kept."""
+    retention_days = retention_days or settings.API_LOG_ROLLUP_MINUTE_RETENTION_DAYS
+    deleted, _ = APIRequestRollup.objects.filter(
+        granularity=APIRequestRollup.GRANULARITY_MINUTE,
+        bucket_start__lt=timezone.now() - timedelta(days=retention_days),
+    ).delete()
+    return deleted
+
+
+def summarize(
+    *,
+    since: datetime,
+    until: datetime | None = None,
+    endpoint: str | None = None,
+    granularity: str = APIRequestRollup.GRANULARITY_HOUR,
+) -> dict[str, dict]:
+    """Merge the rollups of ``[since, until)`` into per-endpoint statistics.
+
+    Buckets are selected by their start, so with hour rollups the range is
+    effectively rounded to whole hours.
+
+    Returns:
+        dict: ``{endpoint: {"requests", "errors", "error_rate", "p50_ms",
+        "p95_ms", "p99_ms", "mean_ms", "max_ms", "status_counts",
+        "status_code_counts"}}``
+    """
+    rollups = APIRequestRollup.objects.filter(
+        granularity=granularity,
+        bucket_start__gte=since,
+    )
+    if until is not None:
+        rollups = rollups.filter(bucket_start__lt=until)
+    if endpoint is not None:
+        rollups = rollups.filter(endpoint=endpoint)
+
+    totals: dict[str, APIRequestRollup] = {}
+    for rollup in rollups.order_by():
+        total = totals.get(rollup.endpoint)
+        if total is None:
+            total = totals[rollup.endpoint] = APIRequestRollup(
+                endpoint=rollup.endpoint,
+                status_counts={},
+                status_code_counts={},
+                duration_histogram={},
+            )
+        merge_rollup(total, rollup)
+
+    return {
+        name: {
+            "requests": total.requests,
+            "errors": total.errors,
+            "error_rate": total.error_rate,
+            "p50_ms": percentile(total.duration_histogram, 0.5, total.duration_max_ms),
+            "p95_ms": percentile(total.duration_histogram, 0.95, total.duration_max_ms),
+            "p99_ms": percentile(total.duration_histogram, 0.99, total.duration_max_ms),
+            "mean_ms": total.mean_duration_ms,
+            "max_ms": total.duration_max_ms,
+            "status_counts": total.status_counts,
+            "status_code_counts": total.status_code_counts,
+        }
+        for name, total in sorted(totals.items())
+    }
@@ -0,0 +1,11 @@
+from celery.signals import worker_process_shutdown
+from celery.signals import worker_shutdown
+
+from .buffer import flush_log_buffer
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_api_logs_on_shutdown(**kwargs):
+    """Write out buffered API logs before a worker (process) exits."""
+    flush_log_buffer()
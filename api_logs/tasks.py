@@ -0,0 +1,141 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from .archive import archive_logs
+from .archive import oldest_unarchived_log
+from .partitions import drop_expired_partitions
+from .partitions import ensure_partitions
+from .partitions import is_partitioned
+from .partitions import purge_in_chunks
+from .partitions import retention_cutoff
+from .rollups import purge_minute_rollups
+from .rollups import rollup_new_logs
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def purge_expired_api_logs(retention_days=None):
+    """
+    Remove API request logs older than the retention period.
+
+    On a partitioned table, whole expired monthly partitions are detached and
+    dropped (or only detached with API_LOG_RETENTION_DETACH_ONLY) and upcoming
+    partitions are created. Otherwise expired rows are deleted in bounded
+    primary-key chunks. With API_LOG_RETENTION_AFTER_ARCHIVE, nothing at or
+    after the oldest log not archived yet is removed.
+
+    Args:
+        retention_days (int | None): Days to keep, defaults to
+            settings.API_LOG_RETENTION_DAYS
+
+    Returns:
+        dict: Summary of the removed partitions or deleted rows
+    """
+    retention_days = retention_days or settings.API_LOG_RETENTION_DAYS
+    cutoff = retention_cutoff(retention_days)
+
+    try:
+        if settings.API_LOG_RETENTION_AFTER_ARCHIVE:
+            oldest = oldest_unarchived_log()
+            if oldest is not None and oldest < cutoff:
+                logger.warning(
+                    "API log retention held back to %s, older logs are not "
+                    "archived yet",
+                    oldest.isoformat(),
+                )
+                cutoff = oldest
+
+        if is_partitioned():
+            created = ensure_partitions(settings.API_LOG_PARTITION_MONTHS_AHEAD)
+            removed = drop_expired_partitions(
+                cutoff,
+                detach_only=settings.API_LOG_RETENTION_DETACH_ONLY,
+            )
+            logger.info(
+                "API log retention: removed %d partitions, created %d",
+                len(removed),
+                len(created),
+            )
+            return {
+                "success": True,
+                "mode": "partitions",
+                "cutoff": cutoff.isoformat(),
+                "removed_partitions": removed,
+                "created_partitions": created,
+            }
+
+        deleted = purge_in_chunks(
+            cutoff,
+            chunk_size=settings.API_LOG_PURGE_CHUNK_SIZE,
+            max_chunks=settings.API_LOG_PURGE_MAX_CHUNKS,
+            pause=settings.API_LOG_PURGE_CHUNK_PAUSE,
+        )
+    except Exception as e:
+        logger.exception("Critical error in purge_expired_api_logs")
+        return {"success": False, "error": f"Critical error: {e!s}"}
+
+    logger.info("API log retention: deleted %d rows", deleted)
+    return {
+        "success": True,
+        "mode": "chunks",
+        "cutoff": cutoff.isoformat(),
+        "deleted": deleted,
+    }
+
+
+@shared_task
+def archive_expired_api_logs(older_than_days=None):
+    """
+    Archive API request logs older than the cutoff to compressed segments in
+    storage, deleting each segment's rows once the stored file is verified.
+
+    Args:
+        older_than_days (int | None): Archive logs older than this, defaults to
+            settings.API_LOG_ARCHIVE_AFTER_DAYS
+
+    Returns:
+        dict: Summary with the written segments and archived row count
+    """
+    older_than_days = older_than_days or settings.API_LOG_ARCHIVE_AFTER_DAYS
+    cutoff = retention_cutoff(older_than_days)
+
+    try:
+        manifests = archive_logs(
+            cutoff,
+            max_segments=settings.API_LOG_ARCHIVE_MAX_SEGMENTS,
+        )
+    except Exception as e:
+        logger.exception("Critical error in archive_expired_api_logs")
+        return {"success": False, "error": f"Critical error: {e!s}"}
+
+    archived = sum(manifest.row_count for manifest in manifests)
+    logger.info("Archived %d API logs in %d segments", archived, len(manifests))
+    return {
+        "success": True,
+        "cutoff": cutoff.isoformat(),
+        "archived": archived,
+        "segments": [manifest.segment for manifest in manifests],
+    }
+
+
+@shared_task
+def rollup_api_logs():
+    """
+    Fold new API request logs into the per-endpoint minute and hour rollups
+    and delete minute rollups past their retention.
+
+    Returns:
+        dict: Logs processed, rollup rows written, the watermark and the
+            number of purged minute rollups
+    """
+    try:
+        result = rollup_new_logs()
+        result["purged_minute_rollups"] = purge_minute_rollups()
+    except Exception as e:
+        logger.exception("Critical error in rollup_api_logs")
+        return {"success": False, "error": f"Critical error: {e!s}"}
+
+    return {"success": True, **result}
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from api_logs.models import APIRequestLog
+from api_logs.pagination import EstimatedCountPaginator
+from api_logs.pagination import decode_cursor
+from api_logs.pagination import encode_cursor
+from api_logs.pagination import estimate_count
+from api_logs.tests.factories import APIRequestLogFactory
+
+pytestmark = pytest.mark.django_db
+
+CHANGELIST_URL = reverse("admin:api_logs_apirequestlog_changelist")
+
+
+@pytest.fixture
+def logs():
+    now = timezone.now()
+    return [
+        APIRequestLogFactory(
+            created_at=now - timedelta(minutes=i),
+            response_status_code=200 if i % 2 else 503,
+        )
+        for i in range(5)
+    ]
+
+
+def test_estimate_count_is_postgresql_only(logs):
+    assert estimate_count(APIRequestLog.objects.all()) is None
+
+
+def test_paginator_falls_back_to_exact_count(logs):
+    paginator = EstimatedCountPaginator(APIRequestLog.objects.all(), 2)
+
+    assert paginator.count == 5  # noqa: PLR2004
+
+
+def test_cursor_round_trip(logs):
+    assert decode_cursor(encode_cursor(logs[0])) == (logs[0].pk, logs[0].created_at)
+
+
+def test_changelist_defers_large_columns(admin_client, logs):
+    response = admin_client.get(CHANGELIST_URL)
+
+    assert response.status_code == 200  # noqa: PLR2004
+    result = response.context["cl"].result_list[0]
+    assert "response_body" in result.get_deferred_fields()
+
+
+def test_changelist_status_class_filter(admin_client, logs):
+    response = admin_client.get(CHANGELIST_URL, {"response_status": "5xx"})
+
+    assert {log.response_status_code for log in response.context["cl"].result_list} == {
+        503,
+    }
+
+
+def test_changelist_keyset_pages(admin_client, logs):
+    url = f"{CHANGELIST_URL}?before={encode_cursor(logs[1])}"
+
+    response = admin_client.get(url)
+
+    assert [log.pk for log in response.context["cl"].result_list] == [
+        log.pk for log in logs[2:]
+    ]
+    assert "before=" not in response.context["cl"].get_query_string({"o": "1"})
+
+
+def test_changelist_links_to_older_entries(admin_client, logs, monkeypatch):
+    from api_logs.admin import APIRequestLogAdmin  # noqa: PLC0415
+
+    monkeypatch.setattr(APIRequestLogAdmin, "list_per_page", 2)
+
+    response = admin_client.get(CHANGELIST_URL)
+
+    assert response.context["cl"].next_cursor_url.endswith(
+        f"before={encode_cursor(logs[1])}",
+    )
+    assert b"Older entries" in response.content
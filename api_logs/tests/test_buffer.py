@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api_logs import buffer
+from api_logs.buffer import deserialize_log
+from api_logs.buffer import flush_log_buffer
+from api_logs.buffer import get_log_buffer
+from api_logs.buffer import save_log
+from api_logs.buffer import serialize_log
+from api_logs.models import APIRequestLog
+from api_logs.signals import flush_api_logs_on_shutdown
+from core.utils import core_api
+
+PROFILE_ENDPOINT = "/api/v1/instagram/web_app/fetch_user_info_by_username_v2"
+
+
+@pytest.fixture
+def memory_buffer(settings, monkeypatch):
+    settings.API_LOG_BUFFER = "memory"
+    settings.API_LOG_BUFFER_BATCH_SIZE = 3
+    settings.API_LOG_BUFFER_FLUSH_INTERVAL = 0
+    monkeypatch.setattr(buffer, "_buffer", None)
+    return get_log_buffer()
+
+
+def _log(**kwargs):
+    options = {
+        "method": "GET",
+        "url": "https://core.example.com/api/v1/health/check",
+        "status": APIRequestLog.STATUS_SUCCESS,
+    }
+    options.update(kwargs)
+    return APIRequestLog(**options)
+
+
+def test_buffering_is_off_by_default(settings):
+    settings.API_LOG_BUFFER = ""
+
+    assert get_log_buffer() is None
+
+
+@pytest.mark.django_db
+def test_save_log_writes_directly_without_buffer(settings):
+    settings.API_LOG_BUFFER = ""
+
+    save_log(_log())
+
+    assert APIRequestLog.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_logs_are_written_in_batches(memory_buffer):
+    save_log(_log())
+    save_log(_log())
+    assert APIRequestLog.objects.count() == 0
+
+    save_log(_log())
+
+    assert APIRequestLog.objects.count() == 3  # noqa: PLR2004
+    assert len(memory_buffer) == 0
+
+
+@pytest.mark.django_db
+def test_flush_keeps_the_request_time(memory_buffer):
+    requested_at = timezone.now() - timedelta(minutes=5)
+    save_log(_log(created_at=requested_at))
+
+    assert flush_log_buffer() == 1
+    assert APIRequestLog.objects.get().created_at == requested_at
+
+
+@pytest.mark.django_db
+def test_worker_shutdown_flushes_partial_batch(memory_buffer):
+    save_log(_log())
+
+    flush_api_logs_on_shutdown(sender=None)
+
+    assert APIRequestLog.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_make_request_skips_pending_row_when_buffered(memory_buffer, fake_core_api):
+    core_api.make_request("GET", PROFILE_ENDPOINT, params={"username": "alice"})
+    assert APIRequestLog.objects.count() == 0
+
+    flush_log_buffer()
+
+    api_log = APIRequestLog.objects.get()
+    assert api_log.status == APIRequestLog.STATUS_SUCCESS
+    assert api_log.response_status_code == 200  # noqa: PLR2004
+    assert api_log.response_body["data"]["username"] == "alice"
+
+
+def test_serialized_logs_round_trip():
+    original = _log(
+        created_at=timezone.now(),
+        request_params={"username": "alice"},
+        response_status_code=200,
+        duration_ms=12,
+    )
+
+    restored = deserialize_log(serialize_log(original))
+
+    assert restored.created_at == original.created_at
+    assert restored.request_params == {"username": "alice"}
+    assert restored.duration_ms == 12  # noqa: PLR2004
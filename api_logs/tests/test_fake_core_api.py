@@ -0,0 +1,121 @@
+import random
+
+import pytest
+import requests
+
+from api_logs.fake_core_api import FakeCoreAPIServer
+from api_logs.fake_core_api import FaultProfile
+from api_logs.fake_core_api import RecordedResponses
+from api_logs.fake_core_api import SyntheticResponses
+from api_logs.models import APIRequestLog
+from api_logs.tests.factories import APIRequestLogFactory
+from core.utils import instagram_api
+
+PROFILE_PATH = "/api/v1/instagram/web_app/fetch_user_info_by_username_v2"
+STORIES_PATH = "/api/v1/instagram/web_app/fetch_user_stories_by_username"
+
+
+@pytest.fixture
+def server():
+    with FakeCoreAPIServer() as fake:
+        yield fake
+
+
+def _get(server, path, **params):
+    return requests.get(f"{server.url}{path}", params=params, timeout=5)
+
+
+def test_synthetic_profile_is_stable_per_username(server):
+    first = _get(server, PROFILE_PATH, username="alice").json()
+    second = _get(server, PROFILE_PATH, username="alice").json()
+
+    assert first == second
+    assert first["data"]["status"] is True
+    assert first["data"]["username"] == "alice"
+    assert first["data"]["profile_pic_url"].startswith(server.url)
+
+
+def test_synthetic_story_media_is_served_locally(server):
+    server.sources = [SyntheticResponses(max_stories=10)]
+    items = []
+    for username in ("alice", "bob", "carol", "dave"):
+        body = _get(server, STORIES_PATH, username=username).json()
+        items.extend(body["data"]["data"]["items"])
+
+    assert items
+    media = requests.get(items[0]["thumbnail_url_original"], timeout=5)
+    assert media.status_code == 200  # noqa: PLR2004
+    assert media.content
+
+
+@pytest.mark.django_db
+def test_recorded_responses_are_replayed():
+    recorded_body = {"data": {"status": True, "username": "alice", "pk": "42"}}
+    APIRequestLogFactory(
+        url=f"https://core.example.com{PROFILE_PATH}",
+        request_params={"username": "alice"},
+        response_status_code=200,
+        response_body=recorded_body,
+        status=APIRequestLog.STATUS_SUCCESS,
+    )
+
+    with FakeCoreAPIServer(sources=[RecordedResponses()]) as fake:
+        exact = _get(fake, PROFILE_PATH, username="alice").json()
+        other = _get(fake, PROFILE_PATH, username="someone-else").json()
+        missing = _get(fake, STORIES_PATH, username="alice").json()
+
+    assert exact == recorded_body
+    assert other == recorded_body
+    assert missing["data"]["status"] is False
+
+
+def test_rate_limit_bursts_send_retry_after(server):
+    server.faults = FaultProfile(burst_every=4, burst_length=2, retry_after=3)
+
+    statuses = [
+        _get(server, PROFILE_PATH, username="alice").status_code for _ in range(8)
+    ]
+    limited = _get(server, PROFILE_PATH, username="alice")
+
+    assert statuses == [200, 200, 429, 429, 200, 200, 429, 429]
+    assert limited.status_code == 200  # noqa: PLR2004
+    assert server.stats()["statuses"] == {200: 5, 429: 4}
+
+
+def test_error_rate_returns_server_errors(server):
+    server.faults = FaultProfile(error_rate=1.0, seed=1)
+
+    response = _get(server, PROFILE_PATH, username="alice")
+
+    assert response.status_code in (502, 503, 504)
+
+
+def test_latency_distributions_stay_non_negative():
+    rng = random.Random(1)  # noqa: S311
+    uniform = FaultProfile(
+        latency_ms=10,
+        latency_distribution="uniform",
+        latency_jitter_ms=50,
+    )
+    lognormal = FaultProfile(latency_ms=10, latency_distribution="lognormal")
+
+    assert all(uniform.latency(rng) >= 0 for _ in range(100))
+    assert all(lognormal.latency(rng) > 0 for _ in range(100))
+    with pytest.raises(ValueError, match="Unknown latency distribution"):
+        FaultProfile(latency_distribution="pareto")
+
+
+def test_token_is_enforced():
+    with FakeCoreAPIServer(token="secret") as fake:  # noqa: S106
+        response = _get(fake, PROFILE_PATH, username="alice")
+
+    assert response.status_code == 401  # noqa: PLR2004
+
+
+def test_fixture_serves_the_instagram_api_client(fake_core_api):
+    response = instagram_api.fetch_user_info_by_username_v2("alice")
+
+    assert response["data"]["username"] == "alice"
+    assert fake_core_api.stats()["endpoints"] == {
+        "fetch_user_info_by_username_v2": 1,
+    }
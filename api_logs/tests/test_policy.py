@@ -0,0 +1,133 @@
+import dataclasses
+import hashlib
+import json
+
+import pytest
+
+from api_logs.models import APIRequestLog
+from api_logs.policy import LoggingPolicy
+from api_logs.policy import truncate_body
+from core.utils import core_api
+from core.utils.upstream_errors import UpstreamUnavailableError
+from settings.models import APILogSetting
+
+PROFILE_ENDPOINT = "/api/v1/instagram/web_app/fetch_user_info_by_username_v2"
+STORIES_URL = (
+    "https://core.example.com/api/v1/instagram/web_app/fetch_user_stories_by_username"
+)
+
+
+DEFAULT_POLICY = LoggingPolicy(
+    success_sample_rate=1.0,
+    max_body_bytes=0,
+    keep=frozenset(APILogSetting.LOG_PARTS),
+    endpoint_policies={},
+)
+
+
+def _policy(**kwargs):
+    return dataclasses.replace(DEFAULT_POLICY, **kwargs)
+
+
+def _log(status=APIRequestLog.STATUS_SUCCESS):
+    return APIRequestLog(
+        method="GET",
+        url=STORIES_URL,
+        request_headers={"Authorization": "Bearer token"},
+        request_params={"username": "alice"},
+        response_headers={"Content-Type": "application/json"},
+        response_body={"data": {"items": ["x" * 100]}},
+        status=status,
+    )
+
+
+def test_small_bodies_are_not_truncated():
+    body = {"data": {"status": True}}
+
+    assert truncate_body(body, 1024) is body
+    assert truncate_body(body, 0) is body
+
+
+def test_large_bodies_keep_head_and_remainder_digest():
+    body = {"items": ["x" * 500]}
+    encoded = json.dumps(body, separators=(",", ":")).encode()
+
+    truncated = truncate_body(body, 100)
+
+    assert truncated["truncated"] is True
+    assert truncated["size"] == len(encoded)
+    assert truncated["head"] == encoded[:100].decode()
+    assert truncated["remainder_sha256"] == hashlib.sha256(encoded[100:]).hexdigest()
+
+
+def test_endpoint_policy_overrides_defaults():
+    policy = _policy(
+        endpoint_policies={
+            "fetch_user_stories_by_username": {
+                "sample_rate": 0.25,
+                "keep": ["request_params"],
+            },
+        },
+    )
+
+    sample_rate, max_body_bytes, keep = policy.for_endpoint(
+        "fetch_user_stories_by_username",
+    )
+
+    assert sample_rate == 0.25  # noqa: PLR2004
+    assert max_body_bytes == 0
+    assert keep == {"request_params"}
+    assert policy.for_endpoint("other")[0] == 1.0
+
+
+def test_apply_drops_parts_that_are_not_kept():
+    policy = _policy(keep=frozenset({"request_params", "response_body"}))
+    api_log = _log()
+
+    policy.apply(api_log)
+
+    assert api_log.request_headers == {}
+    assert api_log.response_headers == {}
+    assert api_log.request_params == {"username": "alice"}
+    assert api_log.response_body == {"data": {"items": ["x" * 100]}}
+
+
+def test_unsampled_successes_are_dropped_but_errors_kept():
+    policy = _policy(success_sample_rate=0.0)
+    success = _log()
+    error = _log(status=APIRequestLog.STATUS_ERROR)
+    timeout = _log(status=APIRequestLog.STATUS_TIMEOUT)
+
+    assert policy.filter_logs([success, error, timeout]) == [error, timeout]
+
+
+def test_apply_records_the_sample_rate_of_successes_only():
+    policy = _policy(success_sample_rate=0.1)
+    success = _log()
+    error = _log(status=APIRequestLog.STATUS_ERROR)
+
+    policy.apply(success)
+    policy.apply(error)
+
+    assert success.sample_rate == 0.1  # noqa: PLR2004
+    assert error.sample_rate == 1.0
+
+
+@pytest.mark.django_db
+def test_make_request_follows_the_policy(fake_core_api):
+    APILogSetting.objects.update_or_create(
+        pk=1,
+        defaults={"success_sample_rate": 0.0, "keep_request_headers": False},
+    )
+
+    core_api.make_request("GET", PROFILE_ENDPOINT, params={"username": "alice"})
+    assert APIRequestLog.objects.count() == 0
+
+    fake_core_api.faults.error_rate = 1.0
+    with pytest.raises(UpstreamUnavailableError):
+        core_api.make_request("GET", PROFILE_ENDPOINT, params={"username": "alice"})
+
+    api_log = APIRequestLog.objects.get()
+    assert api_log.status == APIRequestLog.STATUS_ERROR
+    assert api_log.request_headers == {}
+    assert api_log.request_params == {"username": "alice"}
@@ -0,0 +1,97 @@
+from datetime import date
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api_logs.archive import archive_logs
+from api_logs.models import APIRequestLog
+from api_logs.partitions import add_months
+from api_logs.partitions import ensure_partitions
+from api_logs.partitions import is_partitioned
+from api_logs.partitions import partition_name
+from api_logs.partitions import purge_in_chunks
+from api_logs.tasks import purge_expired_api_logs
+from api_logs.tests.factories import APIRequestLogFactory
+
+
+def _logs(count, age_days):
+    created_at = timezone.now() - timedelta(days=age_days)
+    for _ in range(count):
+        APIRequestLogFactory(created_at=created_at)
+
+
+def test_add_months_rolls_over_years():
+    assert add_months(date(2026, 11, 1), 1) == date(2026, 12, 1)
+    assert add_months(date(2026, 12, 1), 1) == date(2027, 1, 1)
+    assert add_months(date(2027, 1, 1), -1) == date(2026, 12, 1)
+
+
+def test_partition_name_is_per_month():
+    assert partition_name(date(2026, 3, 1)) == "api_logs_apirequestlog_p202603"
+
+
+@pytest.mark.django_db
+def test_partitioning_is_skipped_on_other_databases():
+    assert not is_partitioned()
+    assert ensure_partitions(2) == []
+
+
+@pytest.mark.django_db
+def test_purge_in_chunks_deletes_only_expired_rows():
+    _logs(5, age_days=40)
+    _logs(2, age_days=1)
+
+    deleted = purge_in_chunks(
+        timezone.now() - timedelta(days=30),
+        chunk_size=2,
+        max_chunks=10,
+    )
+
+    assert deleted == 5  # noqa: PLR2004
+    assert APIRequestLog.objects.count() == 2  # noqa: PLR2004
+
+
+@pytest.mark.django_db
+def test_purge_in_chunks_is_bounded_per_run():
+    _logs(5, age_days=40)
+
+    deleted = purge_in_chunks(
+        timezone.now() - timedelta(days=30),
+        chunk_size=2,
+        max_chunks=2,
+    )
+
+    assert deleted == 4  # noqa: PLR2004
+    assert APIRequestLog.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_retention_task_falls_back_to_chunked_deletes(settings):
+    settings.API_LOG_PURGE_CHUNK_PAUSE = 0
+    settings.API_LOG_RETENTION_AFTER_ARCHIVE = False
+    _logs(3, age_days=10)
+    _logs(1, age_days=1)
+
+    result = purge_expired_api_logs(retention_days=7)
+
+    assert result["success"] is True
+    assert result["mode"] == "chunks"
+    assert result["deleted"] == 3  # noqa: PLR2004
+    assert APIRequestLog.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_retention_keeps_logs_not_archived_yet(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.API_LOG_PURGE_CHUNK_PAUSE = 0
+    _logs(2, age_days=12)
+    archive_logs(timezone.now() - timedelta(days=11), delete=False)
+    _logs(3, age_days=10)
+    _logs(1, age_days=1)
+
+    result = purge_expired_api_logs(retention_days=7)
+
+    # Only the archived logs are removed, the rest waits for the archive task
+    assert result["deleted"] == 2  # noqa: PLR2004
+    assert APIRequestLog.objects.count() == 4  # noqa: PLR2004
@@ -0,0 +1,180 @@
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from django.test import override_settings
+
+from api_logs.models import APIRequestLog
+from api_logs.models import APIRequestRollup
+from api_logs.models import RollupWatermark
+from api_logs.rollups import HISTOGRAM_BOUNDS
+from api_logs.rollups import bucket_index
+from api_logs.rollups import percentile
+from api_logs.rollups import purge_minute_rollups
+from api_logs.rollups import rollup_new_logs
+from api_logs.rollups import summarize
+from api_logs.tasks import rollup_api_logs
+from api_logs.tests.factories import APIRequestLogFactory
+
+pytestmark = pytest.mark.django_db
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=UTC)
+STORIES_URL = "https://core.example/api/fetch_user_stories_by_username"
+INFO_URL = "https://core.example/api/fetch_user_info_by_user_id"
+
+
+def _log(  # noqa: PLR0913
+    url=STORIES_URL,
+    minutes_ago=10,
+    duration_ms=100,
+    status=None,
+    code=200,
+    sample_rate=1.0,
+):
+    return APIRequestLogFactory(
+        url=url,
+        created_at=NOW - timedelta(minutes=minutes_ago),
+        duration_ms=duration_ms,
+        status=status or APIRequestLog.STATUS_SUCCESS,
+        response_status_code=code,
+        sample_rate=sample_rate,
+    )
+
+
+def _rollup(**kwargs):
+    return rollup_new_logs(now=NOW, **kwargs)
+
+
+def test_bucket_index_uses_log_scale_bounds():
+    assert bucket_index(1) == 0
+    assert bucket_index(100) == 20  # noqa: PLR2004
+    assert bucket_index(101) == 21  # noqa: PLR2004
+    assert bucket_index(10**6) == len(HISTOGRAM_BOUNDS)
+
+
+def test_percentile_interpolates_within_the_bucket():
+    histogram = {str(bucket_index(100)): 90, str(bucket_index(1000)): 10}
+
+    assert 79 < percentile(histogram, 0.5) <= 100  # noqa: PLR2004
+    assert 794 < percentile(histogram, 0.95) <= 1000  # noqa: PLR2004
+    assert percentile({}, 0.5) is None
+
+
+def test_percentile_of_overflow_bucket_is_bounded_by_max():
+    histogram = {str(len(HISTOGRAM_BOUNDS)): 1}
+
+    assert percentile(histogram, 1, max_ms=250_000) == 250_000  # noqa: PLR2004
+
+
+def test_rollup_counts_per_endpoint_minute_and_hour():
+    _log(minutes_ago=10, duration_ms=100)
+    _log(minutes_ago=10, duration_ms=300, status=APIRequestLog.STATUS_ERROR, code=500)
+    _log(minutes_ago=20, duration_ms=200)
+    _log(url=INFO_URL, minutes_ago=10, duration_ms=50)
+
+    result = _rollup()
+
+    assert result["processed"] == 4  # noqa: PLR2004
+    hour = APIRequestRollup.objects.get(
+        endpoint="fetch_user_stories_by_username",
+        granularity=APIRequestRollup.GRANULARITY_HOUR,
+    )
+    assert hour.bucket_start == datetime(2026, 1, 1, 11, 0, tzinfo=UTC)
+    assert hour.requests == 3  # noqa: PLR2004
+    assert hour.errors == 1
+    assert hour.status_code_counts == {"200": 2, "500": 1}
+    assert hour.duration_sum_ms == 600  # noqa: PLR2004
+    assert hour.duration_max_ms == 300  # noqa: PLR2004
+    assert (
+        APIRequestRollup.objects.filter(
+            endpoint="fetch_user_stories_by_username",
+            granularity=APIRequestRollup.GRANULARITY_MINUTE,
+        ).count()
+        == 2  # noqa: PLR2004
+    )
+
+
+def test_sampled_successes_are_weighted_by_their_sample_rate():
+    for _ in range(2):
+        _log(duration_ms=100, sample_rate=0.1)
+    _log(duration_ms=5000, status=APIRequestLog.STATUS_TIMEOUT, code=None)
+
+    _rollup()
+
+    stats = summarize(since=NOW - timedelta(hours=1))["fetch_user_stories_by_username"]
+    assert stats["requests"] == pytest.approx(21)
+    assert stats["errors"] == pytest.approx(1)
+    assert stats["error_rate"] == pytest.approx(1 / 21)
+    assert stats["p95_ms"] <= 100  # noqa: PLR2004
+
+
+def test_rollup_only_processes_new_logs():
+    _log(minutes_ago=10)
+    _rollup()
+    _log(minutes_ago=10)
+
+    result = _rollup()
+
+    assert result["processed"] == 1
+    hour = APIRequestRollup.objects.get(
+        granularity=APIRequestRollup.GRANULARITY_HOUR,
+    )
+    assert hour.requests == 2  # noqa: PLR2004
+    assert _rollup()["processed"] == 0
+
+
+@override_settings(API_LOG_ROLLUP_LAG_SECONDS=120)
+def test_rollup_stops_at_logs_younger_than_the_lag():
+    old = _log(minutes_ago=10)
+    recent = _log(minutes_ago=1)
+    _log(minutes_ago=10)  # written after the recent one, e.g. from a buffer
+
+    _rollup()
+
+    assert RollupWatermark.objects.get().last_log_id == old.pk
+    recent.created_at = NOW - timedelta(minutes=5)
+    recent.save()
+    assert _rollup()["processed"] == 2  # noqa: PLR2004
+
+
+def test_rollup_batches_until_caught_up():
+    for _ in range(5):
+        _log()
+
+    result = _rollup(batch_size=2)
+
+    assert result["processed"] == 5  # noqa: PLR2004
+    assert APIRequestRollup.objects.get(granularity="hour").requests == 5  # noqa: PLR2004
+
+
+def test_summarize_merges_buckets_into_percentiles():
+    for minutes_ago in range(1, 100):
+        _log(minutes_ago=minutes_ago + 5, duration_ms=100)
+    _log(minutes_ago=30, duration_ms=5000, status=APIRequestLog.STATUS_TIMEOUT)
+    _rollup()
+
+    stats = summarize(since=NOW - timedelta(hours=3))["fetch_user_stories_by_username"]
+
+    assert stats["requests"] == 100  # noqa: PLR2004
+    assert stats["errors"] == 1
+    assert stats["p50_ms"] <= 100  # noqa: PLR2004
+    assert stats["p99_ms"] <= 100  # noqa: PLR2004
+    assert stats["max_ms"] == 5000  # noqa: PLR2004
+
+
+def test_purge_minute_rollups_keeps_hours():
+    _log(minutes_ago=60 * 24 * 10)
+    _rollup()
+
+    assert purge_minute_rollups(retention_days=7) == 1
+    assert APIRequestRollup.objects.get().granularity == "hour"
+
+
+def test_rollup_task_reports_success():
+    _log(minutes_ago=60)
+
+    result = rollup_api_logs()
+
+    assert result["success"] is True
+    assert result["processed"] == 1
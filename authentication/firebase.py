@@ -1,4 +1,6 @@
+import contextlib
 import json
+import threading
 from typing import Any
 
 import firebase_admin
@@ -7,23 +9,27 @@ from firebase_admin import auth
 from firebase_admin import credentials
 
 
-def _get_firebase_credentials():
-    """Get Firebase credentials from database settings."""
+def _get_firebase_settings():
+    """Get Firebase settings from the cached settings layer."""
     try:
+        from settings.cache import get_setting  # noqa: PLC0415
         from settings.models import FirebaseAdminSetting  # noqa: PLC0415
     except ImportError as e:
         msg = "FirebaseAdminSetting model not found"
         raise ImproperlyConfigured(msg) from e
 
     try:
-        firebase_settings = FirebaseAdminSetting.get_solo()
+        return get_setting(FirebaseAdminSetting)
     except Exception as e:
         msg = "Cannot access Firebase settings"
         raise ImproperlyConfigured(msg) from e
 
-    if firebase_settings.service_account_json:
+
+def _get_firebase_credentials(service_account_json: str):
+    """Build Firebase credentials from the service account JSON content."""
+    if service_account_json:
         try:
-            service_account_data = json.loads(firebase_settings.service_account_json)
+            service_account_data = json.loads(service_account_json)
             return credentials.Certificate(service_account_data)
         except (json.JSONDecodeError, ValueError) as e:
             msg = "Invalid Firebase service account JSON content"
@@ -33,22 +39,34 @@ def _get_firebase_credentials():
     raise ImproperlyConfigured(msg)
 
 
+_app_lock = threading.Lock()
+_app_service_account_json: str | None = None
+
+
 def _get_firebase_app():
-    """Get Firebase app with real-time configuration from database."""
-    # Get credentials from database - will raise ImproperlyConfigured if not available
-    cred = _get_firebase_credentials()
+    """Get Firebase app, re-initialising it only when the configuration changes."""
+    global _app_service_account_json  # noqa: PLW0603
 
-    # Try to get existing default app first
-    try:
-        app = firebase_admin.get_app()
-        # Delete existing app to reload with fresh configuration
-        firebase_admin.delete_app(app)
-    except ValueError:
-        # No existing app, proceed with creating new one
-        pass
-
-    # Initialize with fresh credentials from database
-    return firebase_admin.initialize_app(cred)
+    service_account_json = _get_firebase_settings().service_account_json
+
+    with _app_lock:
+        if service_account_json and service_account_json == _app_service_account_json:
+            try:
+                return firebase_admin.get_app()
+            except ValueError:
+                pass
+
+        # Get credentials - will raise ImproperlyConfigured if not available
+        cred = _get_firebase_credentials(service_account_json)
+
+        # Delete the existing default app to reload with fresh configuration;
+        # ValueError means there is no app yet
+        with contextlib.suppress(ValueError):
+            firebase_admin.delete_app(firebase_admin.get_app())
+
+        app = firebase_admin.initialize_app(cred)
+        _app_service_account_json = service_account_json
+        return app
 
 
 def validate_token(token: str) -> dict[str, Any]:
@@ -318,6 +318,32 @@ CELERY_TASK_SEND_SENT_EVENT = True
 CELERY_WORKER_HIJACK_ROOT_LOGGER = False
 CELERY_RESULT_BACKEND = "django-db"
 CELERY_CACHE_BACKEND = "django-cache"
+# Each kind of work has its own queue and workers (compose/*/django/celery):
+# - fanout: publishers and schedulers, on the default prefork worker
+# - upstream: per-user Core API refreshes, on an I/O (thread) pool
+# - media: image and video downloads/uploads, on a separate I/O pool so large
+#   transfers never hold up refreshes
+# - interactive: refreshes triggered from the admin, served before upstream
+# Everything else (log maintenance, ...) stays on the default "celery" queue.
+# https://docs.celeryq.dev/en/stable/userguide/routing.html
+CELERY_TASK_ROUTES = {
+    "instagram.tasks.auto_update_users_profile": {"queue": "fanout"},
+    "instagram.tasks.auto_update_users_story": {"queue": "fanout"},
+    "instagram.tasks.schedule_profile_refreshes": {"queue": "fanout"},
+    "instagram.tasks.schedule_story_refreshes": {"queue": "fanout"},
+    "instagram.tasks.auto_update_user_profile": {"queue": "upstream"},
+    "instagram.tasks.auto_update_user_story": {"queue": "upstream"},
+    "instagram.tasks.batch_update_users_profile": {"queue": "upstream"},
+    "instagram.tasks.batch_update_users_story": {"queue": "upstream"},
+    "instagram.tasks.update_profile_picture_from_url": {"queue": "media"},
+    "instagram.tasks.download_stories_media": {"queue": "media"},
+    "instagram.tasks.backfill_profile_picture_blobs": {"queue": "media"},
+    "instagram.tasks.update_user_stories_from_api": {"queue": "interactive"},
+}
+# Workers poll their queues in the order given to -Q instead of round-robin,
+# so "-Q interactive,upstream" always serves the admin first
+# https://docs.celeryq.dev/projects/kombu/en/stable/reference/kombu.transport.redis.html
+CELERY_BROKER_TRANSPORT_OPTIONS = {"queue_order_strategy": "priority"}
 
 
 # django-allauth
@@ -368,3 +394,215 @@ SPECTACULAR_SETTINGS = {
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+
+# Settings cache
+# ------------------------------------------------------------------------------
+# Seconds a process may serve a memoised singleton setting before re-checking
+# the shared version key (admin edits become visible within this window)
+SETTINGS_CACHE_MAX_STALENESS = env.float("SETTINGS_CACHE_MAX_STALENESS", default=5)
+
+# Core API
+# ------------------------------------------------------------------------------
+# Number of per-host connection pools kept by the shared Core API session
+CORE_API_POOL_CONNECTIONS = env.int("CORE_API_POOL_CONNECTIONS", default=10)
+# Maximum number of keep-alive connections kept per host
+CORE_API_POOL_MAXSIZE = env.int("CORE_API_POOL_MAXSIZE", default=20)
+# Block instead of opening extra throwaway connections when a pool is exhausted
+CORE_API_POOL_BLOCK = env.bool("CORE_API_POOL_BLOCK", default=False)
+# Transport-level retries for idempotent requests (connection errors, 502/503/504)
+CORE_API_MAX_RETRIES = env.int("CORE_API_MAX_RETRIES", default=2)
+CORE_API_RETRY_BACKOFF_FACTOR = env.float("CORE_API_RETRY_BACKOFF_FACTOR", default=0.5)
+# In-flight upstream requests per batch refresh task (asyncio engine)
+CORE_API_ASYNC_CONCURRENCY = env.int("CORE_API_ASYNC_CONCURRENCY", default=20)
+# Users refreshed per batch task when the auto-update tasks run in batch mode
+CORE_API_BATCH_SIZE = env.int("CORE_API_BATCH_SIZE", default=100)
+
+# Instagram API response cache
+# ------------------------------------------------------------------------------
+# Seconds a successful response is served fresh, per endpoint (0 disables caching)
+INSTAGRAM_API_CACHE_TTLS = {
+    "fetch_user_info_by_username_v2": env.int(
+        "INSTAGRAM_API_CACHE_TTL_USER_INFO",
+        default=300,
+    ),
+    "fetch_user_info_by_user_id": env.int(
+        "INSTAGRAM_API_CACHE_TTL_USER_INFO",
+        default=300,
+    ),
+    "fetch_user_stories_by_username": env.int(
+        "INSTAGRAM_API_CACHE_TTL_USER_STORIES",
+        default=60,
+    ),
+}
+# Extra seconds an expired response is kept to be served stale
+INSTAGRAM_API_CACHE_STALE_TTL = env.int("INSTAGRAM_API_CACHE_STALE_TTL", default=3600)
+# Upper bound for a background refresh of a stale entry
+INSTAGRAM_API_CACHE_REFRESH_LOCK = 60
+# Seconds a caller waits for an identical in-flight call before calling directly
+INSTAGRAM_API_SINGLE_FLIGHT_TIMEOUT = env.int(
+    "INSTAGRAM_API_SINGLE_FLIGHT_TIMEOUT",
+    default=35,
+)
+# Seconds a coalesced result stays available to late waiters
+INSTAGRAM_API_SINGLE_FLIGHT_RESULT_TTL = 10
+# Seconds the caller making a coalesced call holds its lock. Keep it above
+# that call's worst case, or a second caller starts the same request: the
+# rate limit wait (CoreAPISetting.rate_limit_max_wait, 30s by default) plus
+# every transport attempt with make_request's 30s timeout and the backoff
+INSTAGRAM_API_SINGLE_FLIGHT_LOCK_TTL = env.int(
+    "INSTAGRAM_API_SINGLE_FLIGHT_LOCK_TTL",
+    default=60
+    + (CORE_API_MAX_RETRIES + 1) * 30
+    + int(CORE_API_RETRY_BACKOFF_FACTOR * 2 ** (CORE_API_MAX_RETRIES + 1)),
+)
+
+# Core API circuit breaker
+# ------------------------------------------------------------------------------
+# Fail fast instead of calling an endpoint that keeps erroring or timing out
+CORE_API_CIRCUIT_ENABLED = env.bool("CORE_API_CIRCUIT_ENABLED", default=True)
+# Failure rate (timeouts, connection errors, 5xx) that opens the circuit
+CORE_API_CIRCUIT_FAILURE_RATE = env.float("CORE_API_CIRCUIT_FAILURE_RATE", default=0.5)
+# Calls needed in the rolling window before the failure rate is trusted
+CORE_API_CIRCUIT_MIN_REQUESTS = env.int("CORE_API_CIRCUIT_MIN_REQUESTS", default=10)
+# Length in seconds of one counting window (the last two windows are used)
+CORE_API_CIRCUIT_WINDOW = env.int("CORE_API_CIRCUIT_WINDOW", default=60)
+# Seconds the circuit stays open before a half-open probe is allowed
+CORE_API_CIRCUIT_OPEN_SECONDS = env.int("CORE_API_CIRCUIT_OPEN_SECONDS", default=60)
+# Seconds other callers keep failing fast while the half-open probe is in flight
+CORE_API_CIRCUIT_PROBE_TIMEOUT = env.int("CORE_API_CIRCUIT_PROBE_TIMEOUT", default=35)
+
+# API request logs
+# ------------------------------------------------------------------------------
+# Buffer Core API request logs and write them in batches: "" (off), "memory"
+# (per process) or "redis" (shared stream, requires the django-redis cache)
+API_LOG_BUFFER = env("API_LOG_BUFFER", default="")
+# Buffered logs written per bulk insert; a full batch is written immediately
+API_LOG_BUFFER_BATCH_SIZE = env.int("API_LOG_BUFFER_BATCH_SIZE", default=200)
+# Seconds between background flushes of a partial batch (0 disables the timer)
+API_LOG_BUFFER_FLUSH_INTERVAL = env.float("API_LOG_BUFFER_FLUSH_INTERVAL", default=5)
+# Upper bound of logs kept while the database is unavailable
+API_LOG_BUFFER_MAX_SIZE = env.int("API_LOG_BUFFER_MAX_SIZE", default=10_000)
+# Days API request logs are kept; whole monthly partitions are dropped once
+# they are entirely older than this (PostgreSQL), otherwise rows are deleted
+API_LOG_RETENTION_DAYS = env.int("API_LOG_RETENTION_DAYS", default=30)
+# Detach expired partitions but keep their tables, to back up or drop by hand
+# (the archive only reads the log table)
+API_LOG_RETENTION_DETACH_ONLY = env.bool("API_LOG_RETENTION_DETACH_ONLY", default=False)
+# Never remove logs the archive task has not written yet; disable when logs
+# are not archived
+API_LOG_RETENTION_AFTER_ARCHIVE = env.bool(
+    "API_LOG_RETENTION_AFTER_ARCHIVE",
+    default=True,
+)
+# Monthly partitions created ahead of time by the retention task
+API_LOG_PARTITION_MONTHS_AHEAD = env.int("API_LOG_PARTITION_MONTHS_AHEAD", default=2)
+# Chunked deletes when the table is not partitioned: rows per statement,
+# statements per run and seconds of pause between statements
+API_LOG_PURGE_CHUNK_SIZE = env.int("API_LOG_PURGE_CHUNK_SIZE", default=5000)
+API_LOG_PURGE_MAX_CHUNKS = env.int("API_LOG_PURGE_MAX_CHUNKS", default=200)
+API_LOG_PURGE_CHUNK_PAUSE = env.float("API_LOG_PURGE_CHUNK_PAUSE", default=0.1)
+# Archive of old API logs (zstd NDJSON segments in the default storage)
+API_LOG_ARCHIVE_PREFIX = env("API_LOG_ARCHIVE_PREFIX", default="api_log_archive")
+# Archive logs older than this many days (keep below API_LOG_RETENTION_DAYS)
+API_LOG_ARCHIVE_AFTER_DAYS = env.int("API_LOG_ARCHIVE_AFTER_DAYS", default=21)
+# Rows per segment file, rows fetched per server-side cursor round trip, and
+# segments written per task run
+API_LOG_ARCHIVE_SEGMENT_ROWS = env.int("API_LOG_ARCHIVE_SEGMENT_ROWS", default=100_000)
+API_LOG_ARCHIVE_CHUNK_SIZE = env.int("API_LOG_ARCHIVE_CHUNK_SIZE", default=2000)
+API_LOG_ARCHIVE_MAX_SEGMENTS = env.int("API_LOG_ARCHIVE_MAX_SEGMENTS", default=20)
+API_LOG_ARCHIVE_ZSTD_LEVEL = env.int("API_LOG_ARCHIVE_ZSTD_LEVEL", default=9)
+# Per-endpoint minute/hour rollups of API logs: logs younger than the lag are
+# left for the next run (keep it above the Core API request timeout)
+API_LOG_ROLLUP_LAG_SECONDS = env.int("API_LOG_ROLLUP_LAG_SECONDS", default=120)
+# Logs aggregated per transaction and transactions per task run
+API_LOG_ROLLUP_BATCH_SIZE = env.int("API_LOG_ROLLUP_BATCH_SIZE", default=20_000)
+API_LOG_ROLLUP_MAX_BATCHES = env.int("API_LOG_ROLLUP_MAX_BATCHES", default=50)
+# Days minute rollups are kept (hour rollups are kept indefinitely)
+API_LOG_ROLLUP_MINUTE_RETENTION_DAYS = env.int(
+    "API_LOG_ROLLUP_MINUTE_RETENTION_DAYS",
+    default=7,
+)
+# The API log admin shows planner estimates instead of counting rows once a
+# result is estimated at this many rows or more (PostgreSQL)
+API_LOG_ADMIN_EXACT_COUNT_BELOW = env.int(
+    "API_LOG_ADMIN_EXACT_COUNT_BELOW",
+    default=100_000,
+)
+
+# Fan-out of per-user update tasks
+# ------------------------------------------------------------------------------
+# User ids fetched per server-side cursor round trip
+FANOUT_FETCH_CHUNK_SIZE = env.int("FANOUT_FETCH_CHUNK_SIZE", default=2000)
+# Users covered by each Celery group published at once
+FANOUT_PUBLISH_BATCH_SIZE = env.int("FANOUT_PUBLISH_BATCH_SIZE", default=500)
+# Seconds the progress counters of a fan-out run are kept in the cache
+FANOUT_PROGRESS_TTL = env.int("FANOUT_PROGRESS_TTL", default=60 * 60 * 24)
+
+# Staleness-driven refresh scheduler
+# ------------------------------------------------------------------------------
+# Seconds between runs of the schedule_*_refreshes beat tasks; each run spreads
+# its tasks over this window
+REFRESH_SCHEDULER_TICK_SECONDS = env.int("REFRESH_SCHEDULER_TICK_SECONDS", default=300)
+# Seconds after which an auto-updated profile is due again
+PROFILE_REFRESH_INTERVAL = env.int("PROFILE_REFRESH_INTERVAL", default=60 * 60 * 6)
+# Starting story poll interval of a user, adapted afterwards (see below)
+STORIES_REFRESH_INTERVAL = env.int("STORIES_REFRESH_INTERVAL", default=60 * 60)
+# Maximum users scheduled per tick for each kind of refresh
+PROFILE_REFRESH_BUDGET = env.int("PROFILE_REFRESH_BUDGET", default=500)
+STORIES_REFRESH_BUDGET = env.int("STORIES_REFRESH_BUDGET", default=500)
+
+# Adaptive story polling
+# ------------------------------------------------------------------------------
+# Bounds of a user's story poll interval in seconds (the maximum is also capped
+# below the 24h story lifetime)
+STORIES_POLL_MIN_INTERVAL = env.int("STORIES_POLL_MIN_INTERVAL", default=15 * 60)
+STORIES_POLL_MAX_INTERVAL = env.int("STORIES_POLL_MAX_INTERVAL", default=12 * 60 * 60)
+# Weight of the newest gap between stories in the smoothed gap
+STORIES_POLL_SMOOTHING = env.float("STORIES_POLL_SMOOTHING", default=0.3)
+# After new stories, poll again after this fraction of the smoothed gap
+STORIES_POLL_GAP_FRACTION = env.float("STORIES_POLL_GAP_FRACTION", default=0.5)
+# Interval growth factor after a poll that found nothing new
+STORIES_POLL_MISS_BACKOFF = env.float("STORIES_POLL_MISS_BACKOFF", default=1.5)
+
+# Per-user task locks
+# ------------------------------------------------------------------------------
+# Seconds a per-user refresh lock is held at most, from the moment the task is
+# queued until it finishes (plus any retry countdown); keep it above the
+# longest queue wait and run time
+TASK_LOCK_TTL = env.int("TASK_LOCK_TTL", default=30 * 60)
+
+# Upstream retries
+# ------------------------------------------------------------------------------
+# Per-user tasks retry transient upstream errors (rate limits, 5xx, timeouts)
+# after this many seconds, doubling per attempt up to the maximum, or after the
+# upstream's Retry-After if longer; permanent errors are not retried
+UPSTREAM_RETRY_BASE_DELAY = env.int("UPSTREAM_RETRY_BASE_DELAY", default=60)
+UPSTREAM_RETRY_MAX_DELAY = env.int("UPSTREAM_RETRY_MAX_DELAY", default=60 * 60)
+# Up to this fraction of the delay is added at random to spread retries out
+UPSTREAM_RETRY_JITTER = env.float("UPSTREAM_RETRY_JITTER", default=0.25)
+
+# Story media transfers
+# ------------------------------------------------------------------------------
+# Downloads in flight per download_stories_media task, and from a single host
+MEDIA_TRANSFER_CONCURRENCY = env.int("MEDIA_TRANSFER_CONCURRENCY", default=8)
+MEDIA_TRANSFER_PER_HOST_CONCURRENCY = env.int(
+    "MEDIA_TRANSFER_PER_HOST_CONCURRENCY",
+    default=4,
+)
+# Seconds to wait for a media server to connect or send data
+MEDIA_TRANSFER_TIMEOUT = env.float("MEDIA_TRANSFER_TIMEOUT", default=30)
+# Bytes read from a download at a time
+MEDIA_TRANSFER_CHUNK_SIZE = env.int("MEDIA_TRANSFER_CHUNK_SIZE", default=256 * 1024)
+# Downloads up to this many bytes stay in memory, larger ones go to a temp file
+MEDIA_TRANSFER_SPOOL_SIZE = env.int(
+    "MEDIA_TRANSFER_SPOOL_SIZE",
+    default=8 * 1024 * 1024,
+)
+# Seconds one media download or upload may take in total, checked between
+# chunks (Celery time limits are not enforced on the media worker's threads pool)
+MEDIA_TRANSFER_DEADLINE = env.float("MEDIA_TRANSFER_DEADLINE", default=10 * 60)
+# Users hashed per run of backfill_profile_picture_blobs
+PROFILE_PICTURE_BACKFILL_BATCH_SIZE = env.int(
+    "PROFILE_PICTURE_BACKFILL_BATCH_SIZE",
+    default=200,
+)
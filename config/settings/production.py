@@ -2,6 +2,7 @@
 import logging
 
 import sentry_sdk
+from boto3.s3.transfer import TransferConfig
 from sentry_sdk.integrations.celery import CeleryIntegration
 from sentry_sdk.integrations.django import DjangoIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
@@ -84,6 +85,19 @@ AWS_S3_ACCESS_KEY_ID = env.str("AWS_S3_ACCESS_KEY_ID", default="")
 AWS_S3_SECRET_ACCESS_KEY = env.str("AWS_S3_SECRET_ACCESS_KEY", default="")
 AWS_S3_CUSTOM_DOMAIN = env.str("AWS_S3_CUSTOM_DOMAIN", default="")
 AWS_S3_SIGNATURE_VERSION = "s3v4"
+# Files above the threshold are uploaded in parts, several parts at a time
+# https://boto3.amazonaws.com/v1/documentation/api/latest/reference/customizations/s3.html#boto3.s3.transfer.TransferConfig
+AWS_S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=env.int(
+        "MEDIA_UPLOAD_MULTIPART_THRESHOLD",
+        default=8 * 1024 * 1024,
+    ),
+    multipart_chunksize=env.int(
+        "MEDIA_UPLOAD_MULTIPART_CHUNK_SIZE",
+        default=8 * 1024 * 1024,
+    ),
+    max_concurrency=env.int("MEDIA_UPLOAD_CONCURRENCY", default=4),
+)
 
 
 # STATIC & MEDIA
@@ -0,0 +1,33 @@
+import pytest
+from django.core.cache import cache
+
+from api_logs.fake_core_api import FakeCoreAPIServer
+from settings.cache import clear_settings_cache
+from settings.models import CoreAPISetting
+
+FAKE_CORE_API_TOKEN = "fake-core-api-token"  # noqa: S105
+
+
+@pytest.fixture(autouse=True)
+def _clear_settings_cache():
+    # Memoised singletons would otherwise outlive the test transaction
+    clear_settings_cache()
+    yield
+    clear_settings_cache()
+
+
+@pytest.fixture
+def fake_core_api(db):
+    """A running fake Core API with the Core API settings pointed at it.
+
+    Adjust ``fake_core_api.faults`` or ``fake_core_api.sources`` in the test to
+    change its behaviour.
+    """
+    with FakeCoreAPIServer(token=FAKE_CORE_API_TOKEN) as server:
+        setting = CoreAPISetting.get_solo()
+        setting.api_url = server.url
+        setting.api_token = FAKE_CORE_API_TOKEN
+        setting.save()
+        # Drop cached responses, rate limit pauses and circuits from other tests
+        cache.clear()
+        yield server
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+import httpx
+
+from api_logs.models import APIRequestLog
+
+from .circuit_breaker import CircuitBreaker
+from .core_api import get_api_token
+from .core_api import get_api_url
+from .core_api import get_endpoint_name
+from .rate_limit import RateLimiter
+from .rate_limit import RateLimitTimeoutError
+from .rate_limit import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+USER_INFO_BY_USERNAME_V2_ENDPOINT = (
+    "/api/v1/instagram/web_app/fetch_user_info_by_username_v2"
+)
+USER_INFO_BY_USER_ID_ENDPOINT = "/api/v1/instagram/web_app/fetch_user_info_by_user_id"
+USER_STORIES_BY_USERNAME_ENDPOINT = (
+    "/api/v1/instagram/web_app/fetch_user_stories_by_username"
+)
+
+
+class AsyncCoreAPIClient:
+    """Asynchronous Core API client for refreshing many users concurrently.
+
+    Settings are resolved up front (see :meth:`from_settings`) so no database
+    access happens inside the event loop. ``APIRequestLog`` rows are built in
+    memory and collected in :attr:`logs`; callers persist them afterwards with
+    ``bulk_create``.
+
+    Usage::
+
+        client = AsyncCoreAPIClient.from_settings(concurrency=20)
+
+        async def run():
+            async with client:
+                return await asyncio.gather(...)
+
+        results = asyncio.run(run())
+        APIRequestLog.objects.bulk_create(client.logs)
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        base_url: str,
+        token: str,
+        concurrency: int = 20,
+        timeout: int = 30,
+        transport: httpx.AsyncBaseTransport | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.logs: list[APIRequestLog] = []
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @classmethod
+    def from_settings(cls, concurrency: int = 20, timeout: int = 30):
+        """Create a client from the configured Core API settings.
+
+        Raises:
+            ImproperlyConfigured: If API settings are not configured
+        """
+        return cls(
+            base_url=get_api_url(),
+            token=get_api_token(),
+            concurrency=concurrency,
+            timeout=timeout,
+            rate_limiter=RateLimiter.from_settings(),
+        )
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            transport=self.transport,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+
+    async def request(  # noqa: PLR0915
+        self,
+        method: str,
+        endpoint: str,
+        params: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Make a request and return the parsed JSON body.
+
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open
+            RateLimitTimeoutError: If no rate limit token was available in time
+            httpx.HTTPError: If the request fails or returns an error status
+        """
+        if self._client is None or self._semaphore is None:
+            msg = "AsyncCoreAPIClient must be used as an async context manager"
+            raise RuntimeError(msg)
+
+        endpoint_name = get_endpoint_name(endpoint)
+        if self.rate_limiter and not await self.rate_limiter.acquire_async(
+            endpoint_name,
+        ):
+            raise RateLimitTimeoutError(endpoint_name, self.rate_limiter.max_wait)
+
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        breaker = CircuitBreaker(endpoint_name)
+        async with self._semaphore:
+            # Checked right before sending, see core_api.make_request
+            await breaker.before_call_async()
+            api_log = APIRequestLog(
+                method=method.upper(),
+                url=url,
+                request_headers=dict(self.headers),
+                request_params=params or {},
+                request_body={},
+                status=APIRequestLog.STATUS_PENDING,
+            )
+            self.logs.append(api_log)
+
+            start_time = time.time()
+            try:
+                response = await self._client.request(
+                    method.upper(),
+                    url,
+                    params=params,
+                )
+            except httpx.TimeoutException as e:
+                await breaker.record_failure_async()
+                api_log.status = APIRequestLog.STATUS_TIMEOUT
+                api_log.duration_ms = int((time.time() - start_time) * 1000)
+                api_log.error_message = str(e)
+                logger.warning("Core API request timeout: %s", e)
+                raise
+            except httpx.HTTPError as e:
+                await breaker.record_failure_async()
+                api_log.status = APIRequestLog.STATUS_ERROR
+                api_log.duration_ms = int((time.time() - start_time) * 1000)
+                api_log.error_message = str(e)
+                logger.warning("Core API request failed: %s", e)
+                raise
+
+        api_log.duration_ms = int((time.time() - start_time) * 1000)
+        if response.is_server_error:
+            await breaker.record_failure_async()
+        else:
+            await breaker.record_success_async()
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if self.rate_limiter and retry_after and response.status_code in (429, 503):
+            await self.rate_limiter.pause_async(endpoint_name, retry_after)
+
+        api_log.response_status_code = response.status_code
+        api_log.response_headers = dict(response.headers)
+        try:
+            api_log.response_body = response.json()
+        except ValueError:
+            api_log.response_body = {"raw_content": response.text[:1000]}
+
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            api_log.status = APIRequestLog.STATUS_ERROR
+            api_log.error_message = str(e)
+            logger.warning("Core API request failed: %s", e)
+            raise
+
+        api_log.status = APIRequestLog.STATUS_SUCCESS
+        return response.json()
+
+    async def fetch_user_info_by_username_v2(self, username: str) -> dict[str, Any]:
+        """Async counterpart of ``instagram_api.fetch_user_info_by_username_v2``."""
+        return await self.request(
+            "GET",
+            USER_INFO_BY_USERNAME_V2_ENDPOINT,
+            params={"username": username},
+        )
+
+    async def fetch_user_info_by_user_id(self, user_id: str) -> dict[str, Any]:
+        """Async counterpart of ``instagram_api.fetch_user_info_by_user_id``."""
+        return await self.request(
+            "GET",
+            USER_INFO_BY_USER_ID_ENDPOINT,
+            params={"user_id": user_id},
+        )
+
+    async def fetch_user_stories_by_username(self, username: str) -> dict[str, Any]:
+        """Async counterpart of ``instagram_api.fetch_user_stories_by_username``."""
+        return await self.request(
+            "GET",
+            USER_STORIES_BY_USERNAME_ENDPOINT,
+            params={"username": username},
+        )
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "circuit:core_api"
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+    def __init__(self, endpoint_name: str, retry_after: float):
+        self.endpoint_name = endpoint_name
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuit open for {endpoint_name}, retry in {retry_after:.0f}s",
+        )
+
+
+class CircuitBreaker:
+    """Per-endpoint circuit breaker with its state in the shared cache.
+
+    Outcomes are counted in fixed windows of ``CORE_API_CIRCUIT_WINDOW``
+    seconds (current + previous window). Once at least
+    ``CORE_API_CIRCUIT_MIN_REQUESTS`` calls were seen and the failure rate
+    reaches ``CORE_API_CIRCUIT_FAILURE_RATE`` the circuit opens for
+    ``CORE_API_CIRCUIT_OPEN_SECONDS``. After that a single probe call is let
+    through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, endpoint_name: str):
+        self.endpoint_name = endpoint_name
+        self._key = f"{KEY_PREFIX}:{endpoint_name}"
+
+    @property
+    def _open_key(self):
+        return f"{self._key}:opened_until"
+
+    @property
+    def _probe_key(self):
+        return f"{self._key}:probe"
+
+    def _window_keys(self, now: float) -> list[tuple[str, str]]:
+        window = int(now // settings.CORE_API_CIRCUIT_WINDOW)
+        return [
+            (f"{self._key}:{bucket}:total", f"{self._key}:{bucket}:failures")
+            for bucket in (window, window - 1)
+        ]
+
+    def _incr(self, key: str) -> None:
+        cache.add(key, 0, timeout=settings.CORE_API_CIRCUIT_WINDOW * 2)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=settings.CORE_API_CIRCUIT_WINDOW * 2)
+
+    def _counts(self, now: float) -> tuple[int, int]:
+        keys = self._window_keys(now)
+        values = cache.get_many([key for pair in keys for key in pair])
+        total = sum(values.get(total_key, 0) for total_key, _ in keys)
+        failures = sum(values.get(failures_key, 0) for _, failures_key in keys)
+        return total, failures
+
+    def _open(self, now: float) -> None:
+        opened_until = now + settings.CORE_API_CIRCUIT_OPEN_SECONDS
+        cache.set(
+            self._open_key,
+            opened_until,
+            timeout=settings.CORE_API_CIRCUIT_OPEN_SECONDS * 10,
+        )
+        cache.delete(self._probe_key)
+        logger.warning(
+            "Circuit opened for %s for %ss",
+            self.endpoint_name,
+            settings.CORE_API_CIRCUIT_OPEN_SECONDS,
+        )
+
+    def reset(self) -> None:
+        """Close the circuit and forget the recorded outcomes."""
+        now = time.time()
+        keys = [key for pair in self._window_keys(now) for key in pair]
+        cache.delete_many([self._open_key, self._probe_key, *keys])
+
+    def before_call(self) -> None:
+        """Check the circuit before calling the endpoint.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe
+                already in flight
+        """
+        if not settings.CORE_API_CIRCUIT_ENABLED:
+            return
+
+        opened_until = cache.get(self._open_key)
+        if opened_until is None:
+            return
+
+        now = time.time()
+        if now < opened_until:
+            raise CircuitOpenError(self.endpoint_name, opened_until - now)
+
+        # Half-open: let exactly one probe through
+        if cache.add(
+            self._probe_key,
+            1,
+            timeout=settings.CORE_API_CIRCUIT_PROBE_TIMEOUT,
+        ):
+            logger.info("Circuit half-open for %s, sending probe", self.endpoint_name)
+            return
+        raise CircuitOpenError(
+            self.endpoint_name,
+            settings.CORE_API_CIRCUIT_PROBE_TIMEOUT,
+        )
+
+    def record_success(self) -> None:
+        if not settings.CORE_API_CIRCUIT_ENABLED:
+            return
+
+        now = time.time()
+        opened_until = cache.get(self._open_key)
+        if opened_until is not None and now >= opened_until:
+            self.reset()
+            logger.info(
+                "Circuit closed for %s after successful probe",
+                self.endpoint_name,
+            )
+            return
+
+        total_key, _ = self._window_keys(now)[0]
+        self._incr(total_key)
+
+    def record_failure(self) -> None:
+        if not settings.CORE_API_CIRCUIT_ENABLED:
+            return
+
+        now = time.time()
+        opened_until = cache.get(self._open_key)
+        if opened_until is not None:
+            if now >= opened_until:
+                # The half-open probe failed
+                self._open(now)
+            return
+
+        total_key, failures_key = self._window_keys(now)[0]
+        self._incr(total_key)
+        self._incr(failures_key)
+
+        total, failures = self._counts(now)
+        if (
+            total >= settings.CORE_API_CIRCUIT_MIN_REQUESTS
+            and failures / total >= settings.CORE_API_CIRCUIT_FAILURE_RATE
+        ):
+            self._open(now)
+
+    async def before_call_async(self) -> None:
+        """Asyncio counterpart of :meth:`before_call`.
+
+        The cache is read from a worker thread, so a Redis round trip does not
+        block the other coroutines of the event loop.
+        """
+        if settings.CORE_API_CIRCUIT_ENABLED:
+            await asyncio.to_thread(self.before_call)
+
+    async def record_success_async(self) -> None:
+        """Asyncio counterpart of :meth:`record_success`."""
+        if settings.CORE_API_CIRCUIT_ENABLED:
+            await asyncio.to_thread(self.record_success)
+
+    async def record_failure_async(self) -> None:
+        """Asyncio counterpart of :meth:`record_failure`."""
+        if settings.CORE_API_CIRCUIT_ENABLED:
+            await asyncio.to_thread(self.record_failure)
+
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected (not counting half-open)."""
+        opened_until = cache.get(self._open_key)
+        return opened_until is not None and time.time() < opened_until
+
+    def get_state(self) -> dict:
+        """Return a snapshot of the circuit for display."""
+        now = time.time()
+        total, failures = self._counts(now)
+        opened_until = cache.get(self._open_key)
+
+        if opened_until is None:
+            state = STATE_CLOSED
+        elif now < opened_until:
+            state = STATE_OPEN
+        else:
+            state = STATE_HALF_OPEN
+
+        return {
+            "endpoint": self.endpoint_name,
+            "state": state,
+            "requests": total,
+            "failures": failures,
+            "failure_rate": failures / total if total else 0.0,
+            "retry_after": max(opened_until - now, 0) if opened_until else 0,
+        }
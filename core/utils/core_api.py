@@ -5,15 +5,29 @@ from typing import Any
 import requests
 from django.core.exceptions import ImproperlyConfigured
 
+from api_logs.buffer import get_log_buffer
+from api_logs.buffer import save_log
 from api_logs.models import APIRequestLog
+from api_logs.policy import LoggingPolicy
+from settings.cache import get_setting
 from settings.models import CoreAPISetting
 
+from .circuit_breaker import CircuitBreaker
+from .http_session import PooledSessionManager
+from .rate_limit import RateLimiter
+from .rate_limit import RateLimitTimeoutError
+from .rate_limit import parse_retry_after
+from .upstream_errors import UpstreamUnavailableError
+from .upstream_errors import error_for_exception
+
 logger = logging.getLogger(__name__)
 
+_session_manager = PooledSessionManager("Core API")
+
 
 def get_api_url() -> str:
     """Retrieve Core API URL from settings."""
-    setting = CoreAPISetting.get_solo()
+    setting = get_setting(CoreAPISetting)
     if not setting.api_url:
         msg = "Core API URL is not configured in settings"
         raise ImproperlyConfigured(msg)
@@ -22,7 +36,7 @@ def get_api_url() -> str:
 
 def get_api_token() -> str:
     """Retrieve Core API token from settings."""
-    setting = CoreAPISetting.get_solo()
+    setting = get_setting(CoreAPISetting)
     if not setting.api_token:
         msg = "Core API token is not configured in settings"
         raise ImproperlyConfigured(msg)
@@ -30,22 +44,71 @@ def get_api_token() -> str:
 
 
 def get_core_api_session() -> requests.Session:
-    """Initialize and return requests session with configured settings."""
+    """Return the process-wide pooled session with configured settings.
+
+    The session keeps its keep-alive connections between calls and is rebuilt
+    automatically when the configured token changes or the process forks.
+    """
     token = get_api_token()
-    session = requests.Session()
-    session.headers.update(
+    return _session_manager.get_session(
         {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
         },
     )
-    return session
+
+
+def reset_core_api_session() -> None:
+    """Close the pooled Core API session so the next request rebuilds it."""
+    _session_manager.reset()
+
+
+def get_core_api_pool_stats() -> dict[str, int]:
+    """Return connection pool hit/miss counters for the current process."""
+    return _session_manager.stats()
+
+
+def get_endpoint_name(endpoint: str) -> str:
+    """Return the short endpoint name used for budgets, e.g. ``fetch_user_info_by_user_id``."""  # noqa: E501
+    return endpoint.strip("/").rsplit("/", 1)[-1]
+
+
+def _pause_on_retry_after(
+    limiter: RateLimiter,
+    endpoint_name: str,
+    response: requests.Response,
+) -> None:
+    """Pause the shared bucket when the upstream asks us to back off."""
+    if response.status_code not in (
+        requests.codes.too_many_requests,
+        requests.codes.service_unavailable,
+    ):
+        return
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if retry_after:
+        limiter.pause(endpoint_name, retry_after)
+
+
+def _record_outcome(breaker: CircuitBreaker, response: requests.Response) -> None:
+    """Count upstream server errors against the circuit, anything else as healthy."""
+    if response.status_code >= requests.codes.internal_server_error:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def _finish_log(api_log: APIRequestLog, policy: LoggingPolicy, *, sampled: bool):
+    """Persist a finished log if the logging policy keeps it."""
+    if not policy.should_log(api_log, sampled=sampled):
+        return
+    policy.apply(api_log)
+    save_log(api_log)
 
 
 def validate_settings() -> bool:
     """Validate Core API settings are properly configured."""
     try:
-        setting = CoreAPISetting.get_solo()
+        setting = get_setting(CoreAPISetting)
         return bool(
             setting.api_url
             and setting.api_url.strip()
@@ -56,7 +119,7 @@ def validate_settings() -> bool:
         return False
 
 
-def make_request(
+def make_request(  # noqa: PLR0915
     method: str,
     endpoint: str,
     data: dict[str, Any] | None = None,
@@ -77,7 +140,11 @@ def make_request(
 
     Raises:
         ImproperlyConfigured: If API settings are not configured
-        requests.RequestException: If request fails
+        CircuitOpenError: If the endpoint's circuit is open
+        RateLimitTimeoutError: If no rate limit token was available in time
+        UpstreamError: If the request fails; the subclass tells why
+            (rate-limited, unavailable, not found, auth) and whether a retry
+            can help, with the response's ``Retry-After`` when sent
     """
     base_url = get_api_url().rstrip("/")
     endpoint_clean = endpoint.lstrip("/")
@@ -85,8 +152,24 @@ def make_request(
 
     session = get_core_api_session()
 
+    # Wait for the shared per-endpoint budget before touching the network
+    endpoint_name = get_endpoint_name(endpoint)
+    limiter = RateLimiter.from_settings()
+    if not limiter.acquire(endpoint_name):
+        raise RateLimitTimeoutError(endpoint_name, limiter.max_wait)
+
+    # Fail fast while the endpoint is known to be failing. Checked last: a
+    # half-open circuit hands its single probe slot to this call, which must
+    # then reach the network and record an outcome to give it back.
+    breaker = CircuitBreaker(endpoint_name)
+    breaker.before_call()
+
+    # Successful calls are sampled; errors and timeouts are always logged
+    log_policy = LoggingPolicy.from_settings()
+    sampled = log_policy.sample(endpoint_name)
+
     # Create log entry
-    api_log = APIRequestLog.objects.create(
+    api_log = APIRequestLog(
         method=method.upper(),
         url=url,
         request_headers=dict(session.headers),
@@ -94,6 +177,9 @@ def make_request(
         request_body=data or {},
         status=APIRequestLog.STATUS_PENDING,
     )
+    if sampled and get_log_buffer() is None:
+        # Unbuffered logs are visible as pending while the call is in flight
+        api_log.save()
 
     start_time = time.time()
 
@@ -108,6 +194,8 @@ def make_request(
 
         # Calculate duration
         duration_ms = int((time.time() - start_time) * 1000)
+        _pause_on_retry_after(limiter, endpoint_name, response)
+        _record_outcome(breaker, response)
 
         # Update log with success
         api_log.response_status_code = response.status_code
@@ -120,21 +208,27 @@ def make_request(
         except ValueError:
             api_log.response_body = {"raw_content": response.text[:1000]}
 
-        api_log.save()
+        if response.ok:
+            # Error responses are logged once, by the handler below
+            _finish_log(api_log, log_policy, sampled=sampled)
 
         response.raise_for_status()
         return response  # noqa: TRY300
 
     except requests.exceptions.Timeout as e:
+        breaker.record_failure()
         duration_ms = int((time.time() - start_time) * 1000)
         api_log.status = APIRequestLog.STATUS_TIMEOUT
         api_log.duration_ms = duration_ms
         api_log.error_message = str(e)
-        api_log.save()
+        _finish_log(api_log, log_policy, sampled=sampled)
         logger.exception("Core API request timeout: %s", e)  # noqa: TRY401
-        raise
+        raise UpstreamUnavailableError(str(e)) from e
 
     except requests.RequestException as e:
+        if e.response is None:
+            # Connection errors; HTTP errors were already counted above
+            breaker.record_failure()
         duration_ms = int((time.time() - start_time) * 1000)
         api_log.status = APIRequestLog.STATUS_ERROR
         api_log.duration_ms = duration_ms
@@ -148,9 +242,9 @@ def make_request(
             except ValueError:
                 api_log.response_body = {"raw_content": e.response.text[:1000]}
 
-        api_log.save()
+        _finish_log(api_log, log_policy, sampled=sampled)
         logger.exception("Core API request failed: %s", e)  # noqa: TRY401
-        raise
+        raise error_for_exception(e) from e
 
 
 def check_connection() -> bool:
@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+from typing import Any
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_FORCELIST = (502, 503, 504)
+RETRY_ALLOWED_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+class PooledSessionManager:
+    """Process-wide pooled ``requests.Session`` holder.
+
+    One session (and therefore one set of keep-alive connection pools) is shared
+    by every caller in the process. The session is rebuilt when the default
+    headers change (e.g. a new API token) and after a fork, so prefork worker
+    children never reuse sockets inherited from the parent.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+        self._adapter: HTTPAdapter | None = None
+        self._fingerprint: tuple | None = None
+        self._pid: int | None = None
+        self._sessions_created = 0
+        self._retired_requests = 0
+        self._retired_connections = 0
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _build_adapter(self) -> HTTPAdapter:
+        retry = Retry(
+            total=settings.CORE_API_MAX_RETRIES,
+            read=0,
+            backoff_factor=settings.CORE_API_RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_FORCELIST,
+            allowed_methods=RETRY_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        return HTTPAdapter(
+            pool_connections=settings.CORE_API_POOL_CONNECTIONS,
+            pool_maxsize=settings.CORE_API_POOL_MAXSIZE,
+            pool_block=settings.CORE_API_POOL_BLOCK,
+            max_retries=retry,
+        )
+
+    def _pools(self) -> list[Any]:
+        if self._adapter is None:
+            return []
+        container = self._adapter.poolmanager.pools
+        return [container[key] for key in container.keys()]  # noqa: SIM118
+
+    def _retire_locked(self) -> None:
+        """Drop the current session, keeping its counters in the totals."""
+        for pool in self._pools():
+            self._retired_requests += pool.num_requests
+            self._retired_connections += pool.num_connections
+        if self._session is not None:
+            self._session.close()
+        self._session = None
+        self._adapter = None
+        self._fingerprint = None
+
+    def _after_fork(self) -> None:
+        # Start from a fresh lock in the child; the pid check in
+        # get_session() then drops the inherited session.
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def get_session(self, headers: dict[str, str]) -> requests.Session:
+        """Return the shared session, rebuilding it if the headers changed."""
+        fingerprint = tuple(sorted(headers.items()))
+        pid = os.getpid()
+
+        with self._lock:
+            if self._pid != pid:
+                # The inherited sockets belong to the parent process: forget
+                # them without closing.
+                self._session = None
+                self._adapter = None
+                self._fingerprint = None
+                self._pid = pid
+            if self._session is None or self._fingerprint != fingerprint:
+                if self._session is not None:
+                    logger.info("Rebuilding %s HTTP session", self.name)
+                self._retire_locked()
+                session = requests.Session()
+                session.headers.update(headers)
+                adapter = self._build_adapter()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+
+                self._session = session
+                self._adapter = adapter
+                self._fingerprint = fingerprint
+                self._sessions_created += 1
+            return self._session
+
+    def reset(self) -> None:
+        """Close the shared session; the next call builds a new one."""
+        with self._lock:
+            self._retire_locked()
+
+    def stats(self) -> dict[str, int]:
+        """Return connection reuse counters for this process.
+
+        ``pool_misses`` counts new connections opened, ``pool_hits`` counts
+        requests served over an already open keep-alive connection.
+        """
+        with self._lock:
+            pools = self._pools()
+            requests_count = self._retired_requests + sum(
+                pool.num_requests for pool in pools
+            )
+            connections = self._retired_connections + sum(
+                pool.num_connections for pool in pools
+            )
+            return {
+                "pid": os.getpid(),
+                "sessions_created": self._sessions_created,
+                "requests": requests_count,
+                "pool_hits": max(requests_count - connections, 0),
+                "pool_misses": connections,
+                "active_pools": len(pools),
+            }
@@ -1,23 +1,167 @@
+import contextlib
+import hashlib
+import json
 import logging
+import threading
+import time
 from typing import Any
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
 from .core_api import make_request
+from .single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
+CACHE_KEY_PREFIX = "instagram_api:response"
+CACHE_STATS_KEY_PREFIX = "instagram_api:cache_stats"
+CACHE_STATS_COUNTERS = ("hits", "stale_hits", "misses", "bypasses")
+
+
+def _cache_key(name: str, params: dict[str, Any]) -> str:
+    encoded = json.dumps(params, sort_keys=True, default=str)
+    digest = hashlib.sha256(encoded.encode()).hexdigest()[:32]
+    return f"{CACHE_KEY_PREFIX}:{name}:{digest}"
+
+
+def _incr_stat(name: str, counter: str) -> None:
+    key = f"{CACHE_STATS_KEY_PREFIX}:{name}:{counter}"
+    cache.add(key, 0, timeout=None)
+    # ValueError: evicted between add() and incr(); losing one sample is fine
+    with contextlib.suppress(ValueError):
+        cache.incr(key)
+
+
+def get_response_cache_stats() -> dict[str, dict[str, float]]:
+    """Return hit/miss counters and the hit ratio for every cached endpoint."""
+    stats = {}
+    for name in settings.INSTAGRAM_API_CACHE_TTLS:
+        keys = {
+            counter: f"{CACHE_STATS_KEY_PREFIX}:{name}:{counter}"
+            for counter in CACHE_STATS_COUNTERS
+        }
+        values = cache.get_many(keys.values())
+        counts = {counter: values.get(key, 0) for counter, key in keys.items()}
+        served = counts["hits"] + counts["stale_hits"]
+        lookups = served + counts["misses"]
+        counts["hit_ratio"] = served / lookups if lookups else 0.0
+        stats[name] = counts
+    return stats
+
+
+def _is_cacheable(data: dict[str, Any]) -> bool:
+    """Only successful upstream payloads are cached, never error bodies."""
+    payload = data.get("data") if isinstance(data, dict) else None
+    return bool(isinstance(payload, dict) and payload.get("status"))
+
+
+def _request_json(name: str, endpoint: str, params: dict[str, Any]) -> dict[str, Any]:
+    """Call the Core API, coalescing identical in-flight calls across workers."""
+    return single_flight(
+        _cache_key(name, params),
+        lambda: _call_and_cache(name, endpoint, params),
+        wait_timeout=settings.INSTAGRAM_API_SINGLE_FLIGHT_TIMEOUT,
+        result_ttl=settings.INSTAGRAM_API_SINGLE_FLIGHT_RESULT_TTL,
+        lock_ttl=settings.INSTAGRAM_API_SINGLE_FLIGHT_LOCK_TTL,
+    )
+
+
+def _call_and_cache(name: str, endpoint: str, params: dict[str, Any]) -> dict[str, Any]:
+    """Call the Core API and store a successful result in the response cache."""
+    response = make_request("GET", endpoint, params=params)
+    response.raise_for_status()
+    data = response.json()
+
+    ttl = settings.INSTAGRAM_API_CACHE_TTLS.get(name)
+    if ttl and _is_cacheable(data):
+        cache.set(
+            _cache_key(name, params),
+            {"data": data, "fetched_at": time.time()},
+            timeout=ttl + settings.INSTAGRAM_API_CACHE_STALE_TTL,
+        )
+    return data
+
+
+def _refresh_in_background(name: str, endpoint: str, params: dict[str, Any]) -> None:
+    """Refresh a stale cache entry in a background thread (one per key)."""
+    lock_key = f"{_cache_key(name, params)}:refreshing"
+    if not cache.add(lock_key, 1, timeout=settings.INSTAGRAM_API_CACHE_REFRESH_LOCK):
+        return
+
+    def refresh():
+        try:
+            _request_json(name, endpoint, params)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Background refresh of %s %s failed: %s", name, params, e)
+        finally:
+            cache.delete(lock_key)
+            # Connections are per-thread: release the ones this thread opened
+            connections.close_all()
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def _fetch(
+    name: str,
+    endpoint: str,
+    params: dict[str, Any],
+    *,
+    allow_stale: bool = False,
+    force_refresh: bool = False,
+) -> dict[str, Any]:
+    """Fetch ``endpoint`` through the TTL response cache.
+
+    Fresh entries (younger than the endpoint TTL) are served from the cache.
+    Expired entries are kept for ``INSTAGRAM_API_CACHE_STALE_TTL`` more
+    seconds: with ``allow_stale`` they are served immediately while a
+    background refresh runs, so callers keep getting data while the upstream
+    is slow or down. ``force_refresh`` skips the lookup but still stores the
+    result.
+    """
+    ttl = settings.INSTAGRAM_API_CACHE_TTLS.get(name)
+    if not ttl:
+        return _request_json(name, endpoint, params)
+
+    if force_refresh:
+        _incr_stat(name, "bypasses")
+        return _request_json(name, endpoint, params)
+
+    entry = cache.get(_cache_key(name, params))
+    if entry is not None:
+        age = time.time() - entry["fetched_at"]
+        if age < ttl:
+            _incr_stat(name, "hits")
+            return entry["data"]
+        if allow_stale:
+            _incr_stat(name, "stale_hits")
+            _refresh_in_background(name, endpoint, params)
+            return entry["data"]
+
+    _incr_stat(name, "misses")
+    return _request_json(name, endpoint, params)
+
 
-def fetch_user_info_by_username_v2(username: str) -> dict[str, Any]:
+def fetch_user_info_by_username_v2(
+    username: str,
+    *,
+    allow_stale: bool = False,
+    force_refresh: bool = False,
+) -> dict[str, Any]:
     """Fetch Instagram user information by username using Core API v2 endpoint.
 
     Args:
         username: Instagram username to fetch information for
+        allow_stale: Serve an expired cached response while it is refreshed
+        force_refresh: Bypass the response cache lookup
 
     Returns:
         Dictionary containing user information from the API response
 
     Raises:
         ImproperlyConfigured: If API settings are not configured
-        requests.RequestException: If the API request fails
+        UpstreamError: If the API request fails (see ``make_request``)
     """
     endpoint = "/api/v1/instagram/web_app/fetch_user_info_by_username_v2"
     params = {"username": username}
@@ -25,9 +169,13 @@ def fetch_user_info_by_username_v2(username: str) -> dict[str, Any]:
     logger.info("Fetching user info for username: %s", username)
 
     try:
-        response = make_request("GET", endpoint, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = _fetch(
+            "fetch_user_info_by_username_v2",
+            endpoint,
+            params,
+            allow_stale=allow_stale,
+            force_refresh=force_refresh,
+        )
     except Exception as e:
         logger.exception("Failed to fetch user info for username %s: %s", username, e)  # noqa: TRY401
         raise
@@ -36,18 +184,25 @@ def fetch_user_info_by_username_v2(username: str) -> dict[str, Any]:
         return data
 
 
-def fetch_user_info_by_user_id(user_id: str) -> dict[str, Any]:
+def fetch_user_info_by_user_id(
+    user_id: str,
+    *,
+    allow_stale: bool = False,
+    force_refresh: bool = False,
+) -> dict[str, Any]:
     """Fetch Instagram user information by user ID using Core API endpoint.
 
     Args:
         user_id: Instagram user ID to fetch information for
+        allow_stale: Serve an expired cached response while it is refreshed
+        force_refresh: Bypass the response cache lookup
 
     Returns:
         Dictionary containing user information from the API response
 
     Raises:
         ImproperlyConfigured: If API settings are not configured
-        requests.RequestException: If the API request fails
+        UpstreamError: If the API request fails (see ``make_request``)
     """
     endpoint = "/api/v1/instagram/web_app/fetch_user_info_by_user_id"
     params = {"user_id": user_id}
@@ -55,9 +210,13 @@ def fetch_user_info_by_user_id(user_id: str) -> dict[str, Any]:
     logger.info("Fetching user info for user_id: %s", user_id)
 
     try:
-        response = make_request("GET", endpoint, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = _fetch(
+            "fetch_user_info_by_user_id",
+            endpoint,
+            params,
+            allow_stale=allow_stale,
+            force_refresh=force_refresh,
+        )
     except Exception as e:
         logger.exception("Failed to fetch user info for user_id %s: %s", user_id, e)  # noqa: TRY401
         raise
@@ -66,18 +225,25 @@ def fetch_user_info_by_user_id(user_id: str) -> dict[str, Any]:
         return data
 
 
-def fetch_user_stories_by_username(username: str) -> dict[str, Any]:
+def fetch_user_stories_by_username(
+    username: str,
+    *,
+    allow_stale: bool = False,
+    force_refresh: bool = False,
+) -> dict[str, Any]:
     """Fetch Instagram user stories by username using Core API endpoint.
 
     Args:
         username: Instagram username to fetch stories for
+        allow_stale: Serve an expired cached response while it is refreshed
+        force_refresh: Bypass the response cache lookup
 
     Returns:
         Dictionary containing user stories from the API response
 
     Raises:
         ImproperlyConfigured: If API settings are not configured
-        requests.RequestException: If the API request fails
+        UpstreamError: If the API request fails (see ``make_request``)
     """
     endpoint = "/api/v1/instagram/web_app/fetch_user_stories_by_username"
     params = {"username": username}
@@ -85,9 +251,13 @@ def fetch_user_stories_by_username(username: str) -> dict[str, Any]:
     logger.info("Fetching stories for username: %s", username)
 
     try:
-        response = make_request("GET", endpoint, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = _fetch(
+            "fetch_user_stories_by_username",
+            endpoint,
+            params,
+            allow_stale=allow_stale,
+            force_refresh=force_refresh,
+        )
     except Exception as e:
         logger.exception("Failed to fetch stories for username %s: %s", username, e)  # noqa: TRY401
         raise
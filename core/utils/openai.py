@@ -3,6 +3,7 @@ import logging
 import openai
 from django.core.exceptions import ImproperlyConfigured
 
+from settings.cache import get_setting
 from settings.models import OpenAISetting
 
 logger = logging.getLogger(__name__)
@@ -10,7 +11,7 @@ logger = logging.getLogger(__name__)
 
 def get_api_key() -> str:
     """Retrieve OpenAI API key from settings."""
-    setting = OpenAISetting.get_solo()
+    setting = get_setting(OpenAISetting)
     if not setting.api_key:
         msg = "OpenAI API key is not configured in settings"
         raise ImproperlyConfigured(msg)
@@ -19,7 +20,7 @@ def get_api_key() -> str:
 
 def get_model_name() -> str:
     """Retrieve OpenAI model name from settings."""
-    setting = OpenAISetting.get_solo()
+    setting = get_setting(OpenAISetting)
     return setting.model_name
 
 
@@ -38,7 +39,7 @@ def get_openai_client(model_name: str | None = None) -> openai.OpenAI:
 def validate_settings() -> bool:
     """Validate OpenAI settings are properly configured."""
     try:
-        setting = OpenAISetting.get_solo()
+        setting = get_setting(OpenAISetting)
         return bool(setting.api_key and setting.api_key.strip())
     except (AttributeError, ImportError):
         return False
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "rate_limit:core_api"
+
+# Atomically refills and takes tokens from a bucket stored in a Redis hash.
+# Uses the Redis server clock so every worker agrees on elapsed time.
+# Returns {allowed, seconds_to_wait}.
+BUCKET_TAKE_SCRIPT = """
+local bucket_key = KEYS[1]
+local pause_key = KEYS[2]
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local paused_until = tonumber(redis.call('GET', pause_key) or '0')
+if paused_until > now then
+    return {0, tostring(paused_until - now)}
+end
+
+local state = redis.call('HMGET', bucket_key, 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    allowed = 1
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', bucket_key, 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', bucket_key, math.ceil(burst / rate) + 60)
+return {allowed, tostring(wait)}
+"""
+
+BUCKET_PAUSE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local until_ts = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if until_ts > current then
+    redis.call('SET', KEYS[1], tostring(until_ts), 'EX', math.ceil(ARGV[1]) + 1)
+end
+return tostring(until_ts)
+"""
+
+
+class RateLimitTimeoutError(Exception):
+    """Raised when no Core API token could be acquired in time."""
+
+    def __init__(self, endpoint_name: str, waited: float):
+        self.endpoint_name = endpoint_name
+        self.waited = waited
+        super().__init__(
+            f"Rate limit for {endpoint_name} not available after {waited:.1f}s",
+        )
+
+
+class RedisBucketBackend:
+    """Token buckets shared by every process through Redis."""
+
+    def __init__(self):
+        from django_redis import get_redis_connection  # noqa: PLC0415
+
+        client = get_redis_connection("default")
+        self._take = client.register_script(BUCKET_TAKE_SCRIPT)
+        self._pause = client.register_script(BUCKET_PAUSE_SCRIPT)
+
+    def take(self, name: str, rate: float, burst: int) -> tuple[bool, float]:
+        allowed, wait = self._take(
+            keys=[f"{KEY_PREFIX}:{name}", f"{KEY_PREFIX}:{name}:paused_until"],
+            args=[rate, burst, 1],
+        )
+        return bool(allowed), float(wait)
+
+    def pause(self, name: str, seconds: float) -> None:
+        self._pause(keys=[f"{KEY_PREFIX}:{name}:paused_until"], args=[seconds])
+
+
+class LocalBucketBackend:
+    """In-process token buckets, used when the cache is not Redis (dev, tests)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._paused_until: dict[str, float] = {}
+
+    def take(self, name: str, rate: float, burst: int) -> tuple[bool, float]:
+        with self._lock:
+            now = time.monotonic()
+            paused_until = self._paused_until.get(name, 0)
+            if paused_until > now:
+                return False, paused_until - now
+
+            tokens, ts = self._buckets.get(name, (burst, now))
+            tokens = min(burst, tokens + max(0, now - ts) * rate)
+            if tokens >= 1:
+                self._buckets[name] = (tokens - 1, now)
+                return True, 0.0
+            self._buckets[name] = (tokens, now)
+            return False, (1 - tokens) / rate
+
+    def pause(self, name: str, seconds: float) -> None:
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[name] = max(self._paused_until.get(name, 0), until)
+
+
+_backend: RedisBucketBackend | LocalBucketBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide bucket backend matching the cache backend."""
+    global _backend  # noqa: PLW0603
+    with _backend_lock:
+        if _backend is None:
+            cache_backend = settings.CACHES["default"]["BACKEND"]
+            if cache_backend.startswith("django_redis."):
+                _backend = RedisBucketBackend()
+            else:
+                _backend = LocalBucketBackend()
+        return _backend
+
+
+@dataclass(frozen=True)
+class RateLimiter:
+    """Per-endpoint token bucket limiter for Core API calls.
+
+    Build it with :meth:`from_settings` (reads ``CoreAPISetting``); the
+    instance holds a snapshot of the budgets, so it is safe to use inside an
+    event loop where the database must not be touched.
+    """
+
+    enabled: bool
+    default_rate: float
+    default_burst: int
+    endpoint_limits: dict
+    max_wait: float
+
+    @classmethod
+    def from_settings(cls):
+        from settings.cache import get_setting  # noqa: PLC0415
+        from settings.models import CoreAPISetting  # noqa: PLC0415
+
+        setting = get_setting(CoreAPISetting)
+        return cls(
+            enabled=setting.rate_limit_enabled,
+            default_rate=setting.rate_limit_per_second,
+            default_burst=setting.rate_limit_burst,
+            endpoint_limits=dict(setting.endpoint_rate_limits or {}),
+            max_wait=setting.rate_limit_max_wait,
+        )
+
+    def budget(self, endpoint_name: str) -> tuple[float, int]:
+        override = self.endpoint_limits.get(endpoint_name) or {}
+        rate = float(override.get("rate", self.default_rate))
+        burst = int(override.get("burst", self.default_burst))
+        return rate, max(burst, 1)
+
+    def try_acquire(self, endpoint_name: str) -> tuple[bool, float]:
+        """Take one token without waiting.
+
+        Returns:
+            ``(acquired, seconds_until_a_token_is_available)``
+        """
+        if not self.enabled:
+            return True, 0.0
+        rate, burst = self.budget(endpoint_name)
+        if rate <= 0:
+            return True, 0.0
+        return get_backend().take(endpoint_name, rate, burst)
+
+    def acquire(
+        self,
+        endpoint_name: str,
+        *,
+        blocking: bool = True,
+        timeout: float | None = None,
+    ) -> bool:
+        """Take one token for ``endpoint_name``.
+
+        Args:
+            endpoint_name: Endpoint whose budget to draw from
+            blocking: Wait for a token instead of returning immediately
+            timeout: Maximum seconds to wait, defaults to the configured max wait
+
+        Returns:
+            True if a token was taken, False otherwise
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            acquired, wait = self.try_acquire(endpoint_name)
+            if acquired:
+                return True
+            if not blocking or time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, endpoint_name: str) -> bool:
+        """Asyncio counterpart of :meth:`acquire`, waiting up to the max wait.
+
+        Buckets are taken from a worker thread, so a Redis round trip does
+        not block the other coroutines of the event loop.
+        """
+        if not self.enabled:
+            return True
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            acquired, wait = await asyncio.to_thread(self.try_acquire, endpoint_name)
+            if acquired:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+    def pause(self, endpoint_name: str, seconds: float) -> None:
+        """Stop handing out tokens for ``endpoint_name`` for ``seconds``."""
+        if not self.enabled or seconds <= 0:
+            return
+        logger.warning(
+            "Pausing Core API rate limit bucket %s for %.1fs",
+            endpoint_name,
+            seconds,
+        )
+        get_backend().pause(endpoint_name, seconds)
+
+    async def pause_async(self, endpoint_name: str, seconds: float) -> None:
+        """Asyncio counterpart of :meth:`pause`, run in a worker thread."""
+        if not self.enabled or seconds <= 0:
+            return
+        await asyncio.to_thread(self.pause, endpoint_name, seconds)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a ``Retry-After`` header (delta-seconds or HTTP-date) to seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - timezone.now()).total_seconds(), 0.0)
@@ -0,0 +1,74 @@
+import logging
+import time
+import uuid
+from collections.abc import Callable
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "single_flight"
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+_MISSING = object()
+
+
+def single_flight[T](
+    key: str,
+    func: Callable[[], T],
+    *,
+    wait_timeout: float,
+    result_ttl: int,
+    lock_ttl: int,
+) -> T:
+    """Run ``func`` once for concurrent identical calls across all processes.
+
+    The first caller for ``key`` takes a lock in the shared cache, runs
+    ``func`` and publishes its result for ``result_ttl`` seconds. Callers that
+    arrive while it is in flight wait for that result instead of repeating the
+    work. A waiter falls back to calling ``func`` itself if the leader fails
+    or if no result shows up within ``wait_timeout`` seconds.
+
+    ``func`` must return a picklable value; exceptions are not shared.
+    """
+    flight_key = f"{KEY_PREFIX}:{key}"
+    token = uuid.uuid4().hex
+
+    if cache.add(flight_key, token, timeout=lock_ttl):
+        try:
+            result = func()
+        except Exception:
+            cache.delete(flight_key)
+            raise
+        cache.set(f"{flight_key}:result:{token}", result, timeout=result_ttl)
+        cache.delete(flight_key)
+        return result
+
+    leader_token = cache.get(flight_key)
+    if leader_token is None:
+        # The leader finished between add() and get(); nothing to wait for
+        return func()
+
+    result_key = f"{flight_key}:result:{leader_token}"
+    deadline = time.monotonic() + wait_timeout
+    delay = POLL_INTERVAL
+    while time.monotonic() < deadline:
+        result = cache.get(result_key, _MISSING)
+        if result is not _MISSING:
+            logger.debug("Shared in-flight result for %s", key)
+            return result
+
+        if cache.get(flight_key) != leader_token:
+            # Leader is gone: either it just published, or it failed
+            result = cache.get(result_key, _MISSING)
+            if result is not _MISSING:
+                return result
+            logger.info("In-flight call for %s failed, calling directly", key)
+            return func()
+
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_POLL_INTERVAL)
+
+    logger.warning("Timed out waiting for in-flight call %s, calling directly", key)
+    return func()
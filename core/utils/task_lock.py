@@ -0,0 +1,255 @@
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from celery.exceptions import Retry
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "task_lock"
+RERUN_KEY_PREFIX = "task_lock_rerun"
+TOKEN_KWARG = "lock_token"  # noqa: S105
+
+# Replaces a lock only if it still holds the exact value the caller read, so
+# a task whose lock expired and was taken by another one cannot release or
+# extend the new holder's lock. An empty new value deletes the lock.
+# KEYS[1] lock, ARGV[1] expected value, ARGV[2] new value, ARGV[3] TTL in ms.
+REPLACE_IF_HELD_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] == '' then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+end
+return 1
+"""
+
+
+class RedisLockStore:
+    """Atomic compare-and-set of lock values in the django-redis cache."""
+
+    def __init__(self):
+        from django_redis import get_redis_connection  # noqa: PLC0415
+
+        self._client = get_redis_connection("default")
+        self._codec = cache.client  # type: ignore[attr-defined]
+        self._replace = self._client.register_script(REPLACE_IF_HELD_SCRIPT)
+
+    def replace(self, cache_key: str, token: str, value, ttl: float) -> bool:
+        """Set the lock to ``value`` (None deletes it) if ``token`` holds it."""
+        key = cache.make_key(cache_key)
+        current = self._client.get(key)
+        if current is None or self._codec.decode(current)["token"] != token:
+            return False
+        new = b"" if value is None else self._codec.encode(value)
+        return bool(
+            self._replace(keys=[key], args=[current, new, max(int(ttl * 1000), 1)]),
+        )
+
+
+class LocalLockStore:
+    """Check-then-write fallback for other caches (dev, tests); not atomic."""
+
+    def replace(self, cache_key: str, token: str, value, ttl: float) -> bool:
+        holder = cache.get(cache_key)
+        if holder is None or holder["token"] != token:
+            return False
+        if value is None:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, value, timeout=ttl)
+        return True
+
+
+_store: RedisLockStore | LocalLockStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide lock store matching the cache backend."""
+    global _store  # noqa: PLW0603
+    with _store_lock:
+        if _store is None:
+            cache_backend = settings.CACHES["default"]["BACKEND"]
+            if cache_backend.startswith("django_redis."):
+                _store = RedisLockStore()
+            else:
+                _store = LocalLockStore()
+        return _store
+
+
+class TaskLock:
+    """At most one task of a kind per key, queued or running.
+
+    The lock lives in the shared cache (Redis in production) under
+    ``task_lock:<kind>:<key>`` and is taken with an atomic ``add`` when the
+    task is published (``enqueue_once``), or when it starts if it was
+    published some other way (``hold_task_lock``). The task run releases it
+    when it finishes; a retry keeps it. Every lock expires after its TTL, so a
+    lost message or a killed worker never blocks the key for good.
+
+    A publisher that finds the lock held can ask for a rerun
+    (``request_rerun``): the holder then queues the task once more after it
+    releases the lock, so a change it may already have read past is not lost.
+    """
+
+    def __init__(self, kind: str, key: str):
+        self.kind = kind
+        self.key = str(key)
+        self.cache_key = f"{KEY_PREFIX}:{kind}:{self.key}"
+        self.rerun_key = f"{RERUN_KEY_PREFIX}:{kind}:{self.key}"
+
+    def acquire(self, ttl: float, *, task_name: str | None = None) -> str | None:
+        """Take the lock for ``ttl`` seconds; return its token, or None if held."""
+        token = uuid.uuid4().hex
+        now = time.time()
+        value = {
+            "token": token,
+            "task": task_name,
+            "acquired_at": now,
+            "expires_at": now + ttl,
+        }
+        if cache.add(self.cache_key, value, timeout=ttl):
+            return token
+        return None
+
+    def get(self) -> dict | None:
+        """Return the holder (token, task, acquired_at, expires_at), if any."""
+        return cache.get(self.cache_key)
+
+    def owned_by(self, token: str) -> bool:
+        holder = self.get()
+        return holder is not None and holder["token"] == token
+
+    def extend(self, token: str, ttl: float) -> bool:
+        """Keep the lock ``ttl`` more seconds if ``token`` still holds it."""
+        holder = self.get()
+        if holder is None or holder["token"] != token:
+            return False
+        return get_store().replace(
+            self.cache_key,
+            token,
+            {**holder, "expires_at": time.time() + ttl},
+            ttl,
+        )
+
+    def release(self, token: str | None = None) -> bool:
+        """Release the lock held with ``token``, or whoever holds it without one."""
+        if token is None:
+            cache.delete(self.cache_key)
+            return True
+        return get_store().replace(self.cache_key, token, None, 0)
+
+    def request_rerun(self) -> None:
+        """Ask the holder to queue the task again once it is done."""
+        cache.set(self.rerun_key, 1, timeout=settings.TASK_LOCK_TTL)
+
+    def take_rerun(self) -> bool:
+        """Clear a pending rerun request; return whether there was one."""
+        return bool(cache.delete(self.rerun_key))
+
+
+def held_locks(kind: str) -> list[str] | None:
+    """Return the keys of the held ``kind`` locks.
+
+    Listing needs the django-redis cache (``iter_keys``); returns None on
+    other backends.
+    """
+    iter_keys = getattr(cache, "iter_keys", None)
+    if iter_keys is None:
+        return None
+    prefix = f"{KEY_PREFIX}:{kind}:"
+    return [key.removeprefix(prefix) for key in iter_keys(f"{prefix}*")]
+
+
+def enqueue_once(
+    task,
+    lock: TaskLock,
+    *args,
+    countdown: float | None = None,
+    rerun_if_held: bool = False,
+    **kwargs,
+):
+    """Publish ``task`` unless a task of the lock's kind is queued or running.
+
+    The lock token is passed to the task as ``lock_token``, so the task
+    releases the lock when it is done (see ``hold_task_lock``).
+
+    With ``rerun_if_held`` a duplicate is not simply dropped: the holder is
+    asked to queue the task again when it is done, for callers whose change
+    the running task may already have read past.
+
+    Returns:
+        AsyncResult | None: The queued task, or None for a dropped duplicate
+    """
+    ttl = settings.TASK_LOCK_TTL + (countdown or 0)
+    token = lock.acquire(ttl, task_name=task.name)
+    if token is None and rerun_if_held:
+        lock.request_rerun()
+        # The holder checks for a rerun after releasing the lock, so if it
+        # released it in between, queue the task here instead
+        token = lock.acquire(ttl, task_name=task.name)
+        if token is not None:
+            lock.take_rerun()
+    if token is None:
+        logger.info("Dropped duplicate %s for %s", task.name, lock.key)
+        return None
+    try:
+        return task.apply_async(
+            args,
+            {**kwargs, TOKEN_KWARG: token},
+            countdown=countdown,
+        )
+    except Exception:
+        lock.release(token)
+        raise
+
+
+@contextmanager
+def hold_task_lock(task, lock: TaskLock, token: str | None):
+    """Hold ``lock`` for one run of a bound ``task``.
+
+    Yields False when another task holds the lock, in which case the run
+    should return without doing anything. A run published without a token (or
+    whose lock expired while it was queued) takes the lock itself, and its
+    token is added to the task's kwargs so a retry carries it. The lock is
+    kept across ``task.retry()`` and released once the run finishes, and the
+    task is queued again if a rerun was requested meanwhile.
+    """
+    if token is None or not lock.owned_by(token):
+        token = lock.acquire(settings.TASK_LOCK_TTL, task_name=task.name)
+        if token is None:
+            logger.info(
+                "Skipping %s for %s, another one is queued or running",
+                task.name,
+                lock.key,
+            )
+            yield False
+            return
+        if task.request.kwargs is not None:
+            task.request.kwargs[TOKEN_KWARG] = token
+
+    retrying = False
+    try:
+        yield True
+    except Retry as retry:
+        retrying = True
+        countdown = retry.when if isinstance(retry.when, int | float) else 0
+        lock.extend(token, settings.TASK_LOCK_TTL + countdown)
+        raise
+    finally:
+        if not retrying:
+            lock.release(token)
+            if lock.take_rerun():
+                kwargs = {
+                    name: value
+                    for name, value in (task.request.kwargs or {}).items()
+                    if name != TOKEN_KWARG
+                }
+                enqueue_once(task, lock, *task.request.args, **kwargs)
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from core.utils import circuit_breaker
+from core.utils import core_api
+from core.utils.async_core_api import AsyncCoreAPIClient
+from core.utils.circuit_breaker import STATE_CLOSED
+from core.utils.circuit_breaker import STATE_HALF_OPEN
+from core.utils.circuit_breaker import STATE_OPEN
+from core.utils.circuit_breaker import CircuitBreaker
+from core.utils.circuit_breaker import CircuitOpenError
+from core.utils.rate_limit import RateLimiter
+from core.utils.rate_limit import RateLimitTimeoutError
+
+CIRCUIT_SETTINGS = {
+    "CORE_API_CIRCUIT_ENABLED": True,
+    "CORE_API_CIRCUIT_FAILURE_RATE": 0.5,
+    "CORE_API_CIRCUIT_MIN_REQUESTS": 4,
+    "CORE_API_CIRCUIT_WINDOW": 60,
+    "CORE_API_CIRCUIT_OPEN_SECONDS": 30,
+    "CORE_API_CIRCUIT_PROBE_TIMEOUT": 10,
+}
+
+
+@pytest.fixture(autouse=True)
+def _circuit_settings():
+    cache.clear()
+    with override_settings(**CIRCUIT_SETTINGS):
+        yield
+    cache.clear()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable wall clock for the circuit breaker module only."""
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(
+        circuit_breaker,
+        "time",
+        SimpleNamespace(time=lambda: now.value),
+    )
+    return now
+
+
+def _trip(breaker):
+    for _ in range(4):
+        breaker.record_failure()
+
+
+def test_closed_circuit_allows_calls():
+    breaker = CircuitBreaker("fetch")
+
+    breaker.before_call()
+
+    assert breaker.get_state()["state"] == STATE_CLOSED
+
+
+def test_opens_once_failure_rate_is_reached(clock):
+    breaker = CircuitBreaker("fetch")
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.is_open()
+
+    breaker.record_failure()
+
+    assert breaker.is_open()
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.retry_after == 30  # noqa: PLR2004
+
+
+def test_failures_below_min_requests_do_not_open(clock):
+    breaker = CircuitBreaker("fetch")
+
+    for _ in range(3):
+        breaker.record_failure()
+
+    assert not breaker.is_open()
+
+
+def test_circuits_are_per_endpoint(clock):
+    _trip(CircuitBreaker("stories"))
+
+    CircuitBreaker("profile").before_call()
+
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = CircuitBreaker("fetch")
+    _trip(breaker)
+    clock.value += 31
+
+    breaker.before_call()
+
+    assert breaker.get_state()["state"] == STATE_HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_successful_probe_closes_circuit(clock):
+    breaker = CircuitBreaker("fetch")
+    _trip(breaker)
+    clock.value += 31
+    breaker.before_call()
+
+    breaker.record_success()
+
+    assert breaker.get_state()["state"] == STATE_CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_circuit(clock):
+    breaker = CircuitBreaker("fetch")
+    _trip(breaker)
+    clock.value += 31
+    breaker.before_call()
+
+    breaker.record_failure()
+
+    assert breaker.get_state()["state"] == STATE_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_disabled_circuit_never_opens():
+    breaker = CircuitBreaker("fetch")
+
+    with override_settings(CORE_API_CIRCUIT_ENABLED=False):
+        _trip(breaker)
+        breaker.before_call()
+
+    assert not breaker.is_open()
+
+
+def test_rate_limited_call_does_not_take_the_probe(clock, fake_core_api, monkeypatch):
+    breaker = CircuitBreaker("health")
+    _trip(breaker)
+    clock.value += 31
+    monkeypatch.setattr(RateLimiter, "acquire", lambda self, name: False)
+
+    with pytest.raises(RateLimitTimeoutError):
+        core_api.make_request("GET", "/api/v1/health")
+
+    # The probe slot is still free for the next call
+    breaker.before_call()
+    assert breaker.get_state()["state"] == STATE_HALF_OPEN
+
+
+def test_async_client_checks_the_circuit_off_the_event_loop(monkeypatch):
+    calls = []
+    for name in ("before_call", "record_success", "record_failure"):
+        method = getattr(CircuitBreaker, name)
+
+        def record_thread(self, method=method):
+            calls.append((method.__name__, threading.get_ident()))
+            return method(self)
+
+        monkeypatch.setattr(CircuitBreaker, name, record_thread)
+    client = AsyncCoreAPIClient(
+        base_url="https://core.example.com",
+        token="token",  # noqa: S106
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})),
+    )
+
+    async def run():
+        async with client:
+            return await client.request("GET", "/api/v1/health")
+
+    assert asyncio.run(run()) == {}
+    assert [name for name, _ in calls] == ["before_call", "record_success"]
+    assert threading.get_ident() not in {thread for _, thread in calls}
@@ -0,0 +1,85 @@
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from core.utils.http_session import PooledSessionManager
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_is_reused_for_same_headers():
+    manager = PooledSessionManager("test")
+
+    first = manager.get_session({"Authorization": "Bearer a"})
+    second = manager.get_session({"Authorization": "Bearer a"})
+
+    assert first is second
+    assert manager.stats()["sessions_created"] == 1
+
+
+def test_session_is_rebuilt_when_headers_change():
+    manager = PooledSessionManager("test")
+
+    first = manager.get_session({"Authorization": "Bearer a"})
+    second = manager.get_session({"Authorization": "Bearer b"})
+
+    assert first is not second
+    assert second.headers["Authorization"] == "Bearer b"
+    assert manager.stats()["sessions_created"] == 2  # noqa: PLR2004
+
+
+def test_session_is_rebuilt_in_forked_child(monkeypatch):
+    manager = PooledSessionManager("test")
+    parent_session = manager.get_session({"Authorization": "Bearer a"})
+
+    monkeypatch.setattr("core.utils.http_session.os.getpid", lambda: -1)
+    child_session = manager.get_session({"Authorization": "Bearer a"})
+
+    assert child_session is not parent_session
+
+
+def test_stats_count_reused_connections(http_server):
+    manager = PooledSessionManager("test")
+    session = manager.get_session({})
+
+    for _ in range(3):
+        session.get(f"{http_server}/", timeout=5).raise_for_status()
+
+    stats = manager.stats()
+    assert stats["requests"] == 3  # noqa: PLR2004
+    assert stats["pool_misses"] == 1
+    assert stats["pool_hits"] == 2  # noqa: PLR2004
+
+
+def test_stats_survive_reset(http_server):
+    manager = PooledSessionManager("test")
+    manager.get_session({}).get(f"{http_server}/", timeout=5)
+
+    manager.reset()
+
+    assert manager.stats()["requests"] == 1
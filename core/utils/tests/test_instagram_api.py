@@ -0,0 +1,114 @@
+from unittest import mock
+
+import pytest
+import requests
+from django.core.cache import cache
+
+from core.utils import instagram_api
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _response(payload):
+    response = mock.Mock()
+    response.json.return_value = payload
+    response.raise_for_status.return_value = None
+    return response
+
+
+OK_PAYLOAD = {"data": {"status": True, "username": "alice"}}
+ERROR_PAYLOAD = {"data": {"status": False, "errorMessage": "nope"}}
+
+
+def _expire_cached_entry(name, params):
+    key = instagram_api._cache_key(name, params)  # noqa: SLF001
+    entry = cache.get(key)
+    entry["fetched_at"] -= 3600
+    cache.set(key, entry)
+
+
+@pytest.fixture
+def make_request():
+    with mock.patch.object(instagram_api, "make_request") as patched:
+        patched.return_value = _response(OK_PAYLOAD)
+        yield patched
+
+
+def test_fresh_response_is_served_from_cache(make_request):
+    first = instagram_api.fetch_user_info_by_username_v2("alice")
+    second = instagram_api.fetch_user_info_by_username_v2("alice")
+
+    assert first == second == OK_PAYLOAD
+    assert make_request.call_count == 1
+    stats = instagram_api.get_response_cache_stats()["fetch_user_info_by_username_v2"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5  # noqa: PLR2004
+
+
+def test_force_refresh_bypasses_cache(make_request):
+    instagram_api.fetch_user_info_by_username_v2("alice")
+    instagram_api.fetch_user_info_by_username_v2("alice", force_refresh=True)
+
+    assert make_request.call_count == 2  # noqa: PLR2004
+
+
+def test_error_payloads_are_not_cached(make_request):
+    make_request.return_value = _response(ERROR_PAYLOAD)
+
+    instagram_api.fetch_user_info_by_username_v2("alice")
+    instagram_api.fetch_user_info_by_username_v2("alice")
+
+    assert make_request.call_count == 2  # noqa: PLR2004
+
+
+def test_stale_entry_is_served_while_refreshing(make_request, settings):
+    settings.INSTAGRAM_API_CACHE_TTLS = {"fetch_user_stories_by_username": 60}
+    instagram_api.fetch_user_stories_by_username("alice")
+    _expire_cached_entry("fetch_user_stories_by_username", {"username": "alice"})
+
+    with mock.patch.object(instagram_api, "_refresh_in_background") as refresh:
+        data = instagram_api.fetch_user_stories_by_username("alice", allow_stale=True)
+
+    assert data == OK_PAYLOAD
+    assert make_request.call_count == 1
+    refresh.assert_called_once()
+
+
+def test_background_refresh_failure_keeps_stale_entry(make_request, settings):
+    settings.INSTAGRAM_API_CACHE_TTLS = {"fetch_user_stories_by_username": 60}
+    instagram_api.fetch_user_stories_by_username("alice")
+    _expire_cached_entry("fetch_user_stories_by_username", {"username": "alice"})
+    make_request.side_effect = requests.ConnectionError("down")
+
+    with (
+        mock.patch.object(instagram_api.threading, "Thread") as thread,
+        mock.patch.object(instagram_api, "connections"),
+    ):
+        data = instagram_api.fetch_user_stories_by_username("alice", allow_stale=True)
+        # Run the background refresh inline
+        thread.call_args.kwargs["target"]()
+        again = instagram_api.fetch_user_stories_by_username("alice", allow_stale=True)
+
+    assert data == again == OK_PAYLOAD
+    assert make_request.call_count == 2  # noqa: PLR2004
+
+
+def test_single_flight_lock_outlives_the_leaders_call(make_request, settings):
+    with mock.patch.object(
+        instagram_api,
+        "single_flight",
+        side_effect=lambda key, func, **options: func(),
+    ) as coalesce:
+        instagram_api.fetch_user_info_by_username_v2("alice")
+
+    options = coalesce.call_args.kwargs
+    # Rate limit wait (30s by default) and every attempt with its 30s timeout
+    worst_case = 30 + (settings.CORE_API_MAX_RETRIES + 1) * 30
+    assert options["lock_ttl"] > worst_case
+    assert options["wait_timeout"] == settings.INSTAGRAM_API_SINGLE_FLIGHT_TIMEOUT
@@ -0,0 +1,120 @@
+import asyncio
+import dataclasses
+import threading
+from datetime import timedelta
+from email.utils import format_datetime
+
+import pytest
+from django.utils import timezone
+
+from core.utils import rate_limit
+from core.utils.rate_limit import LocalBucketBackend
+from core.utils.rate_limit import RateLimiter
+from core.utils.rate_limit import parse_retry_after
+
+
+@pytest.fixture(autouse=True)
+def local_backend(monkeypatch):
+    backend = LocalBucketBackend()
+    monkeypatch.setattr(rate_limit, "get_backend", lambda: backend)
+    return backend
+
+
+DEFAULT_LIMITER = RateLimiter(
+    enabled=True,
+    default_rate=1.0,
+    default_burst=2,
+    endpoint_limits={},
+    max_wait=0.0,
+)
+
+
+def _limiter(**kwargs):
+    return dataclasses.replace(DEFAULT_LIMITER, **kwargs)
+
+
+def test_burst_is_available_then_non_blocking_acquire_fails():
+    limiter = _limiter()
+
+    assert limiter.acquire("fetch", blocking=False)
+    assert limiter.acquire("fetch", blocking=False)
+    assert not limiter.acquire("fetch", blocking=False)
+
+
+def test_blocking_acquire_waits_for_refill():
+    limiter = _limiter(default_rate=50.0, default_burst=1, max_wait=1.0)
+
+    assert limiter.acquire("fetch")
+    assert limiter.acquire("fetch")
+
+
+def test_async_acquire_takes_tokens_off_the_event_loop(local_backend, monkeypatch):
+    limiter = _limiter()
+    take = local_backend.take
+    threads = []
+
+    def record_take(*args):
+        threads.append(threading.get_ident())
+        return take(*args)
+
+    monkeypatch.setattr(local_backend, "take", record_take)
+
+    assert asyncio.run(limiter.acquire_async("fetch"))
+    assert threads
+    assert threading.get_ident() not in threads
+
+
+def test_endpoint_overrides_take_precedence():
+    limiter = _limiter(endpoint_limits={"stories": {"rate": 3, "burst": 7}})
+
+    assert limiter.budget("stories") == (3.0, 7)
+    assert limiter.budget("profile") == (1.0, 2)
+
+
+def test_disabled_limiter_never_blocks():
+    limiter = _limiter(enabled=False, default_burst=1)
+
+    assert all(limiter.acquire("fetch", blocking=False) for _ in range(5))
+
+
+def test_pause_stops_handing_out_tokens():
+    limiter = _limiter(default_burst=5)
+
+    limiter.pause("fetch", 30)
+    acquired, wait = limiter.try_acquire("fetch")
+
+    assert not acquired
+    assert 29 < wait <= 30  # noqa: PLR2004
+
+
+def test_async_pause_runs_off_the_event_loop(local_backend, monkeypatch):
+    limiter = _limiter(default_burst=5)
+    pause = local_backend.pause
+    threads = []
+
+    def record_pause(*args):
+        threads.append(threading.get_ident())
+        pause(*args)
+
+    monkeypatch.setattr(local_backend, "pause", record_pause)
+
+    asyncio.run(limiter.pause_async("fetch", 30))
+
+    assert threads
+    assert threading.get_ident() not in threads
+    assert not limiter.try_acquire("fetch")[0]
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("12") == 12.0  # noqa: PLR2004
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_parse_retry_after_http_date():
+    retry_at = timezone.now() + timedelta(seconds=60)
+
+    seconds = parse_retry_after(format_datetime(retry_at, usegmt=True))
+
+    assert seconds is not None
+    assert 55 < seconds <= 60  # noqa: PLR2004
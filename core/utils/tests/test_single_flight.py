@@ -0,0 +1,105 @@
+import threading
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.core.cache import caches
+
+from core.utils.single_flight import single_flight
+
+OPTIONS = {"wait_timeout": 2, "result_ttl": 10, "lock_ttl": 10}
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_leader_runs_function_and_releases_lock():
+    func = mock.Mock(return_value={"ok": True})
+
+    assert single_flight("key", func, **OPTIONS) == {"ok": True}
+    assert func.call_count == 1
+    assert cache.get("single_flight:key") is None
+
+
+def test_concurrent_callers_share_the_leader_result(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    follower_waiting = threading.Event()
+    calls = []
+
+    # Cache instances are per thread, so patch the backend class
+    backend_class = type(caches["default"])
+    cache_get = backend_class.get
+
+    def get(self, key, *args, **kwargs):
+        value = cache_get(self, key, *args, **kwargs)
+        if key == "single_flight:key" and value is not None:
+            follower_waiting.set()
+        return value
+
+    monkeypatch.setattr(backend_class, "get", get)
+
+    def slow_call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"ok": True}
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(single_flight("key", slow_call, **OPTIONS)),
+    )
+    leader.start()
+    started.wait(5)
+
+    follower = threading.Thread(
+        target=lambda: results.append(single_flight("key", slow_call, **OPTIONS)),
+    )
+    follower.start()
+    # Only let the leader finish once the follower found its call in flight
+    assert follower_waiting.wait(5)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert results == [{"ok": True}, {"ok": True}]
+    assert len(calls) == 1
+
+
+def test_waiter_calls_directly_when_leader_fails():
+    cache.add("single_flight:key", "leader-token")
+    func = mock.Mock(return_value="direct")
+
+    def fail_leader():
+        cache.delete("single_flight:key")
+
+    timer = threading.Timer(0.1, fail_leader)
+    timer.start()
+    result = single_flight("key", func, **OPTIONS)
+    timer.join()
+
+    assert result == "direct"
+    assert func.call_count == 1
+
+
+def test_waiter_calls_directly_after_timeout():
+    cache.add("single_flight:key", "leader-token")
+    func = mock.Mock(return_value="direct")
+
+    result = single_flight("key", func, wait_timeout=0.1, result_ttl=10, lock_ttl=10)
+
+    assert result == "direct"
+    assert func.call_count == 1
+
+
+def test_leader_exception_is_raised_and_lock_released():
+    func = mock.Mock(side_effect=RuntimeError("boom"))
+
+    with pytest.raises(RuntimeError):
+        single_flight("key", func, **OPTIONS)
+
+    assert cache.get("single_flight:key") is None
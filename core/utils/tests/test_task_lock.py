@@ -0,0 +1,202 @@
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from celery.exceptions import Retry
+from django.core.cache import cache
+
+from core.utils.task_lock import TaskLock
+from core.utils.task_lock import enqueue_once
+from core.utils.task_lock import held_locks
+from core.utils.task_lock import hold_task_lock
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _task(*args, **kwargs):
+    return SimpleNamespace(
+        name="tests.refresh",
+        request=SimpleNamespace(args=args, kwargs=kwargs),
+        apply_async=mock.Mock(),
+    )
+
+
+def test_lock_is_exclusive_until_released():
+    lock = TaskLock("refresh", "user-1")
+
+    token = lock.acquire(60, task_name="tests.refresh")
+
+    assert token is not None
+    assert TaskLock("refresh", "user-1").acquire(60) is None
+    assert TaskLock("refresh", "user-2").acquire(60) is not None
+    assert TaskLock("other", "user-1").acquire(60) is not None
+    assert lock.get()["task"] == "tests.refresh"
+
+    assert lock.release("someone-else") is False
+    assert lock.release(token) is True
+    assert lock.acquire(60) is not None
+
+
+def test_expired_lock_taken_by_another_task_is_left_alone():
+    lock = TaskLock("refresh", "user-1")
+    stale = lock.acquire(60)
+    cache.delete(lock.cache_key)  # expired
+    token = lock.acquire(60)
+
+    assert lock.extend(stale, 600) is False
+    assert lock.release(stale) is False
+    assert lock.owned_by(token)
+    assert lock.get()["expires_at"] == pytest.approx(time.time() + 60, abs=5)
+
+
+def test_enqueue_once_drops_duplicates(settings):
+    settings.TASK_LOCK_TTL = 600
+    task = mock.Mock()
+    task.name = "tests.refresh"
+    lock = TaskLock("refresh", "user-1")
+
+    first = enqueue_once(task, lock, "user-1", countdown=30)
+    second = enqueue_once(task, lock, "user-1")
+
+    assert first is task.apply_async.return_value
+    assert second is None
+    task.apply_async.assert_called_once()
+    args, kwargs = task.apply_async.call_args.args
+    assert args == ("user-1",)
+    assert lock.owned_by(kwargs["lock_token"])
+    assert lock.get()["expires_at"] == pytest.approx(time.time() + 630, abs=5)
+
+
+def test_enqueue_once_releases_the_lock_if_publishing_fails():
+    task = mock.Mock()
+    task.name = "tests.refresh"
+    task.apply_async.side_effect = ConnectionError("broker down")
+    lock = TaskLock("refresh", "user-1")
+
+    with pytest.raises(ConnectionError):
+        enqueue_once(task, lock, "user-1")
+
+    assert lock.get() is None
+
+
+def test_enqueue_once_can_ask_the_holder_for_a_rerun():
+    task = _task()
+    lock = TaskLock("refresh", "user-1")
+    token = lock.acquire(60)
+
+    assert enqueue_once(task, lock, "user-1", rerun_if_held=True) is None
+    task.apply_async.assert_not_called()
+
+    with hold_task_lock(_task("user-1", lock_token=token), lock, token):
+        pass
+
+    assert lock.take_rerun() is False
+    assert lock.get() is not None
+
+
+def test_requested_rerun_is_queued_after_the_run():
+    lock = TaskLock("refresh", "user-1")
+    token = lock.acquire(60)
+    task = _task("user-1", lock_token=token, full=True)
+
+    with hold_task_lock(task, lock, token):
+        lock.request_rerun()
+
+    task.apply_async.assert_called_once()
+    args, kwargs = task.apply_async.call_args.args
+    assert args == ("user-1",)
+    assert kwargs["full"] is True
+    assert lock.owned_by(kwargs["lock_token"])
+    assert lock.take_rerun() is False
+
+
+def test_rerun_request_after_the_release_queues_the_task_directly():
+    task = _task()
+    lock = TaskLock("refresh", "user-1")
+    token = lock.acquire(60)
+    acquire = lock.acquire
+
+    def holder_releases_meanwhile(*args, **kwargs):
+        lock.release(token)
+        lock.acquire = acquire
+
+    lock.acquire = holder_releases_meanwhile
+
+    assert enqueue_once(task, lock, "user-1", rerun_if_held=True) is not None
+    task.apply_async.assert_called_once()
+    assert lock.take_rerun() is False
+
+
+def test_task_run_releases_the_lock_it_was_queued_with():
+    lock = TaskLock("refresh", "user-1")
+    token = lock.acquire(60)
+
+    with hold_task_lock(_task(lock_token=token), lock, token) as held:
+        assert held is True
+        assert lock.owned_by(token)
+
+    assert lock.get() is None
+
+
+def test_task_run_without_token_takes_the_lock_or_skips():
+    lock = TaskLock("refresh", "user-1")
+    task = _task()
+
+    with hold_task_lock(task, lock, None) as held:
+        assert held is True
+        token = task.request.kwargs["lock_token"]
+        assert lock.owned_by(token)
+
+        with hold_task_lock(_task(), lock, None) as duplicate_held:
+            assert duplicate_held is False
+        assert lock.owned_by(token)
+
+    assert lock.get() is None
+
+
+def test_retry_keeps_the_lock_for_the_retried_run(settings):
+    settings.TASK_LOCK_TTL = 600
+    lock = TaskLock("refresh", "user-1")
+    token = lock.acquire(60)
+
+    with (
+        pytest.raises(Retry),
+        hold_task_lock(_task(lock_token=token), lock, token),
+    ):
+        raise Retry(when=300)
+
+    assert lock.owned_by(token)
+    assert lock.get()["expires_at"] == pytest.approx(time.time() + 900, abs=5)
+
+
+def test_failed_run_releases_the_lock():
+    lock = TaskLock("refresh", "user-1")
+    token = lock.acquire(60)
+
+    def run():
+        with hold_task_lock(_task(lock_token=token), lock, token):
+            msg = "boom"
+            raise ValueError(msg)
+
+    with pytest.raises(ValueError, match="boom"):
+        run()
+
+    assert lock.get() is None
+
+
+def test_held_locks_requires_key_listing(monkeypatch):
+    assert held_locks("refresh") is None
+
+    monkeypatch.setattr(
+        cache,
+        "iter_keys",
+        lambda pattern: iter(["task_lock:refresh:user-1"]),
+        raising=False,
+    )
+    assert held_locks("refresh") == ["user-1"]
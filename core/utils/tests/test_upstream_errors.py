@@ -0,0 +1,107 @@
+import pytest
+import requests
+
+from core.utils.circuit_breaker import CircuitOpenError
+from core.utils.upstream_errors import PrivateAccountError
+from core.utils.upstream_errors import RetryPolicy
+from core.utils.upstream_errors import UpstreamAuthError
+from core.utils.upstream_errors import UpstreamError
+from core.utils.upstream_errors import UpstreamNotFoundError
+from core.utils.upstream_errors import UpstreamRateLimitedError
+from core.utils.upstream_errors import UpstreamUnavailableError
+from core.utils.upstream_errors import error_for_exception
+from core.utils.upstream_errors import error_for_payload
+from core.utils.upstream_errors import is_retryable
+
+POLICY = RetryPolicy(base_delay=60, max_delay=600, jitter=0.25)
+
+
+def _http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+@pytest.mark.parametrize(
+    ("status", "error_class"),
+    [
+        (429, UpstreamRateLimitedError),
+        (502, UpstreamUnavailableError),
+        (503, UpstreamUnavailableError),
+        (404, UpstreamNotFoundError),
+        (401, UpstreamAuthError),
+        (403, UpstreamAuthError),
+        (400, UpstreamError),
+    ],
+)
+def test_http_errors_are_classified_by_status(status, error_class):
+    error = error_for_exception(_http_error(status))
+
+    assert type(error) is error_class
+    assert error.status_code == status
+    assert isinstance(error, requests.RequestException)
+
+
+def test_retry_after_is_kept():
+    error = error_for_exception(_http_error(429, {"Retry-After": "120"}))
+
+    assert error.retry_after == 120  # noqa: PLR2004
+
+
+def test_connection_failures_are_unavailable():
+    assert isinstance(
+        error_for_exception(requests.ConnectionError("refused")),
+        UpstreamUnavailableError,
+    )
+    assert isinstance(
+        error_for_exception(requests.ReadTimeout("slow")),
+        UpstreamUnavailableError,
+    )
+
+
+@pytest.mark.parametrize(
+    ("message", "error_class"),
+    [
+        ("User not found", UpstreamNotFoundError),
+        ("This account is private", PrivateAccountError),
+        ("Rate limit exceeded, please wait", UpstreamRateLimitedError),
+        ("Something odd happened", UpstreamError),
+    ],
+)
+def test_payload_errors_are_classified(message, error_class):
+    error = error_for_payload({"status": False, "errorMessage": message}, "failed")
+
+    assert type(error) is error_class
+
+
+def test_retryable_errors():
+    assert is_retryable(UpstreamRateLimitedError("slow down"))
+    assert is_retryable(UpstreamUnavailableError("502"))
+    assert is_retryable(CircuitOpenError("endpoint", 30))
+    assert is_retryable(_http_error(503))
+    assert is_retryable(OSError("disk"))
+    assert not is_retryable(UpstreamNotFoundError("gone"))
+    assert not is_retryable(PrivateAccountError("private"))
+    assert not is_retryable(_http_error(404))
+    assert not is_retryable(ValueError("bad data"))
+
+
+def test_policy_backs_off_exponentially_with_jitter():
+    error = UpstreamUnavailableError("502")
+
+    for retries, base in ((0, 60), (1, 120), (2, 240), (5, 600)):
+        delay = POLICY.delay(error, retries)
+        assert base <= delay <= base * 1.25
+
+
+def test_policy_waits_at_least_retry_after():
+    error = UpstreamRateLimitedError("slow down", retry_after=900)
+
+    assert 900 <= POLICY.delay(error, 0) <= 900 * 1.25  # noqa: PLR2004
+    assert POLICY.delay(_http_error(429, {"Retry-After": "300"}), 0) >= 300  # noqa: PLR2004
+
+
+def test_policy_gives_up_on_permanent_errors():
+    assert POLICY.delay(PrivateAccountError("private"), 0) is None
+    assert POLICY.delay(UpstreamAuthError("401"), 0) is None
@@ -0,0 +1,154 @@
+import random
+from dataclasses import dataclass
+from http import HTTPStatus
+
+import requests
+from django.conf import settings
+
+from .circuit_breaker import CircuitOpenError
+from .rate_limit import RateLimitTimeoutError
+from .rate_limit import parse_retry_after
+
+
+class UpstreamError(requests.RequestException):
+    """A classified failure of the Core API or of Instagram behind it.
+
+    Subclasses tell whether trying again can help (``retryable``) and carry
+    the upstream's ``Retry-After`` hint in seconds, if it sent one. The base
+    class is used for failures that are neither (e.g. an unexpected 4xx).
+    """
+
+    retryable = False
+
+    def __init__(
+        self,
+        message: str,
+        *,
+        status_code: int | None = None,
+        retry_after: float | None = None,
+        response=None,
+    ):
+        super().__init__(message, response=response)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class UpstreamRateLimitedError(UpstreamError):
+    """HTTP 429, or an upstream message asking us to slow down."""
+
+    retryable = True
+
+
+class UpstreamUnavailableError(UpstreamError):
+    """5xx responses, timeouts and connection failures."""
+
+    retryable = True
+
+
+class UpstreamNotFoundError(UpstreamError):
+    """The account (or endpoint) does not exist."""
+
+
+class PrivateAccountError(UpstreamError):
+    """The account is private, so its data is not available."""
+
+
+class UpstreamAuthError(UpstreamError):
+    """The Core API rejected our credentials (401/403)."""
+
+
+# Lower-case fragments of Core API ``errorMessage`` values, checked in order
+PAYLOAD_ERROR_MARKERS = (
+    (PrivateAccountError, ("private",)),
+    (UpstreamNotFoundError, ("not found", "does not exist", "no user")),
+    (UpstreamRateLimitedError, ("rate limit", "too many", "please wait")),
+    (UpstreamUnavailableError, ("timeout", "timed out", "temporarily")),
+    (UpstreamAuthError, ("unauthorized", "login required", "invalid token")),
+)
+
+
+def error_for_response(response: requests.Response, message: str) -> UpstreamError:
+    """Classify an error response by its status code."""
+    status = response.status_code
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if status == HTTPStatus.TOO_MANY_REQUESTS:
+        error_class: type[UpstreamError] = UpstreamRateLimitedError
+    elif status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        error_class = UpstreamUnavailableError
+    elif status == HTTPStatus.NOT_FOUND:
+        error_class = UpstreamNotFoundError
+    elif status in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
+        error_class = UpstreamAuthError
+    else:
+        error_class = UpstreamError
+    return error_class(
+        message,
+        status_code=status,
+        retry_after=retry_after,
+        response=response,
+    )
+
+
+def error_for_exception(error: requests.RequestException) -> UpstreamError:
+    """Classify a failed ``requests`` call."""
+    if isinstance(error, UpstreamError):
+        return error
+    if error.response is not None:
+        return error_for_response(error.response, str(error))
+    if isinstance(error, requests.Timeout | requests.ConnectionError):
+        return UpstreamUnavailableError(str(error))
+    return UpstreamError(str(error))
+
+
+def error_for_payload(payload: dict, message: str) -> UpstreamError:
+    """Classify a Core API ``{"status": false, "errorMessage": ...}`` payload."""
+    text = str(payload.get("errorMessage") or "").lower()
+    for error_class, markers in PAYLOAD_ERROR_MARKERS:
+        if any(marker in text for marker in markers):
+            return error_class(message)
+    return UpstreamError(message)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether ``error`` is transient: trying again later may succeed."""
+    if isinstance(error, UpstreamError):
+        return error.retryable
+    if isinstance(error, CircuitOpenError | RateLimitTimeoutError):
+        return True
+    if isinstance(error, requests.RequestException):
+        return error_for_exception(error).retryable
+    # Storage and other local I/O failures
+    return isinstance(error, OSError)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with jitter that honours upstream hints.
+
+    Attempt ``n`` (0-based) waits ``base_delay * 2**n`` seconds, capped at
+    ``max_delay``, or the error's ``retry_after`` if that is longer. Up to
+    ``jitter`` of the delay is added at random so retries of many tasks do
+    not hit the upstream at the same moment, and never before the hint.
+    """
+
+    base_delay: float
+    max_delay: float
+    jitter: float
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            base_delay=settings.UPSTREAM_RETRY_BASE_DELAY,
+            max_delay=settings.UPSTREAM_RETRY_MAX_DELAY,
+            jitter=settings.UPSTREAM_RETRY_JITTER,
+        )
+
+    def delay(self, error: BaseException, retries: int) -> float | None:
+        """Seconds to wait before retrying after ``error``, or None to give up."""
+        if isinstance(error, requests.RequestException):
+            error = error_for_exception(error)
+        if not is_retryable(error):
+            return None
+        delay = min(self.base_delay * 2**retries, self.max_delay)
+        delay = max(delay, getattr(error, "retry_after", None) or 0)
+        return round(delay * (1 + random.uniform(0, self.jitter)), 1)  # noqa: S311
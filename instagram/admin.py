@@ -1,21 +1,62 @@
+from datetime import UTC
+from datetime import datetime
+
 from django.contrib import admin
 from django.contrib import messages
 from django.http import HttpRequest
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.html import format_html_join
 from django.utils.translation import gettext_lazy as _
 from simple_history.admin import SimpleHistoryAdmin
 from unfold.admin import ModelAdmin
 from unfold.decorators import action
 
+from core.utils.task_lock import held_locks
+
+from .locks import LOCK_KINDS
+from .locks import user_lock
+from .models import MediaBlob
 from .models import Story
 from .models import User
 from .models import UserUpdateStoryLog
 
 
+class TaskLockFilter(admin.SimpleListFilter):
+    """Users holding a per-user task lock (needs the django-redis cache)."""
+
+    title = "task lock"
+    parameter_name = "task_lock"
+
+    def lookups(self, request, model_admin):
+        return [(kind, kind.replace("_", " ")) for kind in LOCK_KINDS]
+
+    def queryset(self, request, queryset):
+        kind = self.value()
+        if kind is None or kind not in LOCK_KINDS:
+            return queryset
+        user_ids = held_locks(kind)
+        if user_ids is None:
+            messages.warning(
+                request,
+                _("Listing task locks requires the Redis cache."),
+            )
+            return queryset.none()
+        return queryset.filter(uuid__in=user_ids)
+
+
+def _lock_time(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=UTC).isoformat(timespec="seconds")
+
+
 @admin.register(User)
 class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
-    actions_detail = ["update_from_api", "update_stories_from_api"]
+    actions_detail = [
+        "update_from_api",
+        "update_stories_from_api",
+        "release_task_locks",
+    ]
     list_display = [
         "username",
         "full_name",
@@ -26,6 +67,7 @@ class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
         "media_count",
         "created_at",
         "api_updated_at",
+        "stories_checked_at",
     ]
     list_filter = [
         "is_private",
@@ -34,6 +76,7 @@ class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
         "allow_auto_update_profile",
         "created_at",
         "api_updated_at",
+        TaskLockFilter,
     ]
     search_fields = ["username", "full_name", "instagram_id"]
     readonly_fields = [
@@ -41,6 +84,12 @@ class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
         "created_at",
         "updated_at",
         "api_updated_at",
+        "profile_checked_at",
+        "stories_checked_at",
+        "stories_next_poll_at",
+        "stories_poll_interval",
+        "story_gap_ewma",
+        "task_locks",
         "raw_api_data",
     ]
     fieldsets = (
@@ -73,6 +122,12 @@ class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
                     "created_at",
                     "updated_at",
                     "api_updated_at",
+                    "profile_checked_at",
+                    "stories_checked_at",
+                    "stories_next_poll_at",
+                    "stories_poll_interval",
+                    "story_gap_ewma",
+                    "task_locks",
                     "raw_api_data",
                 ),
                 "classes": ["tab"],
@@ -81,6 +136,37 @@ class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
     )
     ordering = ["-created_at"]
 
+    @admin.display(description=_("Task locks"))
+    def task_locks(self, obj):
+        if obj.pk is None:
+            return "-"
+        holders = [(kind, user_lock(kind, obj.uuid).get()) for kind in LOCK_KINDS]
+        rows = format_html_join(
+            "",
+            "<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>",
+            (
+                (
+                    kind,
+                    holder["task"] or "-",
+                    _lock_time(holder["acquired_at"]),
+                    _lock_time(holder["expires_at"]),
+                )
+                for kind, holder in holders
+                if holder is not None
+            ),
+        )
+        if not rows:
+            return _("None held")
+        return format_html(
+            "<table><thead><tr><th>{}</th><th>{}</th><th>{}</th><th>{}</th></tr>"
+            "</thead><tbody>{}</tbody></table>",
+            _("Kind"),
+            _("Task"),
+            _("Since"),
+            _("Expires"),
+            rows,
+        )
+
     @action(
         description=_("Update from Instagram API"),
         url_path="update-from-api",
@@ -90,7 +176,7 @@ class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
         """Update user profile data from Instagram API."""
         try:
             user = User.objects.get(pk=object_id)
-            user.update_profile_from_api()
+            user.update_profile_from_api(force_refresh=True)
             messages.success(
                 request,
                 f"Successfully updated {user.username} from Instagram API.",
@@ -113,10 +199,16 @@ class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
         try:
             user = User.objects.get(pk=object_id)
             task_result = user.update_stories_from_api_async()
-            messages.success(
-                request,
-                f"Successfully queued story update task for {user.username}. Task ID: {task_result.id}",  # noqa: E501
-            )
+            if task_result is None:
+                messages.warning(
+                    request,
+                    f"A story update for {user.username} is already queued or running.",
+                )
+            else:
+                messages.success(
+                    request,
+                    f"Successfully queued story update task for {user.username}. Task ID: {task_result.id}",  # noqa: E501
+                )
         except Exception as e:  # noqa: BLE001
             messages.error(
                 request,
@@ -125,6 +217,20 @@ class InstagramUserAdmin(SimpleHistoryAdmin, ModelAdmin):
 
         return redirect(reverse("admin:instagram_user_change", args=(object_id,)))
 
+    @action(
+        description=_("Release task locks"),
+        url_path="release-task-locks",
+        permissions=["change"],
+    )
+    def release_task_locks(self, request: HttpRequest, object_id: str):
+        """Let new refreshes of this user be queued, e.g. after a lost task."""
+        user = User.objects.get(pk=object_id)
+        for kind in LOCK_KINDS:
+            user_lock(kind, user.uuid).release()
+        messages.success(request, f"Released the task locks of {user.username}.")
+
+        return redirect(reverse("admin:instagram_user_change", args=(object_id,)))
+
 
 @admin.register(UserUpdateStoryLog)
 class UserUpdateStoryLogAdmin(ModelAdmin):
@@ -170,3 +276,28 @@ class StoryAdmin(ModelAdmin):
         "created_at",
     ]
     ordering = ["-created_at"]
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(ModelAdmin):
+    list_display = [
+        "sha256",
+        "mime_type",
+        "size",
+        "ref_count",
+        "created_at",
+    ]
+    list_filter = [
+        "mime_type",
+        "created_at",
+    ]
+    search_fields = ["sha256"]
+    readonly_fields = [
+        "sha256",
+        "file",
+        "size",
+        "mime_type",
+        "ref_count",
+        "created_at",
+    ]
+    ordering = ["-created_at"]
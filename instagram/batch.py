@@ -0,0 +1,240 @@
+"""Batch refresh engine for Instagram users.
+
+Refreshes many users inside a single worker by issuing the Core API calls
+concurrently on an asyncio event loop (bounded by ``concurrency``), then
+writing the results back with a fixed number of bulk queries.
+"""
+
+import asyncio
+import logging
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
+
+from api_logs.models import APIRequestLog
+from api_logs.policy import LoggingPolicy
+from core.utils.async_core_api import AsyncCoreAPIClient
+
+from .models import Story
+from .models import User
+from .models import UserUpdateStoryLog
+from .polling import PollingPolicy
+
+logger = logging.getLogger(__name__)
+
+PROFILE_UPDATE_FIELDS = [
+    "instagram_id",
+    "username",
+    "full_name",
+    "original_profile_picture_url",
+    "biography",
+    "is_private",
+    "is_verified",
+    "media_count",
+    "follower_count",
+    "following_count",
+    "raw_api_data",
+    "api_updated_at",
+    "profile_checked_at",
+    "updated_at",
+]
+
+
+async def _fetch_profile(client, user):
+    response = await client.fetch_user_info_by_username_v2(user.username)
+    api_method = "username_v2"
+
+    if instagram_id := user.user_id_fallback(response):
+        response = await client.fetch_user_info_by_user_id(instagram_id)
+        api_method = "user_id"
+
+    return response, api_method
+
+
+async def _fetch_stories(client, user):
+    return await client.fetch_user_stories_by_username(user.username)
+
+
+def _fetch_all(fetch, users, concurrency):
+    """Run ``fetch(client, user)`` for every user concurrently.
+
+    Returns one result per user, in order; failed calls are returned as the
+    raised exception. Request logs are persisted in bulk even if the loop fails.
+    """
+    client = AsyncCoreAPIClient.from_settings(concurrency=concurrency)
+
+    async def gather():
+        async with client:
+            return await asyncio.gather(
+                *(fetch(client, user) for user in users),
+                return_exceptions=True,
+            )
+
+    try:
+        return asyncio.run(gather())
+    finally:
+        logs = LoggingPolicy.from_settings().filter_logs(client.logs)
+        APIRequestLog.objects.bulk_create(logs)
+
+
+def refresh_profiles(users: list[User], concurrency: int | None = None) -> dict:
+    """Refresh the profiles of ``users`` from the Core API in one batch.
+
+    Args:
+        users: Users to refresh
+        concurrency: Maximum number of in-flight upstream requests
+
+    Returns:
+        dict: Summary with updated/error counts and per-user error details
+    """
+    if not users:
+        return {"updated": 0, "errors": 0, "error_details": None}
+
+    concurrency = concurrency or settings.CORE_API_ASYNC_CONCURRENCY
+    results = _fetch_all(_fetch_profile, users, concurrency)
+
+    now = timezone.now()
+    updated = []
+    errors = {}
+    for user, result in zip(users, results, strict=True):
+        if isinstance(result, BaseException):
+            errors[user.username] = str(result)
+            continue
+        try:
+            user.apply_profile_api_response(*result)
+        except Exception as e:  # noqa: BLE001
+            errors[user.username] = str(e)
+            continue
+        user.updated_at = now
+        updated.append(user)
+
+    if errors:
+        # Failed fetches count as checks too, see User.mark_profile_checked
+        User.objects.filter(
+            pk__in=[user.pk for user in users if user.username in errors],
+        ).update(profile_checked_at=now)
+    if updated:
+        bulk_update_with_history(
+            updated,
+            User,
+            PROFILE_UPDATE_FIELDS,
+            batch_size=settings.CORE_API_BATCH_SIZE,
+        )
+        _queue_profile_picture_updates(updated)
+
+    logger.info(
+        "Batch profile refresh completed: %d updated, %d errors",
+        len(updated),
+        len(errors),
+    )
+    return {
+        "updated": len(updated),
+        "errors": len(errors),
+        "error_details": errors or None,
+    }
+
+
+def _queue_profile_picture_updates(users):
+    # bulk_update() bypasses post_save, so queue what user_post_save would have.
+    from .tasks import queue_profile_picture_update  # noqa: PLC0415
+
+    for user in users:
+        if user.original_profile_picture_url:
+            queue_profile_picture_update(user)
+
+
+def refresh_stories(users: list[User], concurrency: int | None = None) -> dict:
+    """Refresh the stories of ``users`` from the Core API in one batch.
+
+    The stories of every user are upserted together (see
+    ``Story.upsert_from_api``) and the update logs and polling plans are
+    written in bulk, so the batch costs the same queries whatever its size.
+
+    Args:
+        users: Users to refresh
+        concurrency: Maximum number of in-flight upstream requests
+
+    Returns:
+        dict: Summary with updated user/story counts and per-user error details
+    """
+    if not users:
+        return {"updated": 0, "stories": 0, "errors": 0, "error_details": None}
+
+    concurrency = concurrency or settings.CORE_API_ASYNC_CONCURRENCY
+    results = _fetch_all(_fetch_stories, users, concurrency)
+
+    policy = PollingPolicy.from_settings()
+    now = timezone.now()
+    previous_story_at = dict(
+        Story.objects.filter(user__in=users)
+        .values("user")
+        .annotate(latest=Max("story_created_at"))
+        .values_list("user", "latest"),
+    )
+
+    errors = {}
+    logs = []
+    fetched = []
+    for user, result in zip(users, results, strict=True):
+        error = result if isinstance(result, BaseException) else None
+        if error is None:
+            try:
+                fetched.append((user, user.story_items_from_api_response(result)))
+                continue
+            except Exception as e:  # noqa: BLE001
+                error = e
+        errors[user.username] = str(error)
+        logs.append(
+            UserUpdateStoryLog(
+                user=user,
+                status=UserUpdateStoryLog.STATUS_FAILED,
+                message=str(error),
+            ),
+        )
+        # Failed fetches count as checks too, see User.mark_stories_checked
+        user.plan_stories_check(policy=policy, now=now)
+
+    stories_count = 0
+    if fetched:
+        stories_by_user, created_ids = Story.upsert_from_api(fetched)
+        for (user, _), stories in zip(fetched, stories_by_user, strict=True):
+            stories_count += len(stories)
+            logs.append(
+                UserUpdateStoryLog(
+                    user=user,
+                    status=UserUpdateStoryLog.STATUS_COMPLETED,
+                    message=f"Successfully updated {len(stories)} stories",
+                ),
+            )
+            user.plan_stories_check(
+                [
+                    story.story_created_at
+                    for story in stories
+                    if story.story_id in created_ids
+                ],
+                previous_story_at=previous_story_at.get(user.pk),
+                policy=policy,
+                now=now,
+            )
+
+    UserUpdateStoryLog.objects.bulk_create(logs)
+    User.objects.bulk_update(
+        users,
+        User.STORIES_CHECK_FIELDS,
+        batch_size=settings.CORE_API_BATCH_SIZE,
+    )
+
+    logger.info(
+        "Batch story refresh completed: %d users, %d stories, %d errors",
+        len(fetched),
+        stories_count,
+        len(errors),
+    )
+    return {
+        "updated": len(fetched),
+        "stories": stories_count,
+        "errors": len(errors),
+        "error_details": errors or None,
+    }
@@ -0,0 +1,204 @@
+"""Memory-bounded fan-out of per-user Celery tasks.
+
+User ids are streamed from the database with a server-side cursor and
+published as Celery groups covering ``FANOUT_PUBLISH_BATCH_SIZE`` users, so
+a run never holds more than one group in memory. Progress of a run lives in the
+cache (Redis in production) under ``fanout:<run id>:*`` instead of in the
+fan-out task's result.
+
+With a ``lock_kind``, each per-user task is published only if that user's
+``TaskLock`` of the kind is free; users with a task already queued or running
+are counted as duplicates.
+"""
+
+import logging
+import uuid
+from collections.abc import Callable
+from collections.abc import Iterator
+from itertools import islice
+
+from celery import group
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.utils.task_lock import TOKEN_KWARG
+from core.utils.task_lock import TaskLock
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("queued", "succeeded", "failed")
+
+
+def iter_id_chunks(queryset, chunk_size: int, field: str = "uuid") -> Iterator[list]:
+    """Yield lists of ``chunk_size`` ids of ``queryset`` as strings."""
+    ids = (
+        str(value)
+        for value in queryset.order_by()
+        .values_list(field, flat=True)
+        .iterator(
+            chunk_size=settings.FANOUT_FETCH_CHUNK_SIZE,
+        )
+    )
+    while chunk := list(islice(ids, chunk_size)):
+        yield chunk
+
+
+class FanoutProgress:
+    """Counters of one fan-out run, shared by the publisher and the workers."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+
+    def _key(self, name: str) -> str:
+        return f"fanout:{self.run_id}:{name}"
+
+    @classmethod
+    def start(cls, kind: str, total: int):
+        progress = cls(uuid.uuid4().hex)
+        ttl = settings.FANOUT_PROGRESS_TTL
+        cache.set_many(
+            {
+                progress._key("kind"): kind,
+                progress._key("total"): total,
+                progress._key("started_at"): timezone.now().isoformat(),
+                **{progress._key(name): 0 for name in COUNTERS},
+            },
+            ttl,
+        )
+        return progress
+
+    def _incr(self, name: str, amount: int) -> None:
+        if not amount:
+            return
+        try:
+            cache.incr(self._key(name), amount)
+        except ValueError:
+            # The run expired (or the cache was flushed); nothing to track
+            logger.debug("Fan-out run %s is no longer tracked", self.run_id)
+
+    def add_queued(self, count: int) -> None:
+        self._incr("queued", count)
+
+    def record(self, *, succeeded: int = 0, failed: int = 0) -> None:
+        self._incr("succeeded", succeeded)
+        self._incr("failed", failed)
+
+    def record_result(self, result: dict) -> None:
+        """Count a per-user task result (``{"success": ...}``)."""
+        if result.get("success"):
+            self.record(succeeded=1)
+        else:
+            self.record(failed=1)
+
+    def get(self) -> dict | None:
+        """Return the run's counters, or None if it is unknown or expired."""
+        names = ("kind", "total", "started_at", *COUNTERS)
+        values = cache.get_many([self._key(name) for name in names])
+        if not values:
+            return None
+        return {
+            "run_id": self.run_id,
+            **{name: values.get(self._key(name)) for name in names},
+        }
+
+
+def fan_out(
+    queryset,
+    signature: Callable[[list[str], str], list],
+    *,
+    kind: str,
+    per_task: int = 1,
+    lock_kind: str | None = None,
+) -> dict:
+    """Publish tasks for every id of ``queryset`` in groups.
+
+    Args:
+        queryset: Users to fan out over
+        signature: Builds the signatures for one chunk of ``per_task`` ids and
+            the run id, e.g. one per-user signature per id or one batch
+            signature for the whole chunk
+        kind: Label stored with the progress counters
+        per_task: Ids handed to each call of ``signature``
+        lock_kind: Per-user ``TaskLock`` kind taken for each published task
+            (only with ``per_task=1``); users whose lock is held are skipped
+
+    Returns:
+        dict: Compact summary with the run id, totals, duplicates and publish
+        errors
+    """
+    if lock_kind is not None and per_task != 1:
+        msg = "lock_kind requires per_task=1"
+        raise ValueError(msg)
+
+    total = queryset.count()
+    progress = FanoutProgress.start(kind, total)
+    publish_batch = max(settings.FANOUT_PUBLISH_BATCH_SIZE // per_task, 1)
+
+    queued = tasks = groups = errors = duplicates = 0
+    chunks = iter_id_chunks(queryset, per_task)
+    while True:
+        pending = list(islice(chunks, publish_batch))
+        if not pending:
+            break
+        signatures = []
+        locks = []
+        count = 0
+        for chunk in pending:
+            chunk_signatures = signature(chunk, progress.run_id)
+            if lock_kind is not None and chunk_signatures:
+                lock = TaskLock(lock_kind, chunk[0])
+                token = lock.acquire(
+                    settings.TASK_LOCK_TTL,
+                    task_name=chunk_signatures[0].task,
+                )
+                if token is None:
+                    duplicates += 1
+                    continue
+                locks.append((lock, token))
+                chunk_signatures = [
+                    sig.clone(kwargs={TOKEN_KWARG: token}) for sig in chunk_signatures
+                ]
+            signatures += chunk_signatures
+            count += len(chunk)
+        if not signatures:
+            continue
+        try:
+            group(signatures).apply_async()
+        except Exception:
+            errors += count
+            for lock, token in locks:
+                lock.release(token)
+            logger.exception(
+                "Failed to publish %d %s tasks (run %s)",
+                len(signatures),
+                kind,
+                progress.run_id,
+            )
+            continue
+        queued += count
+        tasks += len(signatures)
+        groups += 1
+        progress.add_queued(count)
+
+    logger.info(
+        "Fan-out %s %s: %d of %d users queued in %d tasks (%d groups), "
+        "%d duplicates, %d errors",
+        kind,
+        progress.run_id,
+        queued,
+        total,
+        tasks,
+        groups,
+        duplicates,
+        errors,
+    )
+    return {
+        "run_id": progress.run_id,
+        "total": total,
+        "queued": queued,
+        "tasks": tasks,
+        "groups": groups,
+        "duplicates": duplicates,
+        "errors": errors,
+    }
@@ -0,0 +1,43 @@
+"""Per-user task locks: at most one refresh of each kind per user.
+
+Every kind of refresh (profile, stories, profile picture) holds a
+``TaskLock`` keyed by the user's UUID from the moment it is queued until it
+finishes, so the admin action, the beat tasks and ``User.save()`` never
+stack several refreshes of the same user. See ``core.utils.task_lock``.
+"""
+
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from core.utils.task_lock import TaskLock
+
+PROFILE_LOCK = "profile"
+STORIES_LOCK = "stories"
+PROFILE_PICTURE_LOCK = "profile_picture"
+
+LOCK_KINDS = (PROFILE_LOCK, STORIES_LOCK, PROFILE_PICTURE_LOCK)
+
+
+def user_lock(kind: str, user_id) -> TaskLock:
+    return TaskLock(kind, str(user_id))
+
+
+@contextmanager
+def hold_user_locks(kind: str, users, *, task_name: str):
+    """Lock ``kind`` for each of ``users`` for a batch refresh.
+
+    Yields the users whose lock was free; users with a refresh of that kind
+    already queued or running are left out. The locks are released on exit.
+    """
+    held = []
+    for user in users:
+        lock = user_lock(kind, user.uuid)
+        token = lock.acquire(settings.TASK_LOCK_TTL, task_name=task_name)
+        if token is not None:
+            held.append((user, lock, token))
+    try:
+        yield [user for user, _, _ in held]
+    finally:
+        for _, lock, token in held:
+            lock.release(token)
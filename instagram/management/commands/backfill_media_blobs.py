@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import ProtectedError
+
+from instagram.media import backfill_blobs
+from instagram.models import MediaBlob
+from instagram.models import Story
+from instagram.models import User
+
+# (model, file field) pairs whose files resolve to blobs
+FILE_FIELDS = (
+    (Story, "thumbnail"),
+    (Story, "media"),
+    (User, "profile_picture"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Hash stored story media and profile pictures that predate media blobs, "
+        "point them at one blob per distinct content and collapse duplicates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.MEDIA_TRANSFER_CONCURRENCY,
+            help="Files hashed in parallel",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows hashed and updated per transaction",
+        )
+        parser.add_argument(
+            "--delete-duplicates",
+            action="store_true",
+            help="Delete the stored copies of content that already has a blob",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Afterwards, delete blobs (and their files) nobody references",
+        )
+
+    def handle(self, *args, **options):
+        totals = {"hashed": 0, "missing": 0, "blobs": 0, "duplicates": 0, "bytes": 0}
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for model, field_name in FILE_FIELDS:
+                rows = (
+                    model.objects.filter(**{f"{field_name}_blob": None})
+                    .exclude(**{f"{field_name}__isnull": True})
+                    .exclude(**{field_name: ""})
+                    .values_list("pk", field_name)
+                )
+                for batch in batched(
+                    rows.iterator(chunk_size=options["batch_size"]),
+                    options["batch_size"],
+                ):
+                    result = backfill_blobs(
+                        model,
+                        field_name,
+                        batch,
+                        pool,
+                        settings.MEDIA_TRANSFER_CHUNK_SIZE,
+                    )
+                    totals["hashed"] += result.hashed
+                    totals["missing"] += result.missing
+                    totals["blobs"] += result.new_blobs
+                    totals["duplicates"] += result.duplicates
+                    totals["bytes"] += result.duplicate_bytes
+                    if options["delete_duplicates"]:
+                        for name in result.redundant_names:
+                            default_storage.delete(name)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{totals['hashed']} files hashed into {totals['blobs']} new blobs, "
+                f"{totals['duplicates']} duplicates collapsed "
+                f"({totals['bytes']} bytes), {totals['missing']} files missing",
+            ),
+        )
+        if options["prune"]:
+            self._prune()
+
+    def _prune(self):
+        orphans = MediaBlob.objects.filter(ref_count=0)
+        pruned = 0
+        for blob in orphans.iterator():
+            try:
+                blob.delete()
+            except ProtectedError:
+                # Referenced again since its count dropped to zero
+                continue
+            default_storage.delete(blob.file.name)
+            pruned += 1
+        self.stdout.write(self.style.SUCCESS(f"{pruned} unreferenced blobs pruned"))
@@ -0,0 +1,84 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from instagram.models import Story
+from instagram.polling import STORY_LIFETIME_SECONDS
+from instagram.polling import PollingPolicy
+from instagram.polling import SimulationResult
+from instagram.polling import simulate
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay stored story timestamps against adaptive and fixed-interval "
+        "story polling and report upstream calls saved against stories missed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Window to replay")
+        parser.add_argument(
+            "--fixed-interval",
+            type=int,
+            default=settings.STORIES_REFRESH_INTERVAL,
+            help="Seconds between polls of the fixed cadence to compare with",
+        )
+        parser.add_argument(
+            "--visible-hours",
+            type=float,
+            default=STORY_LIFETIME_SECONDS / 3600,
+            help="How long a story stays up (lower it to model early deletions)",
+        )
+        parser.add_argument(
+            "--auto-update-only",
+            action="store_true",
+            help="Only users with story auto-update enabled",
+        )
+
+    def handle(self, *args, **options):
+        end = timezone.now()
+        start = end - timedelta(days=options["days"])
+        lifetime = options["visible_hours"] * 3600
+
+        stories = Story.objects.filter(story_created_at__gte=start)
+        if options["auto_update_only"]:
+            stories = stories.filter(user__allow_auto_update_stories=True)
+
+        histories = defaultdict(list)
+        for user_id, created_at in stories.values_list(
+            "user_id",
+            "story_created_at",
+        ).iterator():
+            histories[user_id].append(created_at)
+
+        policy = PollingPolicy.from_settings()
+        adaptive = fixed = SimulationResult()
+        for story_times in histories.values():
+            window = {"start": start, "end": end, "lifetime": lifetime}
+            adaptive += simulate(story_times, policy=policy, **window)
+            fixed += simulate(
+                story_times,
+                fixed_interval=options["fixed_interval"],
+                **window,
+            )
+
+        saved = fixed.polls - adaptive.polls
+        self.stdout.write(
+            f"{len(histories)} users, {fixed.stories} stories over "
+            f"{options['days']} days",
+        )
+        for name, result in (("fixed", fixed), ("adaptive", adaptive)):
+            self.stdout.write(
+                f"{name:>9}: {result.polls} calls, {result.captured} captured, "
+                f"{result.missed} missed",
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Calls saved: {saved} "
+                f"({saved / fixed.polls if fixed.polls else 0:.1%}), "
+                f"additional stories missed: {adaptive.missed - fixed.missed}",
+            ),
+        )
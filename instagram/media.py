@@ -0,0 +1,553 @@
+"""Transfer pipeline for story media and profile pictures.
+
+Story thumbnails and videos are downloaded by the ``download_stories_media``
+task, never while a story is being saved, so ingesting a story costs the same
+whatever the size of its media. Downloads of a batch run on a thread pool; the
+transfers in flight in the worker process are bounded overall and per CDN
+host, and each download is uploaded and closed as soon as it finishes. The
+threads only talk to the network and to storage; the database is queried and
+updated from the calling thread, with queryset updates, so no ``post_save``
+signal fires.
+
+Every download is streamed into a spooled temporary file and hashed on the
+way, so a worker holds at most one chunk (plus the spool size) of a video in
+memory. Storage backends upload from that file; S3 switches to a multipart
+upload for large files (see ``AWS_S3_TRANSFER_CONFIG``).
+
+Each download and each upload must finish within the policy's ``deadline``,
+checked between chunks. Celery's time limits are not enforced on the threads
+pool the media worker runs on, so this is what bounds a stuck transfer.
+
+Files are content addressed (see ``MediaBlob``): a download whose sha256 is
+already stored is not uploaded again, and the story or user just points at
+the existing blob.
+"""
+
+import hashlib
+import logging
+import mimetypes
+import threading
+import time
+from collections import Counter
+from collections import defaultdict
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import field
+from http import HTTPStatus
+from tempfile import SpooledTemporaryFile
+from typing import IO
+from typing import cast
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from core.utils.upstream_errors import UpstreamUnavailableError
+from core.utils.upstream_errors import error_for_exception
+
+from .models import MediaBlob
+from .models import Story
+from .utils import guess_extension
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TransferPolicy:
+    """Limits of one media transfer batch.
+
+    ``concurrency`` bounds the downloads in flight in the worker process,
+    ``per_host`` the downloads in flight from any single host, and
+    ``timeout`` the seconds to wait for a server to connect or send data,
+    and ``deadline`` the seconds one download or upload may take in total.
+    Bodies are read ``chunk_size`` bytes at a time and kept in memory up to
+    ``spool_size`` bytes, on disk beyond that.
+    """
+
+    concurrency: int
+    per_host: int
+    timeout: float
+    deadline: float
+    chunk_size: int
+    spool_size: int
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            concurrency=settings.MEDIA_TRANSFER_CONCURRENCY,
+            per_host=settings.MEDIA_TRANSFER_PER_HOST_CONCURRENCY,
+            timeout=settings.MEDIA_TRANSFER_TIMEOUT,
+            deadline=settings.MEDIA_TRANSFER_DEADLINE,
+            chunk_size=settings.MEDIA_TRANSFER_CHUNK_SIZE,
+            spool_size=settings.MEDIA_TRANSFER_SPOOL_SIZE,
+        )
+
+
+class TransferSlots:
+    """Bounds the downloads in flight, overall and from each host.
+
+    Shared by every task of the worker process (see ``transfer_slots``), so
+    the limits hold however many transfer tasks run at once on a threads pool.
+    """
+
+    def __init__(self, concurrency: int, per_host: int):
+        self.per_host = per_host
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._hosts: dict[str, threading.BoundedSemaphore] = {}
+
+    @contextmanager
+    def acquire(self, url: str):
+        host = urlparse(url).hostname or ""
+        with self._lock:
+            host_slots = self._hosts.get(host)
+            if host_slots is None:
+                host_slots = threading.BoundedSemaphore(self.per_host)
+                self._hosts[host] = host_slots
+        with host_slots, self._slots:
+            yield
+
+
+_slots_lock = threading.Lock()
+_slots: dict[tuple[int, int], TransferSlots] = {}
+
+
+def transfer_slots(policy: TransferPolicy) -> TransferSlots:
+    """Return the process-wide slots for ``policy``'s limits."""
+    key = (policy.concurrency, policy.per_host)
+    with _slots_lock:
+        if key not in _slots:
+            _slots[key] = TransferSlots(*key)
+        return _slots[key]
+
+
+@dataclass
+class Download:
+    """A downloaded file, spooled to disk once larger than the spool size."""
+
+    file: File
+    size: int
+    sha256: str
+    extension: str
+    mime_type: str
+    etag: str
+
+
+def fetch(url: str, policy: TransferPolicy, etag: str = "") -> Download | None:
+    """Stream ``url`` into a temporary file, hashing it on the way.
+
+    The body is read ``policy.chunk_size`` bytes at a time, so memory use does
+    not grow with the file. The caller closes ``file``; prefer ``download``.
+
+    Args:
+        url: File to download
+        policy: Transfer limits
+        etag: ETag of the copy we have, exactly as the server sent it; the
+            server may then answer that it did not change instead of sending
+            it again
+
+    Returns:
+        Download | None: The download, or None if the server confirmed ``etag``
+
+    Raises:
+        UpstreamError: The download failed or outlasted ``policy.deadline``;
+            ``is_retryable`` tells whether trying again can help (expired CDN
+            links answer 403/404)
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    expires = time.monotonic() + policy.deadline
+    digest = hashlib.sha256()
+    size = 0
+    file = SpooledTemporaryFile(max_size=policy.spool_size)  # noqa: SIM115
+    try:
+        with requests.get(
+            url,
+            headers=headers,
+            timeout=policy.timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            if response.status_code == HTTPStatus.NOT_MODIFIED:
+                file.close()
+                return None
+            for chunk in response.iter_content(chunk_size=policy.chunk_size):
+                if time.monotonic() > expires:
+                    msg = f"Download of {url} took longer than {policy.deadline}s"
+                    raise UpstreamUnavailableError(msg)  # noqa: TRY301
+                file.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    except requests.RequestException as e:
+        file.close()
+        raise error_for_exception(e) from e
+    except BaseException:
+        file.close()
+        raise
+    file.seek(0)
+    content_type = response.headers.get("content-type", "")
+    extension = guess_extension(url, content_type)
+    return Download(
+        file=File(file),
+        size=size,
+        sha256=digest.hexdigest(),
+        extension=extension,
+        mime_type=(
+            content_type.split(";")[0].strip()
+            or mimetypes.guess_type(f"file.{extension}")[0]
+            or ""
+        ),
+        etag=response.headers.get("ETag", ""),
+    )
+
+
+@contextmanager
+def download(url: str, policy: TransferPolicy, etag: str = ""):
+    """Like ``fetch``, closing the file when the block exits.
+
+    Yields:
+        Download | None: The file, positioned at its start, with its size and
+            hash, or None if the server confirmed ``etag``
+    """
+    result = fetch(url, policy, etag)
+    try:
+        yield result
+    finally:
+        if result is not None:
+            result.file.close()
+
+
+def hash_stored_file(name: str, chunk_size: int) -> tuple[str, int] | None:
+    """Return the sha256 and size of a stored file, or None if it is missing.
+
+    The file is read ``chunk_size`` bytes at a time.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with default_storage.open(name, "rb") as f:
+            for chunk in f.chunks(chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest(), size
+
+
+class DeadlineReader:
+    """Read-only view of a file whose reads fail once ``expires`` has passed.
+
+    Storage backends upload by reading the file chunk by chunk, so this
+    bounds an upload without support from the backend.
+    """
+
+    def __init__(self, file, expires: float, deadline: float):
+        self._file = file
+        self._expires = expires
+        self._deadline = deadline
+
+    def read(self, *args):
+        if time.monotonic() > self._expires:
+            msg = f"Upload took longer than {self._deadline}s"
+            raise TimeoutError(msg)
+        return self._file.read(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def upload_blob(result: Download, deadline: float | None = None) -> str:
+    """Store a download under its content address; returns the storage name.
+
+    Raises:
+        TimeoutError: The upload took longer than ``deadline`` seconds
+    """
+    file = result.file
+    if deadline is not None:
+        reader = DeadlineReader(file.file, time.monotonic() + deadline, deadline)
+        file = File(cast("IO[bytes]", reader), name=file.name)
+    return default_storage.save(
+        MediaBlob.name_for(result.sha256, result.extension),
+        file,
+    )
+
+
+def adopt_blob(result: Download, uploaded_name: str | None, count: int = 1):
+    """Reference the blob of ``result``, creating it from ``uploaded_name``.
+
+    Removes ``uploaded_name`` again if another process stored the same content
+    first and won the race to create the blob.
+    """
+    blob = MediaBlob.acquire(
+        result.sha256,
+        name=uploaded_name,
+        size=result.size,
+        mime_type=result.mime_type,
+        count=count,
+    )
+    if uploaded_name and blob.file.name != uploaded_name:
+        default_storage.delete(uploaded_name)
+    return blob
+
+
+def store_download(result: Download, deadline: float | None = None):
+    """Reference the blob of a download, uploading it only if it is new."""
+    if MediaBlob.objects.filter(pk=result.sha256).exists():
+        return adopt_blob(result, None)
+    return adopt_blob(result, upload_blob(result, deadline))
+
+
+@dataclass
+class Transfer:
+    """One URL to download, and the story files it fills in."""
+
+    url: str
+    targets: list[tuple[Story, str]] = field(default_factory=list)
+    result: Download | None = None
+    uploaded_name: str | None = None
+    error: Exception | None = None
+
+    @property
+    def story_ids(self):
+        return {story.story_id for story, _ in self.targets}
+
+
+def _fetch(transfer: Transfer, slots: TransferSlots, policy: TransferPolicy):
+    try:
+        with slots.acquire(transfer.url):
+            transfer.result = fetch(transfer.url, policy)
+    except Exception as e:  # noqa: BLE001
+        transfer.error = e
+
+
+def _upload(transfer: Transfer, result: Download, deadline: float):
+    try:
+        transfer.uploaded_name = upload_blob(result, deadline)
+    except Exception as e:  # noqa: BLE001
+        transfer.error = e
+
+
+def transfer_story_media(stories, policy: TransferPolicy | None = None):
+    """Download the missing files of ``stories`` and store them.
+
+    Each finished download whose content is not stored yet is uploaded right
+    away and its spooled file closed, so at most ``policy.concurrency`` files
+    are held at once whatever the number of stories. Known content is looked
+    up with one query per batch of finished downloads. A URL shared by
+    several files (photo stories use the image as media too) is downloaded
+    once, and a content served by several URLs is uploaded once.
+
+    Args:
+        stories: Stories to complete; files already stored are skipped
+        policy: Transfer limits, from the settings by default
+
+    Returns:
+        list[Transfer]: Every attempted transfer, failed ones with ``error``
+    """
+    policy = policy or TransferPolicy.from_settings()
+    by_url: dict[str, Transfer] = {}
+    for story in stories:
+        for field_name, url in story.missing_media():
+            by_url.setdefault(url, Transfer(url)).targets.append((story, field_name))
+    transfers = list(by_url.values())
+    if not transfers:
+        return transfers
+
+    try:
+        uploads = _transfer_all(transfers, policy)
+        _store(transfers, uploads)
+    finally:
+        for transfer in transfers:
+            if transfer.result is not None:
+                transfer.result.file.close()
+
+    for transfer in transfers:
+        if transfer.error is not None:
+            logger.warning(
+                "Failed to download %s for stories %s: %s",
+                transfer.url,
+                ", ".join(sorted(transfer.story_ids)),
+                transfer.error,
+            )
+    return transfers
+
+
+def _transfer_all(
+    transfers: list[Transfer],
+    policy: TransferPolicy,
+) -> dict[str, Transfer]:
+    """Download every transfer, uploading new content as downloads finish.
+
+    Every running fetch or upload holds one spooled file, and at most
+    ``policy.concurrency`` run at once: the next download only starts when a
+    file was closed. Returns the uploading transfer per hash.
+    """
+    slots = transfer_slots(policy)
+    queued = deque(transfers)
+    uploads: dict[str, Transfer] = {}
+    with ThreadPoolExecutor(
+        max_workers=policy.concurrency,
+        thread_name_prefix="media-transfer",
+    ) as pool:
+        fetching: dict[Future, Transfer] = {}
+        uploading: dict[Future, Transfer] = {}
+        while queued or fetching or uploading:
+            while queued and len(fetching) + len(uploading) < policy.concurrency:
+                transfer = queued.popleft()
+                fetching[pool.submit(_fetch, transfer, slots, policy)] = transfer
+            done, _ = wait([*fetching, *uploading], return_when=FIRST_COMPLETED)
+
+            for future in done & uploading.keys():
+                _close(uploading.pop(future))
+            fetched = [fetching.pop(future) for future in done & fetching.keys()]
+            downloaded = [
+                (transfer, transfer.result)
+                for transfer in fetched
+                if transfer.result is not None
+            ]
+            if not downloaded:
+                continue
+            known = MediaBlob.objects.in_bulk(
+                {result.sha256 for _, result in downloaded},
+            )
+            for transfer, result in downloaded:
+                if result.sha256 in known or result.sha256 in uploads:
+                    _close(transfer)
+                    continue
+                uploads[result.sha256] = transfer
+                future = pool.submit(_upload, transfer, result, policy.deadline)
+                uploading[future] = transfer
+    return uploads
+
+
+def _close(transfer: Transfer):
+    # The download's size and hash stay available once its file is closed
+    if transfer.result is not None:
+        transfer.result.file.close()
+
+
+def _store(transfers: list[Transfer], uploads: dict[str, Transfer]):
+    # A transfer without a result got no content to store
+    downloaded = [
+        (transfer, transfer.result)
+        for transfer in transfers
+        if transfer.error is None and transfer.result is not None
+    ]
+    # Transfers of content that failed to upload get its error
+    for transfer, result in downloaded:
+        upload = uploads.get(result.sha256)
+        if upload is not None and upload.error is not None:
+            transfer.error = upload.error
+    stored = [
+        (transfer, result) for transfer, result in downloaded if transfer.error is None
+    ]
+
+    references: Counter[str] = Counter()
+    for transfer, result in stored:
+        references[result.sha256] += len(transfer.targets)
+    blobs: dict[str, MediaBlob] = {}
+    for _, result in stored:
+        sha256 = result.sha256
+        if sha256 not in blobs:
+            upload = uploads.get(sha256)
+            blobs[sha256] = adopt_blob(
+                result,
+                upload.uploaded_name if upload else None,
+                count=references[sha256],
+            )
+
+    updates: defaultdict[str, dict[str, object]] = defaultdict(dict)
+    for transfer, result in stored:
+        blob = blobs[result.sha256]
+        for story, field_name in transfer.targets:
+            updates[story.pk][field_name] = blob.file.name
+            updates[story.pk][f"{field_name}_blob"] = blob
+    for story_id, values in updates.items():
+        Story.objects.filter(pk=story_id).update(**values)
+    logger.info(
+        "Stored media of %d stories: %d downloads, %d new blobs",
+        len(updates),
+        len(stored),
+        len(uploads),
+    )
+
+
+@dataclass
+class BackfillResult:
+    """Outcome of ``backfill_blobs`` for one batch of rows."""
+
+    hashed: int = 0
+    missing: int = 0
+    new_blobs: int = 0
+    duplicates: int = 0
+    duplicate_bytes: int = 0
+    redundant_names: list[str] = field(default_factory=list)
+
+
+def backfill_blobs(model, field_name, rows, pool, chunk_size):
+    """Point rows stored before media blobs at the blob of their content.
+
+    The files are hashed on ``pool``. The first copy of each content becomes
+    its blob as it is; rows holding another copy are pointed at the blob's
+    file, and the names of those copies are returned for deletion.
+
+    Args:
+        model: Story or User
+        field_name: File field of ``model``, with a ``<field_name>_blob`` key
+        rows: ``(pk, file name)`` pairs
+        pool: Executor to hash the files on
+        chunk_size: Bytes read from storage at a time
+
+    Returns:
+        BackfillResult: Counters and the redundant file names
+    """
+    result = BackfillResult()
+    names = {name for _, name in rows}
+    hashes = dict(
+        zip(
+            names,
+            pool.map(lambda name: hash_stored_file(name, chunk_size), names),
+            strict=True,
+        ),
+    )
+    hashed = {name: value for name, value in hashes.items() if value is not None}
+    result.hashed = len(hashed)
+    result.missing = len(names) - len(hashed)
+
+    blob_field = f"{field_name}_blob"
+    with transaction.atomic():
+        blobs = MediaBlob.objects.in_bulk({sha256 for sha256, _ in hashed.values()})
+        updated = []
+        for pk, name in rows:
+            if name not in hashed:
+                continue
+            sha256, size = hashed[name]
+            blob = blobs.get(sha256)
+            if blob is None:
+                blob = MediaBlob.objects.create(
+                    sha256=sha256,
+                    file=name,
+                    size=size,
+                    mime_type=mimetypes.guess_type(name)[0] or "",
+                )
+                blobs[sha256] = blob
+                result.new_blobs += 1
+            elif blob.file.name != name:
+                result.redundant_names.append(name)
+                result.duplicates += 1
+                result.duplicate_bytes += size
+            updated.append(
+                model(pk=pk, **{field_name: blob.file.name, blob_field: blob}),
+            )
+        model.objects.bulk_update(updated, [field_name, blob_field])
+        references = Counter(getattr(row, f"{blob_field}_id") for row in updated)
+        for sha256, count in references.items():
+            MediaBlob.acquire(sha256, name=None, size=0, count=count)
+    return result
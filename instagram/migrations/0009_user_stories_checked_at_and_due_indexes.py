@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instagram', '0008_alter_story_thumbnail_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='stories_checked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Stories Checked At'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('allow_auto_update_profile', True)), fields=['api_updated_at'], name='instagram_user_profile_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('allow_auto_update_stories', True)), fields=['stories_checked_at'], name='instagram_user_stories_due_idx'),
+        ),
+    ]
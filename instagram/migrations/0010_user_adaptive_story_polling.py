@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instagram', '0009_user_stories_checked_at_and_due_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='instagram_user_stories_due_idx',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='stories_next_poll_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Next Stories Poll At'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='stories_poll_interval',
+            field=models.FloatField(blank=True, null=True, verbose_name='Stories Poll Interval (s)'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='story_gap_ewma',
+            field=models.FloatField(blank=True, null=True, verbose_name='Smoothed Gap Between Stories (s)'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('allow_auto_update_stories', True)), fields=['stories_next_poll_at'], name='instagram_user_stories_due_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instagram', '0010_user_adaptive_story_polling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('file', models.FileField(max_length=512, upload_to='')),
+                ('size', models.PositiveBigIntegerField()),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Media Blob',
+                'verbose_name_plural': 'Media Blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='media_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='instagram.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='thumbnail_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='instagram.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='instagram.mediablob'),
+        ),
+    ]
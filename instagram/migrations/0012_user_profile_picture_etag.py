@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instagram', '0011_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_etag',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:36
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_api_updated_at(apps, schema_editor):
+    # Keep every user's place in the refresh schedule
+    User = apps.get_model("instagram", "User")
+    User.objects.update(profile_checked_at=F("api_updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instagram', '0012_user_profile_picture_etag'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='instagram_user_profile_due_idx',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_checked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Profile Checked At'),
+        ),
+        migrations.RunPython(copy_api_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('allow_auto_update_profile', True)), fields=['profile_checked_at'], name='instagram_user_profile_due_idx'),
+        ),
+    ]
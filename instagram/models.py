@@ -1,20 +1,83 @@
 import logging
 import uuid
+from collections import Counter
+from datetime import timedelta
 
 from django.db import models
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from simple_history.models import HistoricalRecords
 
 from core.utils.instagram_api import fetch_user_info_by_user_id
 from core.utils.instagram_api import fetch_user_info_by_username_v2
 from core.utils.instagram_api import fetch_user_stories_by_username
+from core.utils.task_lock import enqueue_once
+from core.utils.upstream_errors import error_for_payload
 
+from .locks import STORIES_LOCK
+from .locks import user_lock
 from .misc import get_user_profile_picture_upload_location
 from .misc import get_user_story_upload_location
+from .polling import PollingPolicy
+from .polling import story_gaps
 
 logger = logging.getLogger(__name__)
 
 
+class MediaBlob(models.Model):
+    """A stored file, identified by the sha256 of its content.
+
+    Story files and profile pictures with the same bytes resolve to one blob,
+    so they are uploaded and stored once. ``ref_count`` counts the file fields
+    pointing at the blob; blobs nobody references any more are removed by
+    ``manage.py backfill_media_blobs --prune``.
+    """
+
+    sha256 = models.CharField(primary_key=True, max_length=64)
+    file = models.FileField(max_length=512)
+    size = models.PositiveBigIntegerField()
+    mime_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Media Blob"
+        verbose_name_plural = "Media Blobs"
+
+    def __str__(self):
+        return self.sha256
+
+    @staticmethod
+    def name_for(sha256, extension):
+        """Storage name of new content: its hash, sharded by the first byte."""
+        return f"blobs/{sha256[:2]}/{sha256}.{extension}"
+
+    @classmethod
+    def acquire(cls, sha256, *, name, size, mime_type="", count=1):
+        """Get or create the blob of ``sha256`` and add ``count`` references.
+
+        ``name`` is only stored when the blob is new; callers use the returned
+        blob's file name, which may differ if another process stored the same
+        content first.
+        """
+        blob, _ = cls.objects.get_or_create(
+            sha256=sha256,
+            defaults={"file": name, "size": size, "mime_type": mime_type},
+        )
+        cls.objects.filter(pk=sha256).update(ref_count=F("ref_count") + count)
+        return blob
+
+    @classmethod
+    def release(cls, *sha256s):
+        """Drop one reference per given hash (None entries are ignored)."""
+        for sha256, count in Counter(filter(None, sha256s)).items():
+            cls.objects.filter(pk=sha256).update(
+                ref_count=Greatest(F("ref_count") - count, 0),
+            )
+
+
 class User(models.Model):
     uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -27,6 +90,17 @@ class User(models.Model):
         null=True,
         max_length=512,
     )
+    # Content of profile_picture, which is stored under the blob's file name
+    profile_picture_blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name="+",
+    )
+    # ETag the picture was served with, sent back to skip unchanged downloads
+    profile_picture_etag = models.CharField(max_length=255, blank=True)
     original_profile_picture_url = models.URLField(
         max_length=2500,
         blank=True,
@@ -51,7 +125,68 @@ class User(models.Model):
         blank=True,
         null=True,
     )
-    history = HistoricalRecords()
+    # Last time the profile was fetched, whether or not it succeeded
+    profile_checked_at = models.DateTimeField(
+        verbose_name="Profile Checked At",
+        blank=True,
+        null=True,
+    )
+    # Last time stories were fetched, whether or not it succeeded
+    stories_checked_at = models.DateTimeField(
+        verbose_name="Stories Checked At",
+        blank=True,
+        null=True,
+    )
+    # Adaptive story polling state, see instagram.polling
+    stories_next_poll_at = models.DateTimeField(
+        verbose_name="Next Stories Poll At",
+        blank=True,
+        null=True,
+    )
+    stories_poll_interval = models.FloatField(
+        verbose_name="Stories Poll Interval (s)",
+        blank=True,
+        null=True,
+    )
+    story_gap_ewma = models.FloatField(
+        verbose_name="Smoothed Gap Between Stories (s)",
+        blank=True,
+        null=True,
+    )
+    history = HistoricalRecords(
+        excluded_fields=[
+            "profile_picture_blob",
+            "profile_picture_etag",
+            "profile_checked_at",
+            "stories_checked_at",
+            "stories_next_poll_at",
+            "stories_poll_interval",
+            "story_gap_ewma",
+        ],
+    )
+
+    # Fields written by mark_stories_checked
+    STORIES_CHECK_FIELDS = (
+        "stories_checked_at",
+        "stories_next_poll_at",
+        "stories_poll_interval",
+        "story_gap_ewma",
+    )
+
+    class Meta:
+        indexes = [
+            # Range scans of the refresh scheduler over auto-updated users
+            models.Index(
+                fields=["profile_checked_at"],
+                condition=models.Q(allow_auto_update_profile=True),
+                name="instagram_user_profile_due_idx",
+            ),
+            models.Index(
+                fields=["stories_next_poll_at"],
+                condition=models.Q(allow_auto_update_stories=True),
+                name="instagram_user_stories_due_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.username
@@ -96,19 +231,56 @@ class User(models.Model):
         following_edge = data.get("edge_follow", {})
         self.following_count = following_edge.get("count", 0)
 
-    def update_profile_from_api(self):
-        """Update user profile from Instagram API using the instance's username first, then instagram_id as fallback."""  # noqa: E501
+    def update_profile_from_api(self, *, allow_stale=False, force_refresh=False):
+        """Update user profile from Instagram API using the instance's username first, then instagram_id as fallback.
+
+        Args:
+            allow_stale: Accept an expired cached API response while it is refreshed
+            force_refresh: Bypass the API response cache
+        """  # noqa: E501
+        cache_options = {"allow_stale": allow_stale, "force_refresh": force_refresh}
 
-        # Always try username first
-        response = fetch_user_info_by_username_v2(self.username)
-        api_method = "username_v2"
+        try:
+            # Always try username first
+            response = fetch_user_info_by_username_v2(self.username, **cache_options)
+            api_method = "username_v2"
+
+            # If username API fails and we have instagram_id, try user_id as fallback
+            if instagram_id := self.user_id_fallback(response):
+                response = fetch_user_info_by_user_id(instagram_id, **cache_options)
+                api_method = "user_id"
+
+            self.apply_profile_api_response(response, api_method)
+        except Exception:
+            self.mark_profile_checked()
+            raise
+        self.save()
 
-        # If username API fails and we have instagram_id, try user_id as fallback
+    def mark_profile_checked(self):
+        """Record a failed profile check, so the scheduler moves on to others.
+
+        Saved with a queryset update, so without a history entry. Successful
+        checks are recorded by ``apply_profile_api_response``.
+        """
+        self.profile_checked_at = timezone.now()
+        User.objects.filter(pk=self.pk).update(
+            profile_checked_at=self.profile_checked_at,
+        )
+
+    def user_id_fallback(self, response) -> str | None:
+        """Return the ID to retry a failed username_v2 response with, if any."""
         username_failed = not response.get("data") or not response["data"].get("status")
         if username_failed and self.instagram_id:
-            response = fetch_user_info_by_user_id(self.instagram_id)
-            api_method = "user_id"
+            return self.instagram_id
+        return None
+
+    def apply_profile_api_response(self, response, api_method):
+        """Copy a profile API response onto the instance without saving it.
 
+        Args:
+            response: Parsed JSON response from the Core API
+            api_method: ``"username_v2"`` or ``"user_id"``, the endpoint used
+        """
         # Check for errors in the response and throw an exception
         if response.get("data") and not response["data"].get("status"):
             msg = "Error fetching data for user %s. %s " % (  # noqa: UP031
@@ -116,7 +288,7 @@ class User(models.Model):
                 response["data"].get("errorMessage", ""),
             )
             logger.error(msg)
-            raise Exception(msg)  # noqa: TRY002
+            raise error_for_payload(response["data"], msg)
 
         data = response.get("data")
         self.raw_api_data = data
@@ -127,64 +299,61 @@ class User(models.Model):
         else:
             self._extract_api_data_from_username_v2(data)
 
-        # Update timestamp and save
-        self.api_updated_at = timezone.now()
-        self.save()
+        # Update timestamps
+        self.api_updated_at = self.profile_checked_at = timezone.now()
+
+    def story_items_from_api_response(self, response):
+        """Return the story items of a stories API response.
+
+        Raises:
+            UpstreamError: The response reports an error
+        """
+        if response.get("data") and not response["data"].get("status"):
+            error_message = response["data"].get("errorMessage", "Unknown API error")
+            msg = f"Error fetching stories for user {self.username}. {error_message}"
+            logger.error(msg)
+            raise error_for_payload(response["data"], msg)
+        return response.get("data", {}).get("data", {}).get("items", [])
+
+    def _update_stories_from_api(self, response=None, *, force_refresh=False):
+        """Update user stories from Instagram API with full error handling and logging.
 
-    def _update_stories_from_api(self):
-        """Update user stories from Instagram API with full error handling and logging."""  # noqa: E501
+        Args:
+            response: Already fetched stories response. When omitted the
+                stories are fetched here.
+            force_refresh: Bypass the API response cache when fetching
+        """
         # Create log entry to track this operation
         log_entry = UserUpdateStoryLog.objects.create(
             user=self,
             status=UserUpdateStoryLog.STATUS_IN_PROGRESS,
             message="Started story update from API",
         )
+        # Creation times of the stories first seen here; None if the check fails
+        new_story_times = None
+        previous_story_at = None
 
         try:
-            # Fetch stories from Instagram API
-            response = fetch_user_stories_by_username(self.username)
+            previous_story_at = self.story_set.aggregate(
+                latest=models.Max("story_created_at"),
+            )["latest"]
 
-            # Check for errors in the response
-            if response.get("data") and not response["data"].get("status"):
-                error_message = response["data"].get(
-                    "errorMessage",
-                    "Unknown API error",
-                )
-                msg = (
-                    f"Error fetching stories for user {self.username}. {error_message}"
-                )
-                logger.error(msg)
-
-                # Update log entry with failure
-                log_entry.status = UserUpdateStoryLog.STATUS_FAILED
-                log_entry.message = msg
-                log_entry.save()
-
-                raise Exception(msg)  # noqa: TRY002, TRY301
-
-            # Extract stories data
-            stories_data = response.get("data", {}).get("data", {}).get("items", [])
-            updated_stories = []
-
-            # Process each story
-            for story_data in stories_data:
-                story_id = story_data.get("id")
-
-                # Create or update story
-                story, _ = Story.objects.get_or_create(
-                    story_id=story_id,
-                    defaults={
-                        "story_id": story_id,
-                        "user": self,
-                        "thumbnail_url": story_data.get("thumbnail_url_original"),
-                        "media_url": story_data.get("video_url_original")
-                        or story_data.get("thumbnail_url_original"),
-                        "story_created_at": story_data.get("taken_at_date"),
-                        "raw_api_data": story_data,
-                    },
+            # Fetch stories from Instagram API
+            if response is None:
+                response = fetch_user_stories_by_username(
+                    self.username,
+                    force_refresh=force_refresh,
                 )
 
-                updated_stories.append(story)
+            stories_data = self.story_items_from_api_response(response)
+            [updated_stories], created_ids = Story.upsert_from_api(
+                [(self, stories_data)],
+            )
+            created_times = [
+                story.story_created_at
+                for story in updated_stories
+                if story.story_id in created_ids
+            ]
 
             # Update log entry with success
             log_entry.status = UserUpdateStoryLog.STATUS_COMPLETED
@@ -196,15 +365,14 @@ class User(models.Model):
                 len(updated_stories),
                 self.username,
             )
+            new_story_times = created_times
             return updated_stories  # noqa: TRY300
 
         except Exception as e:
-            # Update log entry with failure if not
-            #  already updated
-            if log_entry.status == UserUpdateStoryLog.STATUS_IN_PROGRESS:
-                log_entry.status = UserUpdateStoryLog.STATUS_FAILED
-                log_entry.message = str(e)
-                log_entry.save()
+            # Update log entry with failure
+            log_entry.status = UserUpdateStoryLog.STATUS_FAILED
+            log_entry.message = str(e)
+            log_entry.save()
 
             logger.exception(
                 "Failed to update stories for user %s: %s",
@@ -213,19 +381,84 @@ class User(models.Model):
             )
             raise
 
-    def update_stories_from_api(self):
-        """Update user stories from Instagram API synchronously."""
-        return self._update_stories_from_api()
+        finally:
+            self.mark_stories_checked(
+                new_story_times,
+                previous_story_at=previous_story_at,
+            )
+
+    def plan_stories_check(
+        self,
+        new_story_times=None,
+        *,
+        previous_story_at=None,
+        policy,
+        now,
+    ):
+        """Set the ``STORIES_CHECK_FIELDS`` of a stories check without saving.
+
+        Args:
+            new_story_times: Creation times of the stories first seen by the
+                check, or None when it failed (retried after the minimum
+                interval)
+            previous_story_at: Newest story known before the check
+            policy: Polling policy to plan the next poll with
+            now: Time of the check
+        """
+        if new_story_times is None:
+            next_poll_in = policy.min_interval
+        else:
+            self.story_gap_ewma, self.stories_poll_interval = policy.update(
+                self.story_gap_ewma,
+                self.stories_poll_interval,
+                new_stories=len(new_story_times),
+                gaps=story_gaps(previous_story_at, new_story_times),
+            )
+            next_poll_in = self.stories_poll_interval
+
+        self.stories_checked_at = now
+        self.stories_next_poll_at = now + timedelta(seconds=next_poll_in)
+
+    def mark_stories_checked(self, new_story_times=None, *, previous_story_at=None):
+        """Record a stories check and plan the next poll.
+
+        Saved with a queryset update, so without a history entry. See
+        ``plan_stories_check`` for the arguments.
+        """
+        self.plan_stories_check(
+            new_story_times,
+            previous_story_at=previous_story_at,
+            policy=PollingPolicy.from_settings(),
+            now=timezone.now(),
+        )
+        User.objects.filter(pk=self.pk).update(
+            **{field: getattr(self, field) for field in self.STORIES_CHECK_FIELDS},
+        )
+
+    def update_stories_from_api(self, *, force_refresh=False):
+        """Update user stories from Instagram API synchronously.
+
+        Args:
+            force_refresh: Bypass the API response cache
+        """
+        return self._update_stories_from_api(force_refresh=force_refresh)
 
     def update_stories_from_api_async(self):
         """
         Trigger asynchronous update of user stories from Instagram API.
         Use this method to queue the story update as a background task.
+
+        Returns None instead of queueing a second task while a story update
+        of this user is queued or running.
         """
         from .tasks import update_user_stories_from_api  # noqa: PLC0415
 
         logger.info("Queuing story update task for user %s", self.username)
-        return update_user_stories_from_api.delay(self.uuid)
+        return enqueue_once(
+            update_user_stories_from_api,
+            user_lock(STORIES_LOCK, self.uuid),
+            str(self.uuid),
+        )
 
 
 class Story(models.Model):
@@ -244,11 +477,31 @@ class Story(models.Model):
         blank=True,
         null=True,
     )
+    # Contents of thumbnail and media, stored under the blobs' file names
+    thumbnail_blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name="+",
+    )
+    media_blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name="+",
+    )
     raw_api_data = models.JSONField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     story_created_at = models.DateTimeField()
 
+    # Fields refreshed from the API when an already stored story comes back
+    API_FIELDS = ("thumbnail_url", "media_url", "raw_api_data")
+
     class Meta:
         verbose_name = "Story"
         verbose_name_plural = "Stories"
@@ -256,6 +509,105 @@ class Story(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.story_id}"
 
+    @classmethod
+    def from_api(cls, user, story_data):
+        return cls(
+            story_id=story_data["id"],
+            user=user,
+            thumbnail_url=story_data.get("thumbnail_url_original") or "",
+            media_url=story_data.get("video_url_original")
+            or story_data.get("thumbnail_url_original")
+            or "",
+            story_created_at=story_data.get("taken_at_date"),
+            raw_api_data=story_data,
+        )
+
+    @staticmethod
+    def _items_by_id(user, items):
+        items_by_id = {}
+        for story_data in items:
+            if not story_data.get("id"):
+                logger.warning("Skipping story without id for user %s", user)
+                continue
+            items_by_id[str(story_data["id"])] = story_data
+        return items_by_id
+
+    @classmethod
+    def upsert_from_api(cls, items_by_user):
+        """Store the story items of any number of users with a fixed number of queries.
+
+        The stored copies of the batch are loaded in one query. New stories
+        and stories whose URLs or raw data changed are then written with one
+        ``INSERT ... ON CONFLICT DO UPDATE``, which also absorbs a concurrent
+        insert of the same story. The media of new stories are queued for
+        download in one task once the transaction commits (bulk writes do not
+        send ``post_save``).
+
+        Args:
+            items_by_user: ``(user, story items)`` pairs, the items as found in
+                the user's stories API response
+
+        Returns:
+            tuple: The stories of each user, in input and response order, and
+                the set of ids created
+        """
+        incoming = [
+            (user, cls._items_by_id(user, items)) for user, items in items_by_user
+        ]
+
+        existing = cls.objects.in_bulk(
+            [story_id for _, user_items in incoming for story_id in user_items],
+        )
+        stories_by_user = []
+        to_write = {}
+        created_ids = set()
+        for user, user_items in incoming:
+            stories = []
+            for story_id, story_data in user_items.items():
+                fresh = cls.from_api(user, story_data)
+                story = existing.get(story_id)
+                if story is None:
+                    created_ids.add(story_id)
+                    to_write[story_id] = fresh
+                    stories.append(fresh)
+                    continue
+                changed = [
+                    field
+                    for field in cls.API_FIELDS
+                    if getattr(story, field) != getattr(fresh, field)
+                ]
+                if changed:
+                    for field in cls.API_FIELDS:
+                        setattr(story, field, getattr(fresh, field))
+                    to_write[story_id] = story
+                stories.append(story)
+            stories_by_user.append(stories)
+
+        if to_write:
+            cls.objects.bulk_create(
+                list(to_write.values()),
+                update_conflicts=True,
+                unique_fields=["story_id"],
+                update_fields=list(cls.API_FIELDS),
+            )
+        if created_ids:
+            from .tasks import download_stories_media  # noqa: PLC0415
+
+            story_ids = sorted(created_ids)
+            transaction.on_commit(lambda: download_stories_media.delay(story_ids))
+        return stories_by_user, created_ids
+
+    def missing_media(self):
+        """Return ``(field name, url)`` of the files not downloaded yet."""
+        return [
+            (field_name, url)
+            for field_name, url in (
+                ("thumbnail", self.thumbnail_url),
+                ("media", self.media_url),
+            )
+            if url and not getattr(self, field_name)
+        ]
+
 
 class UserUpdateStoryLog(models.Model):
     STATUS_PENDING = "PENDING"
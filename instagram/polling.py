@@ -0,0 +1,174 @@
+"""Adaptive story polling.
+
+Each user's poll interval follows their posting rhythm. The gaps between
+consecutive stories are exponentially smoothed, and after a check that found
+new stories the next poll is ``STORIES_POLL_GAP_FRACTION`` of the smoothed
+gap away. Every check that finds nothing new stretches the interval by
+``STORIES_POLL_MISS_BACKOFF``. Intervals stay within
+``[STORIES_POLL_MIN_INTERVAL, STORIES_POLL_MAX_INTERVAL]``, and the maximum
+never exceeds the 24 hour story lifetime less one minimum interval, so a
+story is always still up at the next poll.
+
+``simulate`` replays story timestamps against a policy (or a fixed interval)
+to compare upstream calls and missed stories.
+"""
+
+import bisect
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import pairwise
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+STORY_LIFETIME_SECONDS = 24 * 60 * 60
+
+
+def _as_datetime(value):
+    return parse_datetime(value) if isinstance(value, str) else value
+
+
+def story_gaps(previous_story_at, new_story_times) -> list[float]:
+    """Seconds between consecutive stories, starting from the newest known one."""
+    times = sorted(
+        time for time in map(_as_datetime, new_story_times) if time is not None
+    )
+    if previous_story_at is not None:
+        times = [previous_story_at, *times]
+    return [(later - earlier).total_seconds() for earlier, later in pairwise(times)]
+
+
+@dataclass(frozen=True)
+class PollingPolicy:
+    min_interval: float
+    max_interval: float
+    initial_interval: float
+    smoothing: float
+    gap_fraction: float
+    miss_backoff: float
+
+    @classmethod
+    def from_settings(cls):
+        min_interval = settings.STORIES_POLL_MIN_INTERVAL
+        return cls(
+            min_interval=min_interval,
+            max_interval=min(
+                settings.STORIES_POLL_MAX_INTERVAL,
+                STORY_LIFETIME_SECONDS - min_interval,
+            ),
+            initial_interval=settings.STORIES_REFRESH_INTERVAL,
+            smoothing=settings.STORIES_POLL_SMOOTHING,
+            gap_fraction=settings.STORIES_POLL_GAP_FRACTION,
+            miss_backoff=settings.STORIES_POLL_MISS_BACKOFF,
+        )
+
+    def clamp(self, seconds: float) -> float:
+        return min(max(seconds, self.min_interval), self.max_interval)
+
+    def update(
+        self,
+        gap_ewma: float | None,
+        interval: float | None,
+        *,
+        new_stories: int,
+        gaps: list[float],
+    ) -> tuple[float | None, float]:
+        """Return the smoothed gap and poll interval after a successful check.
+
+        Args:
+            gap_ewma: Smoothed gap between stories so far (seconds), if any
+            interval: Current poll interval (seconds), if any
+            new_stories: Stories first seen by this check
+            gaps: Gaps between those stories and the newest one known before
+        """
+        interval = interval or self.initial_interval
+        if not new_stories:
+            return gap_ewma, self.clamp(interval * self.miss_backoff)
+
+        for gap in gaps:
+            if gap_ewma is None:
+                gap_ewma = gap
+            else:
+                gap_ewma = self.smoothing * gap + (1 - self.smoothing) * gap_ewma
+        if gap_ewma is None:
+            # A first story: poll sooner, there is no rhythm to follow yet
+            return None, self.clamp(interval / self.miss_backoff)
+        return gap_ewma, self.clamp(gap_ewma * self.gap_fraction)
+
+
+@dataclass
+class SimulationResult:
+    polls: int = 0
+    stories: int = 0
+    captured: int = 0
+
+    @property
+    def missed(self) -> int:
+        return self.stories - self.captured
+
+    def __add__(self, other):
+        return SimulationResult(
+            polls=self.polls + other.polls,
+            stories=self.stories + other.stories,
+            captured=self.captured + other.captured,
+        )
+
+
+def simulate(  # noqa: PLR0913
+    story_times: list[datetime],
+    *,
+    start: datetime,
+    end: datetime,
+    policy: PollingPolicy | None = None,
+    fixed_interval: float | None = None,
+    lifetime: float = STORY_LIFETIME_SECONDS,
+) -> SimulationResult:
+    """Replay one user's stories against adaptive or fixed-interval polling.
+
+    Polls run from ``start`` until ``end``. Only stories whose whole
+    ``lifetime`` lies inside the window are counted; one is captured when a
+    poll happens while it is up.
+
+    Raises:
+        ValueError: Neither ``policy`` nor ``fixed_interval`` was given
+    """
+    if policy is None and not fixed_interval:
+        msg = "simulate() needs a policy or a fixed interval"
+        raise ValueError(msg)
+
+    origin = start.timestamp()
+    horizon = end.timestamp() - origin
+    times = sorted(time.timestamp() - origin for time in story_times)
+    result = SimulationResult(
+        stories=sum(1 for time in times if time >= 0 and time + lifetime <= horizon),
+    )
+
+    gap_ewma = interval = None
+    last_seen = None
+    seen_until = bisect.bisect_right(times, 0)  # stories up before start
+    now = 0.0
+    while now < horizon:
+        result.polls += 1
+        first_visible = bisect.bisect_right(times, now - lifetime)
+        up_to = bisect.bisect_right(times, now)
+        new = times[max(first_visible, seen_until) : up_to]
+        result.captured += sum(
+            1 for time in new if time >= 0 and time + lifetime <= horizon
+        )
+        seen_until = max(seen_until, up_to)
+
+        if fixed_interval:
+            now += fixed_interval
+            continue
+        assert policy is not None  # checked above
+        anchors = [last_seen, *new] if last_seen is not None else new
+        gap_ewma, interval = policy.update(
+            gap_ewma,
+            interval,
+            new_stories=len(new),
+            gaps=[later - earlier for earlier, later in pairwise(anchors)],
+        )
+        if new:
+            last_seen = new[-1]
+        now += interval
+    return result
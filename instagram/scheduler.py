@@ -0,0 +1,182 @@
+"""Staleness-driven scheduling of profile and story refreshes.
+
+Each beat tick picks the auto-updated users that are due, most overdue (and
+never refreshed) first, up to a per-tick budget. Profiles are due once
+``profile_checked_at`` is older than ``PROFILE_REFRESH_INTERVAL``; stories once
+their adaptive ``stories_next_poll_at`` has passed (see ``instagram.polling``).
+Both move forward on failed fetches too, so users whose refresh keeps failing
+(not found, private) wait their turn instead of taking the whole budget.
+Their tasks are published with countdowns spread evenly over the tick, so the
+Core API and the workers see a steady rate instead of a burst at every tick.
+Users refreshed by any other path (admin action, batch task) are simply not
+due yet, and users whose refresh of the kind is still queued or running (its
+per-user ``TaskLock`` is held) are skipped.
+
+Due users are found with range scans on the partial indexes over
+``profile_checked_at`` and ``stories_next_poll_at``. Users with no timestamp yet
+are taken first.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timedelta
+
+from celery import group
+from django.conf import settings
+from django.utils import timezone
+
+from core.utils.task_lock import TaskLock
+
+from .locks import PROFILE_LOCK
+from .locks import STORIES_LOCK
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RefreshKind:
+    """A kind of refresh and the field that tells when a user is due.
+
+    With ``interval_setting``, ``due_field`` is the time of the last refresh
+    and users are due that many seconds later; without it, ``due_field`` is
+    the time the next refresh is due.
+    """
+
+    name: str
+    enabled_field: str
+    due_field: str
+    interval_setting: str | None
+    budget_setting: str
+    lock_kind: str
+
+    def cutoff(self, now: datetime) -> datetime:
+        if self.interval_setting is None:
+            return now
+        return now - timedelta(seconds=getattr(settings, self.interval_setting))
+
+    @property
+    def budget(self) -> int:
+        return getattr(settings, self.budget_setting)
+
+
+PROFILE = RefreshKind(
+    name="profile",
+    enabled_field="allow_auto_update_profile",
+    due_field="profile_checked_at",
+    interval_setting="PROFILE_REFRESH_INTERVAL",
+    budget_setting="PROFILE_REFRESH_BUDGET",
+    lock_kind=PROFILE_LOCK,
+)
+STORIES = RefreshKind(
+    name="stories",
+    enabled_field="allow_auto_update_stories",
+    due_field="stories_next_poll_at",
+    interval_setting=None,
+    budget_setting="STORIES_REFRESH_BUDGET",
+    lock_kind=STORIES_LOCK,
+)
+
+
+def _due(kind: RefreshKind, now: datetime | None):
+    cutoff = kind.cutoff(now or timezone.now())
+    users = User.objects.filter(**{kind.enabled_field: True})
+    never = users.filter(**{f"{kind.due_field}__isnull": True})
+    stale = users.filter(**{f"{kind.due_field}__lt": cutoff})
+    return never, stale
+
+
+def due_user_ids(kind: RefreshKind, *, limit: int, now: datetime | None = None):
+    """Return up to ``limit`` ids of users due for a refresh, stalest first."""
+    never, stale = _due(kind, now)
+    # Two index range scans rather than one "IS NULL OR <" scan
+    user_ids = [str(pk) for pk in never.order_by().values_list("pk", flat=True)[:limit]]
+    if len(user_ids) < limit:
+        user_ids += [
+            str(pk)
+            for pk in stale.order_by(kind.due_field).values_list("pk", flat=True)[
+                : limit - len(user_ids)
+            ]
+        ]
+    return user_ids
+
+
+def count_due(kind: RefreshKind, *, now: datetime | None = None) -> int:
+    never, stale = _due(kind, now)
+    return never.count() + stale.count()
+
+
+def spread_countdowns(count: int, window: float) -> list[float]:
+    """Evenly spaced start offsets (seconds) for ``count`` tasks over ``window``."""
+    if not count:
+        return []
+    step = window / count
+    return [round(i * step, 1) for i in range(count)]
+
+
+def schedule_refreshes(
+    kind: RefreshKind,
+    task,
+    *,
+    budget: int | None = None,
+    now: datetime | None = None,
+) -> dict:
+    """Publish refresh tasks for the users most overdue for ``kind``.
+
+    Args:
+        kind: PROFILE or STORIES
+        task: Per-user task taking the user's UUID
+        budget: Maximum users scheduled this tick, defaults to the kind's
+            ``*_REFRESH_BUDGET`` setting
+        now: Current time, for tests
+
+    Returns:
+        dict: Users due, scheduled and left over for the next tick
+    """
+    budget = kind.budget if budget is None else budget
+    now = now or timezone.now()
+    due = count_due(kind, now=now)
+    user_ids = due_user_ids(kind, limit=budget, now=now)
+    countdowns = spread_countdowns(
+        len(user_ids),
+        settings.REFRESH_SCHEDULER_TICK_SECONDS,
+    )
+
+    signatures = []
+    locks = []
+    for user_id, countdown in zip(user_ids, countdowns, strict=True):
+        lock = TaskLock(kind.lock_kind, user_id)
+        token = lock.acquire(settings.TASK_LOCK_TTL + countdown, task_name=task.name)
+        if token is None:
+            continue
+        locks.append((lock, token))
+        signatures.append(task.s(user_id, lock_token=token).set(countdown=countdown))
+
+    batch_size = settings.FANOUT_PUBLISH_BATCH_SIZE
+    scheduled = 0
+    for start in range(0, len(signatures), batch_size):
+        try:
+            group(signatures[start : start + batch_size]).apply_async()
+        except Exception:
+            for lock, token in locks[start:]:
+                lock.release(token)
+            raise
+        scheduled += len(signatures[start : start + batch_size])
+
+    logger.info(
+        "Scheduled %d of %d users due for a %s refresh (%d already queued)",
+        scheduled,
+        due,
+        kind.name,
+        len(user_ids) - scheduled,
+    )
+    return {
+        "kind": kind.name,
+        "due": due,
+        "scheduled": scheduled,
+        "already_queued": len(user_ids) - scheduled,
+        "deferred": due - len(user_ids),
+        "budget": budget,
+        "spread_seconds": settings.REFRESH_SCHEDULER_TICK_SECONDS,
+    }
@@ -1,14 +1,15 @@
 import logging
-import uuid
 
-from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_delete
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from .models import MediaBlob
 from .models import Story
 from .models import User
-from .tasks import update_profile_picture_from_url
-from .utils import download_file_from_url
+from .tasks import download_stories_media
+from .tasks import queue_profile_picture_update
 
 logger = logging.getLogger(__name__)
 
@@ -17,38 +18,34 @@ logger = logging.getLogger(__name__)
 def user_post_save(sender, instance, created, **kwargs):
     """
     Trigger profile picture update task when User is saved.
-    Only triggers if original_profile_picture_url is present.
+    Only triggers if original_profile_picture_url is present. The task is
+    queued after commit, and a save while an update is queued or running
+    makes that update run once more (see ``queue_profile_picture_update``).
     """
     # Only trigger if we have an Instagram profile picture URL
     if instance.original_profile_picture_url:
-        # Use delay to run task asynchronously
-        update_profile_picture_from_url.delay(str(instance.uuid))
-        logger.info("Profile picture update task queued for user %s", instance.username)
+        queue_profile_picture_update(instance)
 
 
 @receiver(post_save, sender=Story)
-def download_story_media(sender, instance, created, **kwargs):
-    """Download media files from URLs when Story is saved."""
-    updated = False
-
-    # Download thumbnail if URL exists but file field is empty
-    if instance.thumbnail_url and not instance.thumbnail:
-        content, extension = download_file_from_url(instance.thumbnail_url)
-        if content and extension:
-            filename = f"{uuid.uuid4()}.{extension}"
-            instance.thumbnail.save(filename, ContentFile(content), save=False)
-            updated = True
-            logger.info("Downloaded thumbnail for story %s", instance.story_id)
-
-    # Download media if URL exists but file field is empty
-    if instance.media_url and not instance.media:
-        content, extension = download_file_from_url(instance.media_url)
-        if content and extension:
-            filename = f"{uuid.uuid4()}.{extension}"
-            instance.media.save(filename, ContentFile(content), save=False)
-            updated = True
-            logger.info("Downloaded media for story %s", instance.story_id)
-
-    # Save instance if any files were downloaded (avoid infinite loop)
-    if updated:
-        instance.save()
+def queue_story_media_download(sender, instance, created, **kwargs):
+    """Queue the download of a saved story's missing files after commit.
+
+    The download runs in the media transfer task, never inside the request
+    or task that saved the story.
+    """
+    if instance.missing_media():
+        story_ids = [instance.story_id]
+        transaction.on_commit(lambda: download_stories_media.delay(story_ids))
+
+
+@receiver(post_delete, sender=Story)
+def release_story_blobs(sender, instance, **kwargs):
+    """Drop the references of a deleted story to its media blobs."""
+    MediaBlob.release(instance.thumbnail_blob_id, instance.media_blob_id)
+
+
+@receiver(post_delete, sender=User)
+def release_profile_picture_blob(sender, instance, **kwargs):
+    """Drop the reference of a deleted user to their profile picture blob."""
+    MediaBlob.release(instance.profile_picture_blob_id)
@@ -1,21 +1,168 @@
-import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
 from celery import shared_task
-from django.core.files.base import ContentFile
-
+from django.conf import settings
+from django.db import transaction
+
+from core.utils.async_core_api import USER_INFO_BY_USERNAME_V2_ENDPOINT
+from core.utils.async_core_api import USER_STORIES_BY_USERNAME_ENDPOINT
+from core.utils.circuit_breaker import CircuitBreaker
+from core.utils.circuit_breaker import CircuitOpenError
+from core.utils.core_api import get_endpoint_name
+from core.utils.task_lock import enqueue_once
+from core.utils.task_lock import hold_task_lock
+from core.utils.upstream_errors import RetryPolicy
+from core.utils.upstream_errors import UpstreamError
+from core.utils.upstream_errors import is_retryable
+
+from .batch import refresh_profiles
+from .batch import refresh_stories
+from .fanout import FanoutProgress
+from .fanout import fan_out
+from .locks import PROFILE_LOCK
+from .locks import PROFILE_PICTURE_LOCK
+from .locks import STORIES_LOCK
+from .locks import hold_user_locks
+from .locks import user_lock
+from .media import TransferPolicy
+from .media import backfill_blobs
+from .media import download
+from .media import store_download
+from .media import transfer_story_media
+from .models import MediaBlob
+from .models import Story
 from .models import User
+from .scheduler import PROFILE
+from .scheduler import STORIES
+from .scheduler import schedule_refreshes
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def update_profile_picture_from_url(self, user_id):
+def _retry_or_fail(task, error, username, action):
+    """Retry ``task`` after a transient ``error``, or return its failure result.
+
+    Every per-user task goes through the shared ``RetryPolicy``: only
+    retryable errors (rate limits, upstream unavailable, open circuits, I/O)
+    are retried, with jittered exponential backoff that waits at least the
+    upstream's ``Retry-After``. Not found, private accounts, auth failures and
+    bad payloads fail at once.
+    """
+    attempts = task.request.retries + 1
+    delay = RetryPolicy.from_settings().delay(error, task.request.retries)
+    if delay is not None and task.request.retries < task.max_retries:
+        logger.warning(
+            "Retrying %s for %s in %ss (attempt %s/%s): %s",
+            action,
+            username,
+            delay,
+            attempts,
+            task.max_retries + 1,
+            error,
+        )
+        raise task.retry(exc=error, countdown=delay) from error
+
+    if isinstance(error, CircuitOpenError):
+        logger.warning("Skipping %s for %s: %s", action, username, error)
+        return {
+            "success": False,
+            "error": str(error),
+            "username": username,
+            "skipped": True,
+        }
+
+    if isinstance(error, UpstreamError) and not error.retryable:
+        logger.warning("Permanent error in %s for %s: %s", action, username, error)
+    else:
+        logger.exception(
+            "Failed %s for %s after %s attempts",
+            action,
+            username,
+            attempts,
+        )
+    return {
+        "success": False,
+        "error": str(error),
+        "error_type": type(error).__name__,
+        "username": username,
+        "attempts": attempts,
+    }
+
+
+def _skip_if_circuit_open(endpoint):
+    """Return a summary for a fan-out tick that is skipped, or None to proceed."""
+    breaker = CircuitBreaker(get_endpoint_name(endpoint))
+    if not breaker.is_open():
+        return None
+
+    logger.warning(
+        "Circuit open for %s, skipping this update run",
+        breaker.endpoint_name,
+    )
+    return {
+        "success": True,
+        "message": f"Skipped, circuit open for {breaker.endpoint_name}",
+        "skipped": True,
+        "queued": 0,
+        "errors": 0,
+    }
+
+
+def _already_queued(task, user_id):
+    return {
+        "success": False,
+        "error": f"Another {task.name} is queued or running for this user",
+        "user_id": str(user_id),
+        "skipped": True,
+    }
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+)
+def update_profile_picture_from_url(self, user_id, lock_token=None):
     """
     Update user's profile picture from Instagram URL if content has changed.
     Uses hash comparison to detect actual image content changes.
+
+    Args:
+        user_id (str): UUID of the user to update
+        lock_token (str | None): Token of the user's profile picture lock,
+            taken when the task was queued
+    """
+    lock = user_lock(PROFILE_PICTURE_LOCK, user_id)
+    with hold_task_lock(self, lock, lock_token) as held:
+        if not held:
+            return _already_queued(self, user_id)
+        return _update_profile_picture(self, user_id)
+
+
+def queue_profile_picture_update(user):
+    """Queue ``update_profile_picture_from_url`` once the transaction commits.
+
+    At most one update per user is queued or running. If one is, it runs
+    again when it is done, as it may have read the picture URL before
+    ``user`` was saved.
     """
+    user_id = str(user.uuid)
+
+    def enqueue():
+        queued = enqueue_once(
+            update_profile_picture_from_url,
+            user_lock(PROFILE_PICTURE_LOCK, user_id),
+            user_id,
+            rerun_if_held=True,
+        )
+        if queued is not None:
+            logger.info("Profile picture update task queued for user %s", user_id)
+
+    transaction.on_commit(enqueue)
+
+
+def _update_profile_picture(task, user_id):
     try:
         user = User.objects.get(uuid=user_id)
     except User.DoesNotExist:
@@ -26,91 +173,160 @@ def update_profile_picture_from_url(self, user_id):
         logger.info("No original profile picture URL for user %s", user.username)
         return {"success": False, "error": "No original profile picture URL"}
 
+    # The stored picture is known by its blob (hash) and the ETag it was
+    # served with; pictures saved before blobs are covered by
+    # backfill_profile_picture_blobs. Either way, it is never read back.
+    existing_image_hash = user.profile_picture_blob_id
+    etag = user.profile_picture_etag if existing_image_hash else ""
     try:
-        # Download image from Instagram URL
-        response = requests.get(user.original_profile_picture_url, timeout=30)
-        response.raise_for_status()
-
-        # Calculate hash of downloaded image content
-        new_image_content = response.content
-        new_image_hash = hashlib.sha256(new_image_content).hexdigest()
-
-        # Get hash of existing profile picture if it exists (S3-compatible)
-        existing_image_hash = None
-        if user.profile_picture:
-            try:
-                with user.profile_picture.open("rb") as f:
-                    existing_content = f.read()
-                    existing_image_hash = hashlib.sha256(existing_content).hexdigest()
-            except OSError as e:
-                logger.warning(
-                    "Could not read existing profile picture for %s: %s",
-                    user.username,
-                    e,
-                )
-
-        # Compare hashes - only update if different
-        if existing_image_hash == new_image_hash:
-            logger.info("Profile picture unchanged for user %s", user.username)
-            return {"success": True, "message": "No changes detected"}
-
-        # Save new image
-        # Extract filename from URL or use default
-        filename = f"{user.username}_profile.jpg"
-
-        # Save the new image
-        user.profile_picture.save(
-            filename,
-            ContentFile(new_image_content),
-            save=False,  # Don't save model yet to avoid triggering signal again
-        )
+        # Stream the image from Instagram, hashing it on the way
+        policy = TransferPolicy.from_settings()
+        with download(user.original_profile_picture_url, policy, etag) as picture:
+            if picture is None:
+                logger.info("Profile picture unchanged for user %s", user.username)
+                return {"success": True, "message": "No changes detected"}
+
+            # Compare hashes - only update if different
+            if existing_image_hash == picture.sha256:
+                if picture.etag != user.profile_picture_etag:
+                    User.objects.filter(uuid=user.uuid).update(
+                        profile_picture_etag=picture.etag,
+                    )
+                logger.info("Profile picture unchanged for user %s", user.username)
+                return {"success": True, "message": "No changes detected"}
+
+            # Point at the blob of the new image, uploading it if it is new
+            blob = store_download(picture, policy.deadline)
 
         # Update using queryset to avoid triggering signals
         User.objects.filter(uuid=user.uuid).update(
-            profile_picture=user.profile_picture.name,
+            profile_picture=blob.file.name,
+            profile_picture_blob=blob,
+            profile_picture_etag=picture.etag,
         )
+        MediaBlob.release(existing_image_hash)
 
         logger.info("Profile picture updated for user %s", user.username)
         return {  # noqa: TRY300
             "success": True,
             "message": "Profile picture updated",
             "old_hash": existing_image_hash,
-            "new_hash": new_image_hash,
+            "new_hash": picture.sha256,
         }
 
-    except (requests.RequestException, OSError) as e:
-        # Retryable errors: network issues, S3 timeouts, temporary file access issues
+    except Exception as e:  # noqa: BLE001
+        return _retry_or_fail(task, e, user.username, "profile picture update")
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+)
+def download_stories_media(self, story_ids):
+    """
+    Download the thumbnail and media of saved stories.
+
+    Queued after commit by every story save or refresh that left files to
+    download. Only the files still missing are transferred, so a retry (of
+    the stories with transient failures) repeats no finished download.
+
+    Args:
+        story_ids (list[str]): Ids of the stories to download media for
+    """
+    transfers = transfer_story_media(Story.objects.filter(story_id__in=story_ids))
+    failed = [transfer for transfer in transfers if transfer.error is not None]
+    retryable = [transfer for transfer in failed if is_retryable(transfer.error)]
+
+    if retryable and self.request.retries < self.max_retries:
+        countdown = RetryPolicy.from_settings().delay(
+            retryable[0].error,
+            self.request.retries,
+        )
+        retry_ids = sorted(set().union(*(transfer.story_ids for transfer in retryable)))
         logger.warning(
-            "Retryable error updating profile picture for %s (attempt %s/%s): %s",
-            user.username,
-            self.request.retries + 1,
-            self.max_retries + 1,
-            e,
+            "Retrying media download of %d stories in %ss",
+            len(retry_ids),
+            countdown,
         )
-        if self.request.retries < self.max_retries:
-            raise self.retry(exc=e, countdown=60 * (2**self.request.retries)) from e
+        raise self.retry(args=[retry_ids], countdown=countdown)
 
-        logger.exception(
-            "Max retries exceeded for profile picture update for %s",
-            user.username,
-        )
-        return {"success": False, "error": f"Max retries exceeded: {e!s}"}
+    return {
+        "success": not failed,
+        "downloaded": len(transfers) - len(failed),
+        "failed": sorted(set().union(*(transfer.story_ids for transfer in failed))),
+    }
 
-    except Exception as e:
-        # Non-retryable errors: permanent failures
-        logger.exception(
-            "Permanent error updating profile picture for %s",
-            user.username,
-        )
-        return {"success": False, "error": f"Permanent error: {e!s}"}
+
+@shared_task(bind=True)
+def backfill_profile_picture_blobs(self, batch_size=None, after=None):
+    """
+    Hash the profile pictures stored before media blobs, one batch per run.
+
+    Points each user at the blob of their picture, so that picture checks
+    compare hashes without reading the stored file back, then queues itself
+    for the next batch until every user is covered.
+
+    Args:
+        batch_size (int | None): Users per run, defaults to
+            settings.PROFILE_PICTURE_BACKFILL_BATCH_SIZE
+        after (str | None): Continue after this user id; users whose file is
+            missing from storage are skipped, not retried
+
+    Returns:
+        dict: Files hashed, missing and new blobs of this batch
+    """
+    batch_size = batch_size or settings.PROFILE_PICTURE_BACKFILL_BATCH_SIZE
+    users = (
+        User.objects.filter(profile_picture_blob=None)
+        .exclude(profile_picture__isnull=True)
+        .exclude(profile_picture="")
+        .order_by("uuid")
+    )
+    if after:
+        users = users.filter(uuid__gt=after)
+    rows = list(users.values_list("uuid", "profile_picture")[:batch_size])
+
+    policy = TransferPolicy.from_settings()
+    with ThreadPoolExecutor(max_workers=policy.concurrency) as pool:
+        result = backfill_blobs(User, "profile_picture", rows, pool, policy.chunk_size)
+
+    done = len(rows) < batch_size
+    if not done:
+        self.apply_async(kwargs={"batch_size": batch_size, "after": str(rows[-1][0])})
+    logger.info(
+        "Backfilled %d profile pictures (%d missing), done: %s",
+        result.hashed,
+        result.missing,
+        done,
+    )
+    return {
+        "success": True,
+        "hashed": result.hashed,
+        "missing": result.missing,
+        "new_blobs": result.new_blobs,
+        "done": done,
+    }
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def update_user_stories_from_api(self, user_id):
+def update_user_stories_from_api(self, user_id, lock_token=None):
     """
     Update user's stories from Instagram API in the background.
     Delegates business logic to the User model method.
+
+    Args:
+        user_id (str): UUID of the user to update
+        lock_token (str | None): Token of the user's stories lock, taken when
+            the task was queued
     """
+    with hold_task_lock(self, user_lock(STORIES_LOCK, user_id), lock_token) as held:
+        if not held:
+            return _already_queued(self, user_id)
+        return _update_user_stories(self, user_id)
+
+
+def _update_user_stories(task, user_id):
     try:
         user = User.objects.get(uuid=user_id)
     except User.DoesNotExist:
@@ -118,8 +334,9 @@ def update_user_stories_from_api(self, user_id):
         return {"success": False, "error": "User not found"}
 
     try:
-        # Call the model method which handles all business logic
-        updated_stories = user._update_stories_from_api()  # noqa: SLF001
+        # Call the model method which handles all business logic. Queued on
+        # request, so a cached response would not be what was asked for.
+        updated_stories = user._update_stories_from_api(force_refresh=True)  # noqa: SLF001
 
         stories_count = len(updated_stories) if updated_stories else 0
         logger.info(
@@ -135,56 +352,19 @@ def update_user_stories_from_api(self, user_id):
             "username": user.username,
         }
 
-    except Exception as e:
-        error_msg = str(e)
-
-        # Determine if this is a retryable error
-        retryable_keywords = [
-            "network",
-            "timeout",
-            "connection",
-            "502",
-            "503",
-            "504",
-            "temporary",
-            "rate limit",
-            "api error",
-        ]
-        is_retryable = any(
-            keyword in error_msg.lower() for keyword in retryable_keywords
-        )
-
-        if is_retryable and self.request.retries < self.max_retries:
-            logger.warning(
-                "Retryable error updating stories for %s (attempt %s/%s): %s",
-                user.username,
-                self.request.retries + 1,
-                self.max_retries + 1,
-                error_msg,
-            )
-            # Exponential backoff
-            countdown = 60 * (2**self.request.retries)
-            raise self.retry(exc=e, countdown=countdown) from e
-
-        # Non-retryable error or max retries exceeded
-        logger.exception(
-            "Failed to update stories for user %s after %s attempts",
-            user.username,
-            self.request.retries + 1,
-        )
-
-        return {
-            "success": False,
-            "error": error_msg,
-            "username": user.username,
-            "attempts": self.request.retries + 1,
-        }
+    except Exception as e:  # noqa: BLE001
+        return _retry_or_fail(task, e, user.username, "story update")
 
 
 @shared_task
-def auto_update_users_profile():
+def auto_update_users_profile(batch_size=None):
     """
     Update all users' profiles from Instagram API for users with auto-update enabled.
+
+    Args:
+        batch_size (int | None): When set, refresh users in batches of this size
+            with batch_update_users_profile instead of one task per user.
+
     Returns summary of operations performed.
     """
     try:
@@ -201,68 +381,37 @@ def auto_update_users_profile():
                 "errors": 0,
             }
 
-        logger.info("Starting profile update for %d users", total_users)
+        skipped = _skip_if_circuit_open(USER_INFO_BY_USERNAME_V2_ENDPOINT)
+        if skipped:
+            return skipped
 
-        updated_count = 0
-        error_count = 0
-        errors = []
-        task_ids = []
-
-        for user in users:
-            try:
-                # Use Celery task to handle each user's profile update
-                task_result = auto_update_user_profile.delay(str(user.uuid))
-                task_ids.append(task_result.id)
-                updated_count += 1
-                logger.info(
-                    "Successfully queued profile update for user: %s (task: %s)",
-                    user.username,
-                    task_result.id,
-                )
-            except Exception as e:
-                error_count += 1
-                error_msg = (
-                    f"Failed to queue profile update for user {user.username}: {e!s}"
-                )
-                errors.append(error_msg)
-                logger.exception(
-                    "Error queuing profile update for user %s",
-                    user.username,
-                )
+        logger.info("Starting profile update for %d users", total_users)
 
-        logger.info(
-            "Profile update queuing completed: %d queued, %d errors out of %d total users",  # noqa: E501
-            updated_count,
-            error_count,
-            total_users,
-        )
+        if batch_size:
+            summary = fan_out(
+                users,
+                lambda ids, run_id: [batch_update_users_profile.s(ids, run_id=run_id)],
+                kind="profile_batch",
+                per_task=batch_size,
+            )
+            message = "Profile batch update tasks queued"
+        else:
+            summary = fan_out(
+                users,
+                lambda ids, run_id: [auto_update_user_profile.s(ids[0], run_id=run_id)],
+                kind="profile",
+                lock_kind=PROFILE_LOCK,
+            )
+            message = "Profile update tasks queued"
 
-        return {  # noqa: TRY300
-            "success": True,
-            "message": "Profile update tasks queued",
-            "total": total_users,
-            "queued": updated_count,
-            "errors": error_count,
-            "error_details": errors if errors else None,
-            "task_ids": task_ids,
-        }
+        return {"success": True, "message": message, **summary}  # noqa: TRY300
 
     except Exception as e:
         logger.exception("Critical error in auto_update_users_profile")
         return {"success": False, "error": f"Critical error: {e!s}"}
 
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def auto_update_user_profile(self, user_id):
-    """
-    Update a specific user's profile from Instagram API if auto-update is enabled.
-
-    Args:
-        user_id (str): UUID of the user to update
-
-    Returns:
-        dict: Operation result with success status and details
-    """
+def _update_user_profile(task, user_id):
     try:
         user = User.objects.get(uuid=user_id)
     except User.DoesNotExist:
@@ -290,57 +439,43 @@ def auto_update_user_profile(self, user_id):
             "username": user.username,
         }
 
-    except Exception as e:
-        error_msg = str(e)
-
-        # Determine if this is a retryable error
-        retryable_keywords = [
-            "network",
-            "timeout",
-            "connection",
-            "502",
-            "503",
-            "504",
-            "temporary",
-            "rate limit",
-            "api error",
-        ]
-        is_retryable = any(
-            keyword in error_msg.lower() for keyword in retryable_keywords
-        )
+    except Exception as e:  # noqa: BLE001
+        return _retry_or_fail(task, e, user.username, "profile update")
 
-        if is_retryable and self.request.retries < self.max_retries:
-            logger.warning(
-                "Retryable error updating profile for %s (attempt %s/%s): %s",
-                user.username,
-                self.request.retries + 1,
-                self.max_retries + 1,
-                error_msg,
-            )
-            # Exponential backoff
-            countdown = 60 * (2**self.request.retries)
-            raise self.retry(exc=e, countdown=countdown) from e
 
-        # Non-retryable error or max retries exceeded
-        logger.exception(
-            "Failed to update profile for user %s after %s attempts",
-            user.username,
-            self.request.retries + 1,
-        )
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def auto_update_user_profile(self, user_id, run_id=None, lock_token=None):
+    """
+    Update a specific user's profile from Instagram API if auto-update is enabled.
 
-        return {
-            "success": False,
-            "error": error_msg,
-            "username": user.username,
-            "attempts": self.request.retries + 1,
-        }
+    Args:
+        user_id (str): UUID of the user to update
+        run_id (str | None): Fan-out run whose progress counters to update
+        lock_token (str | None): Token of the user's profile lock, taken when
+            the task was queued
+
+    Returns:
+        dict: Operation result with success status and details
+    """
+    with hold_task_lock(self, user_lock(PROFILE_LOCK, user_id), lock_token) as held:
+        if not held:
+            return _already_queued(self, user_id)
+        result = _update_user_profile(self, user_id)
+    if run_id:
+        FanoutProgress(run_id).record_result(result)
+    return result
 
 
 @shared_task
-def auto_update_users_story():
+def auto_update_users_story(batch_size=None):
     """
     Update all users' stories from Instagram API for users with auto-update enabled.
     Uses async story update to queue tasks in Celery.
+
+    Args:
+        batch_size (int | None): When set, refresh users in batches of this size
+            with batch_update_users_story instead of one task per user.
+
     Returns summary of operations performed.
     """
     try:
@@ -357,69 +492,37 @@ def auto_update_users_story():
                 "errors": 0,
             }
 
-        logger.info("Starting story update for %d users", total_users)
+        skipped = _skip_if_circuit_open(USER_STORIES_BY_USERNAME_ENDPOINT)
+        if skipped:
+            return skipped
 
-        queued_count = 0
-        error_count = 0
-        errors = []
-        task_ids = []
-
-        for user in users:
-            try:
-                # Use Celery task to handle each user's story update
-                task_result = auto_update_user_story.delay(str(user.uuid))
-                task_ids.append(task_result.id)
-                queued_count += 1
-                logger.info(
-                    "Successfully queued story update for user: %s (task: %s)",
-                    user.username,
-                    task_result.id,
-                )
-            except Exception as e:
-                error_count += 1
-                error_msg = (
-                    f"Failed to queue story update for user {user.username}: {e!s}"
-                )
-                errors.append(error_msg)
-                logger.exception(
-                    "Error queuing story update for user %s",
-                    user.username,
-                )
+        logger.info("Starting story update for %d users", total_users)
 
-        logger.info(
-            "Story update queuing completed: %d queued, %d errors"
-            " out of %d total users",
-            queued_count,
-            error_count,
-            total_users,
-        )
+        if batch_size:
+            summary = fan_out(
+                users,
+                lambda ids, run_id: [batch_update_users_story.s(ids, run_id=run_id)],
+                kind="story_batch",
+                per_task=batch_size,
+            )
+            message = "Story batch update tasks queued"
+        else:
+            summary = fan_out(
+                users,
+                lambda ids, run_id: [auto_update_user_story.s(ids[0], run_id=run_id)],
+                kind="story",
+                lock_kind=STORIES_LOCK,
+            )
+            message = "Story update tasks queued"
 
-        return {  # noqa: TRY300
-            "success": True,
-            "message": "Story update tasks queued",
-            "total": total_users,
-            "queued": queued_count,
-            "errors": error_count,
-            "error_details": errors if errors else None,
-            "task_ids": task_ids,
-        }
+        return {"success": True, "message": message, **summary}  # noqa: TRY300
 
     except Exception as e:
         logger.exception("Critical error in auto_update_users_story")
         return {"success": False, "error": f"Critical error: {e!s}"}
 
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def auto_update_user_story(self, user_id):
-    """
-    Update a specific user's stories from Instagram API if auto-update is enabled.
-
-    Args:
-        user_id (str): UUID of the user to update
-
-    Returns:
-        dict: Operation result with success status and details
-    """
+def _update_user_story(task, user_id):
     try:
         user = User.objects.get(uuid=user_id)
     except User.DoesNotExist:
@@ -454,47 +557,174 @@ def auto_update_user_story(self, user_id):
             "stories_count": stories_count,
         }
 
-    except Exception as e:
-        error_msg = str(e)
-
-        # Determine if this is a retryable error
-        retryable_keywords = [
-            "network",
-            "timeout",
-            "connection",
-            "502",
-            "503",
-            "504",
-            "temporary",
-            "rate limit",
-            "api error",
-        ]
-        is_retryable = any(
-            keyword in error_msg.lower() for keyword in retryable_keywords
-        )
+    except Exception as e:  # noqa: BLE001
+        return _retry_or_fail(task, e, user.username, "story update")
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def auto_update_user_story(self, user_id, run_id=None, lock_token=None):
+    """
+    Update a specific user's stories from Instagram API if auto-update is enabled.
+
+    Args:
+        user_id (str): UUID of the user to update
+        run_id (str | None): Fan-out run whose progress counters to update
+        lock_token (str | None): Token of the user's stories lock, taken when
+            the task was queued
+
+    Returns:
+        dict: Operation result with success status and details
+    """
+    with hold_task_lock(self, user_lock(STORIES_LOCK, user_id), lock_token) as held:
+        if not held:
+            return _already_queued(self, user_id)
+        result = _update_user_story(self, user_id)
+    if run_id:
+        FanoutProgress(run_id).record_result(result)
+    return result
 
-        if is_retryable and self.request.retries < self.max_retries:
-            logger.warning(
-                "Retryable error updating stories for %s (attempt %s/%s): %s",
-                user.username,
-                self.request.retries + 1,
-                self.max_retries + 1,
-                error_msg,
+
+@shared_task
+def batch_update_users_profile(user_ids, concurrency=None, run_id=None):
+    """
+    Refresh the profiles of many users in one task with concurrent API calls.
+
+    Args:
+        user_ids (list[str]): UUIDs of the users to update
+        concurrency (int | None): Maximum in-flight upstream requests, defaults
+            to settings.CORE_API_ASYNC_CONCURRENCY
+        run_id (str | None): Fan-out run whose progress counters to update
+
+    Returns:
+        dict: Summary with updated/error counts
+    """
+    users = list(
+        User.objects.filter(uuid__in=user_ids, allow_auto_update_profile=True),
+    )
+    with hold_user_locks(
+        PROFILE_LOCK,
+        users,
+        task_name=batch_update_users_profile.name,
+    ) as locked:
+        try:
+            summary = refresh_profiles(
+                locked,
+                concurrency=concurrency or settings.CORE_API_ASYNC_CONCURRENCY,
             )
-            # Exponential backoff
-            countdown = 60 * (2**self.request.retries)
-            raise self.retry(exc=e, countdown=countdown) from e
+        except Exception as e:
+            logger.exception("Critical error in batch_update_users_profile")
+            return {"success": False, "error": f"Critical error: {e!s}"}
+
+    if run_id:
+        # Users skipped since the run started, or already being refreshed by
+        # another task, count as neither
+        FanoutProgress(run_id).record(
+            succeeded=summary["updated"],
+            failed=summary["errors"],
+        )
+    return {
+        "success": True,
+        "total": len(users),
+        "duplicates": len(users) - len(locked),
+        **summary,
+    }
 
-        # Non-retryable error or max retries exceeded
-        logger.exception(
-            "Failed to update stories for user %s after %s attempts",
-            user.username,
-            self.request.retries + 1,
+
+@shared_task
+def batch_update_users_story(user_ids, concurrency=None, run_id=None):
+    """
+    Refresh the stories of many users in one task with concurrent API calls.
+
+    Args:
+        user_ids (list[str]): UUIDs of the users to update
+        concurrency (int | None): Maximum in-flight upstream requests, defaults
+            to settings.CORE_API_ASYNC_CONCURRENCY
+        run_id (str | None): Fan-out run whose progress counters to update
+
+    Returns:
+        dict: Summary with updated/story/error counts
+    """
+    users = list(
+        User.objects.filter(uuid__in=user_ids, allow_auto_update_stories=True),
+    )
+    with hold_user_locks(
+        STORIES_LOCK,
+        users,
+        task_name=batch_update_users_story.name,
+    ) as locked:
+        try:
+            summary = refresh_stories(
+                locked,
+                concurrency=concurrency or settings.CORE_API_ASYNC_CONCURRENCY,
+            )
+        except Exception as e:
+            logger.exception("Critical error in batch_update_users_story")
+            return {"success": False, "error": f"Critical error: {e!s}"}
+
+    if run_id:
+        # Users skipped since the run started, or already being refreshed by
+        # another task, count as neither
+        FanoutProgress(run_id).record(
+            succeeded=summary["updated"],
+            failed=summary["errors"],
         )
+    return {
+        "success": True,
+        "total": len(users),
+        "duplicates": len(users) - len(locked),
+        **summary,
+    }
 
-        return {
-            "success": False,
-            "error": error_msg,
-            "username": user.username,
-            "attempts": self.request.retries + 1,
-        }
+
+@shared_task
+def schedule_profile_refreshes(budget=None):
+    """
+    Queue profile updates for the auto-updated users whose profile is older
+    than settings.PROFILE_REFRESH_INTERVAL, stalest first, spread over the
+    scheduler tick.
+
+    Args:
+        budget (int | None): Maximum users scheduled, defaults to
+            settings.PROFILE_REFRESH_BUDGET
+
+    Returns:
+        dict: Users due, scheduled and deferred to the next tick
+    """
+    skipped = _skip_if_circuit_open(USER_INFO_BY_USERNAME_V2_ENDPOINT)
+    if skipped:
+        return skipped
+
+    try:
+        summary = schedule_refreshes(PROFILE, auto_update_user_profile, budget=budget)
+    except Exception as e:
+        logger.exception("Critical error in schedule_profile_refreshes")
+        return {"success": False, "error": f"Critical error: {e!s}"}
+
+    return {"success": True, **summary}
+
+
+@shared_task
+def schedule_story_refreshes(budget=None):
+    """
+    Queue story updates for the auto-updated users whose stories were last
+    checked before settings.STORIES_REFRESH_INTERVAL, stalest first, spread
+    over the scheduler tick.
+
+    Args:
+        budget (int | None): Maximum users scheduled, defaults to
+            settings.STORIES_REFRESH_BUDGET
+
+    Returns:
+        dict: Users due, scheduled and deferred to the next tick
+    """
+    skipped = _skip_if_circuit_open(USER_STORIES_BY_USERNAME_ENDPOINT)
+    if skipped:
+        return skipped
+
+    try:
+        summary = schedule_refreshes(STORIES, auto_update_user_story, budget=budget)
+    except Exception as e:
+        logger.exception("Critical error in schedule_story_refreshes")
+        return {"success": False, "error": f"Critical error: {e!s}"}
+
+    return {"success": True, **summary}
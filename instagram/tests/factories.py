@@ -0,0 +1,27 @@
+from django.utils import timezone
+from factory import Faker
+from factory import LazyFunction
+from factory import Sequence
+from factory import SubFactory
+from factory.django import DjangoModelFactory
+
+from instagram.models import Story
+from instagram.models import User
+
+
+class InstagramUserFactory(DjangoModelFactory):
+    username = Sequence(lambda n: f"instagram_user_{n}")
+    full_name = Faker("name")
+    biography = Faker("text", max_nb_chars=100)
+
+    class Meta:
+        model = User
+
+
+class StoryFactory(DjangoModelFactory):
+    story_id = Sequence(lambda n: f"{3000000000000000000 + n}")
+    user = SubFactory(InstagramUserFactory)
+    story_created_at = LazyFunction(timezone.now)
+
+    class Meta:
+        model = Story
@@ -0,0 +1,158 @@
+import httpx
+import pytest
+
+from api_logs.models import APIRequestLog
+from core.utils.async_core_api import AsyncCoreAPIClient
+from instagram import batch
+from instagram.models import Story
+from instagram.models import UserUpdateStoryLog
+from instagram.tests.factories import InstagramUserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _profile_response(request):
+    username = request.url.params["username"]
+    if username == "missing":
+        return httpx.Response(404, json={"detail": "not found"})
+    return httpx.Response(
+        200,
+        json={
+            "data": {
+                "status": True,
+                "pk": f"id-{username}",
+                "username": username,
+                "full_name": f"Full {username}",
+                "follower_count": 42,
+            },
+        },
+    )
+
+
+def _stories_response(request):
+    username = request.url.params["username"]
+    if username == "private":
+        return httpx.Response(
+            200,
+            json={"data": {"status": False, "errorMessage": "User is private"}},
+        )
+    return httpx.Response(
+        200,
+        json={
+            "data": {
+                "status": True,
+                "data": {
+                    "items": [
+                        {
+                            "id": f"{username}-story-1",
+                            "thumbnail_url_original": "https://cdn.example.com/1.jpg",
+                            "taken_at_date": "2025-01-01T00:00:00Z",
+                        },
+                    ],
+                },
+            },
+        },
+    )
+
+
+@pytest.fixture
+def mock_core_api(monkeypatch):
+    def install(handler):
+        def from_settings(concurrency=20, timeout=30):
+            return AsyncCoreAPIClient(
+                base_url="https://core.example.com",
+                token="token",  # noqa: S106
+                concurrency=concurrency,
+                timeout=timeout,
+                transport=httpx.MockTransport(handler),
+            )
+
+        monkeypatch.setattr(AsyncCoreAPIClient, "from_settings", from_settings)
+
+    return install
+
+
+def test_refresh_profiles_updates_users_in_bulk(mock_core_api):
+    mock_core_api(_profile_response)
+    users = [InstagramUserFactory() for _ in range(3)]
+
+    summary = batch.refresh_profiles(users, concurrency=2)
+
+    assert summary["updated"] == 3  # noqa: PLR2004
+    assert summary["errors"] == 0
+    for user in users:
+        user.refresh_from_db()
+        assert user.instagram_id == f"id-{user.username}"
+        assert user.follower_count == 42  # noqa: PLR2004
+        assert user.api_updated_at is not None
+        assert user.history.count() == 2  # noqa: PLR2004
+    assert APIRequestLog.objects.count() == 3  # noqa: PLR2004
+
+
+def test_refresh_profiles_reports_failed_users(mock_core_api):
+    mock_core_api(_profile_response)
+    ok_user = InstagramUserFactory()
+    missing_user = InstagramUserFactory(username="missing")
+
+    summary = batch.refresh_profiles([ok_user, missing_user])
+
+    assert summary["updated"] == 1
+    assert summary["errors"] == 1
+    assert "missing" in summary["error_details"]
+    missing_log = APIRequestLog.objects.get(response_status_code=404)
+    assert missing_log.status == APIRequestLog.STATUS_ERROR
+    missing_user.refresh_from_db()
+    assert missing_user.api_updated_at is None
+    assert missing_user.profile_checked_at is not None
+
+
+def test_refresh_stories_ingests_each_user(mock_core_api):
+    mock_core_api(_stories_response)
+    users = [InstagramUserFactory() for _ in range(2)]
+
+    summary = batch.refresh_stories(users)
+
+    assert summary["updated"] == 2  # noqa: PLR2004
+    assert summary["stories"] == 2  # noqa: PLR2004
+    assert Story.objects.count() == 2  # noqa: PLR2004
+    assert (
+        UserUpdateStoryLog.objects.filter(
+            status=UserUpdateStoryLog.STATUS_COMPLETED,
+        ).count()
+        == 2  # noqa: PLR2004
+    )
+
+
+def test_refresh_stories_costs_a_fixed_number_of_queries(
+    mock_core_api,
+    django_assert_max_num_queries,
+):
+    mock_core_api(_stories_response)
+    batch.refresh_stories([InstagramUserFactory()])  # loads the cached settings
+    counts = []
+    for size in (1, 5):
+        users = [InstagramUserFactory() for _ in range(size)]
+        with django_assert_max_num_queries(100) as context:
+            batch.refresh_stories(users)
+        counts.append(len(context.captured_queries))
+
+    assert counts[0] == counts[1]
+    assert Story.objects.count() == 7  # noqa: PLR2004
+
+
+def test_refresh_stories_logs_and_plans_failed_users(mock_core_api):
+    mock_core_api(_stories_response)
+    ok_user = InstagramUserFactory()
+    private_user = InstagramUserFactory(username="private")
+
+    summary = batch.refresh_stories([ok_user, private_user])
+
+    assert summary["updated"] == 1
+    assert "private" in summary["error_details"]
+    log = UserUpdateStoryLog.objects.get(user=private_user)
+    assert log.status == UserUpdateStoryLog.STATUS_FAILED
+    assert "User is private" in log.message
+    for user in (ok_user, private_user):
+        user.refresh_from_db()
+        assert user.stories_checked_at is not None
+        assert user.stories_next_poll_at > user.stories_checked_at
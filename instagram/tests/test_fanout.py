@@ -0,0 +1,119 @@
+import pytest
+
+from instagram import fanout
+from instagram.fanout import FanoutProgress
+from instagram.fanout import iter_id_chunks
+from instagram.locks import PROFILE_LOCK
+from instagram.locks import user_lock
+from instagram.models import User
+from instagram.tasks import auto_update_user_profile
+from instagram.tasks import auto_update_users_profile
+from instagram.tasks import auto_update_users_story
+from instagram.tests.factories import InstagramUserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """Record the signature groups published instead of sending them."""
+    groups = []
+
+    class RecordingGroup:
+        def __init__(self, signatures):
+            self.signatures = list(signatures)
+
+        def apply_async(self):
+            groups.append(self.signatures)
+
+    monkeypatch.setattr(fanout, "group", RecordingGroup)
+    return groups
+
+
+@pytest.fixture
+def users():
+    return InstagramUserFactory.create_batch(5, allow_auto_update_profile=True)
+
+
+def test_iter_id_chunks_streams_ids_in_chunks(users):
+    chunks = list(iter_id_chunks(User.objects.all(), 2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert sorted(user_id for chunk in chunks for user_id in chunk) == sorted(
+        str(user.uuid) for user in users
+    )
+
+
+def test_fan_out_publishes_per_user_tasks_in_groups(users, published, settings):
+    settings.FANOUT_PUBLISH_BATCH_SIZE = 2
+
+    result = auto_update_users_profile()
+
+    assert [len(signatures) for signatures in published] == [2, 2, 1]
+    signature = published[0][0]
+    assert signature.task == auto_update_user_profile.name
+    assert signature.kwargs["run_id"] == result["run_id"]
+    assert user_lock(PROFILE_LOCK, signature.args[0]).owned_by(
+        signature.kwargs["lock_token"],
+    )
+    assert result["queued"] == 5  # noqa: PLR2004
+    assert "task_ids" not in result
+    assert FanoutProgress(result["run_id"]).get()["queued"] == 5  # noqa: PLR2004
+
+
+def test_fan_out_publishes_batch_tasks(published):
+    InstagramUserFactory.create_batch(5, allow_auto_update_stories=True)
+
+    result = auto_update_users_story(batch_size=2)
+
+    (signatures,) = published
+    assert [len(signature.args[0]) for signature in signatures] == [2, 2, 1]
+    assert result["tasks"] == 3  # noqa: PLR2004
+    assert result["queued"] == 5  # noqa: PLR2004
+
+
+def test_publish_failures_are_counted(users, monkeypatch):
+    class FailingGroup:
+        def __init__(self, signatures):
+            pass
+
+        def apply_async(self):
+            msg = "broker down"
+            raise ConnectionError(msg)
+
+    monkeypatch.setattr(fanout, "group", FailingGroup)
+
+    result = auto_update_users_profile()
+
+    assert result["queued"] == 0
+    assert result["errors"] == 5  # noqa: PLR2004
+    # The locks of unpublished tasks are released again
+    assert all(user_lock(PROFILE_LOCK, user.uuid).get() is None for user in users)
+
+
+def test_fan_out_skips_users_with_a_queued_refresh(users, published):
+    user_lock(PROFILE_LOCK, users[0].uuid).acquire(60)
+
+    result = auto_update_users_profile()
+
+    published_ids = {sig.args[0] for signatures in published for sig in signatures}
+    assert str(users[0].uuid) not in published_ids
+    assert result["queued"] == 4  # noqa: PLR2004
+    assert result["duplicates"] == 1
+
+    # A second run finds every user queued already
+    assert auto_update_users_profile()["duplicates"] == 5  # noqa: PLR2004
+
+
+def test_per_user_task_records_its_outcome():
+    user = InstagramUserFactory(allow_auto_update_profile=False)
+    progress = FanoutProgress.start("profile", 1)
+
+    auto_update_user_profile.apply(
+        args=[str(user.uuid)],
+        kwargs={"run_id": progress.run_id},
+    )
+
+    counters = progress.get()
+    assert counters["failed"] == 1
+    assert counters["succeeded"] == 0
@@ -0,0 +1,185 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from instagram import tasks
+from instagram.locks import PROFILE_LOCK
+from instagram.locks import PROFILE_PICTURE_LOCK
+from instagram.locks import STORIES_LOCK
+from instagram.locks import user_lock
+from instagram.models import User
+from instagram.tests.factories import InstagramUserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def picture_task(monkeypatch):
+    apply_async = mock.Mock()
+    monkeypatch.setattr(
+        tasks.update_profile_picture_from_url,
+        "apply_async",
+        apply_async,
+    )
+    return apply_async
+
+
+def test_saves_queue_one_profile_picture_update(
+    picture_task,
+    django_capture_on_commit_callbacks,
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        user = InstagramUserFactory(
+            original_profile_picture_url="https://cdn.test/a.jpg",
+        )
+        user.original_profile_picture_url = "https://cdn.test/b.jpg"
+        user.save()
+
+    picture_task.assert_called_once()
+    args, kwargs = picture_task.call_args.args
+    assert args == (str(user.uuid),)
+    assert user_lock(PROFILE_PICTURE_LOCK, user.uuid).owned_by(kwargs["lock_token"])
+
+
+def test_profile_picture_update_is_queued_after_commit(
+    picture_task,
+    django_capture_on_commit_callbacks,
+):
+    with django_capture_on_commit_callbacks() as callbacks:
+        InstagramUserFactory(original_profile_picture_url="https://cdn.test/a.jpg")
+
+    picture_task.assert_not_called()
+    for callback in callbacks:
+        callback()
+    picture_task.assert_called_once()
+
+
+def test_save_during_a_picture_update_runs_it_again(
+    monkeypatch,
+    picture_task,
+    django_capture_on_commit_callbacks,
+):
+    user = InstagramUserFactory(original_profile_picture_url="https://cdn.test/a.jpg")
+    lock = user_lock(PROFILE_PICTURE_LOCK, user.uuid)
+    token = lock.acquire(60)
+    seen_urls = []
+
+    def update(task, user_id):
+        user = User.objects.get(uuid=user_id)
+        seen_urls.append(user.original_profile_picture_url)
+        # Saved after the running update read the URL
+        user.original_profile_picture_url = "https://cdn.test/b.jpg"
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+        return {"success": True}
+
+    monkeypatch.setattr(tasks, "_update_profile_picture", update)
+
+    tasks.update_profile_picture_from_url.apply(
+        args=[str(user.uuid)],
+        kwargs={"lock_token": token},
+    )
+
+    assert seen_urls == ["https://cdn.test/a.jpg"]
+    picture_task.assert_called_once()
+    args, kwargs = picture_task.call_args.args
+    assert args == (str(user.uuid),)
+    assert lock.owned_by(kwargs["lock_token"])
+
+
+def test_story_update_is_queued_once(monkeypatch):
+    apply_async = mock.Mock()
+    monkeypatch.setattr(tasks.update_user_stories_from_api, "apply_async", apply_async)
+    user = InstagramUserFactory()
+
+    assert user.update_stories_from_api_async() is apply_async.return_value
+    assert user.update_stories_from_api_async() is None
+    apply_async.assert_called_once()
+
+
+def test_story_task_skips_while_another_holds_the_lock(monkeypatch):
+    user = InstagramUserFactory(allow_auto_update_stories=True)
+    update = mock.Mock(return_value=[])
+    monkeypatch.setattr(type(user), "update_stories_from_api", update)
+    user_lock(STORIES_LOCK, user.uuid).acquire(60)
+
+    result = tasks.auto_update_user_story.apply(args=[str(user.uuid)]).get()
+
+    assert result["skipped"] is True
+    update.assert_not_called()
+
+
+def test_task_releases_its_lock_when_done():
+    user = InstagramUserFactory(allow_auto_update_profile=False)
+    lock = user_lock(PROFILE_LOCK, user.uuid)
+    token = lock.acquire(60)
+
+    tasks.auto_update_user_profile.apply(
+        args=[str(user.uuid)],
+        kwargs={"lock_token": token},
+    )
+
+    assert lock.get() is None
+
+
+def test_batch_task_skips_users_being_refreshed(monkeypatch):
+    users = InstagramUserFactory.create_batch(3, allow_auto_update_profile=True)
+    user_lock(PROFILE_LOCK, users[0].uuid).acquire(60)
+    refreshed = []
+
+    def refresh_profiles(batch, concurrency):
+        refreshed.extend(batch)
+        return {"updated": len(batch), "errors": 0, "error_details": None}
+
+    monkeypatch.setattr(tasks, "refresh_profiles", refresh_profiles)
+
+    result = tasks.batch_update_users_profile([str(user.uuid) for user in users])
+
+    assert {user.pk for user in refreshed} == {users[1].pk, users[2].pk}
+    assert result["duplicates"] == 1
+    assert user_lock(PROFILE_LOCK, users[1].uuid).get() is None
+
+
+def test_admin_shows_and_releases_task_locks(admin_client):
+    user = InstagramUserFactory()
+    user_lock(STORIES_LOCK, user.uuid).acquire(
+        60,
+        task_name="instagram.tasks.auto_update_user_story",
+    )
+    change_url = reverse("admin:instagram_user_change", args=(user.pk,))
+
+    response = admin_client.get(change_url)
+
+    assert b"instagram.tasks.auto_update_user_story" in response.content
+
+    admin_client.get(
+        reverse("admin:instagram_user_release_task_locks", args=(user.pk,)),
+    )
+
+    assert user_lock(STORIES_LOCK, user.uuid).get() is None
+
+
+def test_admin_filters_users_holding_a_lock(admin_client, monkeypatch):
+    locked, _ = InstagramUserFactory.create_batch(2)
+    monkeypatch.setattr(
+        cache,
+        "iter_keys",
+        lambda pattern: iter([f"task_lock:stories:{locked.uuid}"]),
+        raising=False,
+    )
+
+    response = admin_client.get(
+        reverse("admin:instagram_user_changelist"),
+        {"task_lock": STORIES_LOCK},
+    )
+
+    assert [user.pk for user in response.context["cl"].result_list] == [locked.pk]
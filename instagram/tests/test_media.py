@@ -0,0 +1,225 @@
+import dataclasses
+import hashlib
+from io import BytesIO
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from api_logs.fake_core_api import FakeCoreAPIServer
+from core.utils.upstream_errors import UpstreamNotFoundError
+from core.utils.upstream_errors import UpstreamUnavailableError
+from instagram import tasks
+from instagram.media import Download
+from instagram.media import TransferPolicy
+from instagram.media import download
+from instagram.media import upload_blob
+from instagram.models import MediaBlob
+from instagram.models import Story
+from instagram.models import User
+from instagram.tests.factories import InstagramUserFactory
+from instagram.tests.factories import StoryFactory
+
+POLICY = TransferPolicy(
+    concurrency=2,
+    per_host=2,
+    timeout=5,
+    deadline=60,
+    chunk_size=256,
+    spool_size=512,
+)
+
+
+@pytest.fixture
+def server():
+    with FakeCoreAPIServer() as fake:
+        yield fake
+
+
+def _fake_media(path):
+    # Bytes served by the fake server for a media path
+    return hashlib.sha256(path.encode()).digest() * 64
+
+
+def test_download_streams_into_a_spooled_file(server):
+    expected = _fake_media("/media/story.jpg")
+
+    with download(f"{server.url}/media/story.jpg", POLICY) as result:
+        assert result.file.file._rolled  # noqa: SLF001
+        assert result.file.read() == expected
+        assert result.size == len(expected)
+        assert result.sha256 == hashlib.sha256(expected).hexdigest()
+        assert result.extension == "jpg"
+
+
+def test_download_errors_are_classified(server):
+    with (
+        pytest.raises(UpstreamNotFoundError),
+        download(f"{server.url}/missing.jpg", POLICY),
+    ):
+        pass
+
+
+def test_download_past_its_deadline_fails(server, monkeypatch):
+    clock = iter(range(0, 1000, 10))
+    monkeypatch.setattr("instagram.media.time.monotonic", lambda: next(clock))
+    policy = dataclasses.replace(POLICY, deadline=25)
+
+    with (
+        pytest.raises(UpstreamUnavailableError, match="longer than 25s"),
+        download(f"{server.url}/media/story.jpg", policy),
+    ):
+        pass
+
+
+def test_upload_past_its_deadline_fails(monkeypatch, settings):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+    clock = iter(range(0, 1000, 10))
+    monkeypatch.setattr("instagram.media.time.monotonic", lambda: next(clock))
+    result = Download(
+        file=File(BytesIO(b"x" * 1024), name="story.jpg"),
+        size=1024,
+        sha256="0" * 64,
+        extension="jpg",
+        mime_type="image/jpeg",
+        etag="",
+    )
+
+    with pytest.raises(TimeoutError, match="longer than 5s"):
+        upload_blob(result, deadline=5)
+
+
+def test_etag_is_sent_back_as_received(monkeypatch):
+    response = mock.MagicMock(
+        status_code=200,
+        headers={"ETag": 'W/"abc"', "content-type": "image/jpeg"},
+    )
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [b"picture"]
+    get = mock.Mock(return_value=response)
+    monkeypatch.setattr("instagram.media.requests.get", get)
+
+    with download("https://cdn.test/a.jpg", POLICY) as result:
+        etag = result.etag
+    response.status_code = 304
+    with download("https://cdn.test/a.jpg", POLICY, etag) as unchanged:
+        assert unchanged is None
+
+    assert etag == 'W/"abc"'
+    assert get.call_args.kwargs["headers"] == {"If-None-Match": 'W/"abc"'}
+
+
+@pytest.mark.django_db
+def test_profile_picture_is_streamed_and_skipped_when_unchanged(server, settings):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+    settings.MEDIA_TRANSFER_CHUNK_SIZE = 256
+    settings.MEDIA_TRANSFER_SPOOL_SIZE = 512
+    user = InstagramUserFactory()
+    User.objects.filter(pk=user.pk).update(
+        original_profile_picture_url=f"{server.url}/media/avatar.jpg",
+    )
+
+    first = tasks.update_profile_picture_from_url.apply(args=[str(user.uuid)]).get()
+    second = tasks.update_profile_picture_from_url.apply(args=[str(user.uuid)]).get()
+
+    user.refresh_from_db()
+    assert (
+        first["new_hash"]
+        == hashlib.sha256(_fake_media("/media/avatar.jpg")).hexdigest()
+    )
+    assert user.profile_picture.read() == _fake_media("/media/avatar.jpg")
+    assert user.profile_picture_blob_id == first["new_hash"]
+    assert user.profile_picture_etag
+    assert second["message"] == "No changes detected"
+    # The second check was answered from the ETag, without a body
+    assert server.stats()["statuses"] == {200: 1, 304: 1}
+
+
+@pytest.mark.django_db
+def test_backfilled_pictures_are_not_read_back(server, settings, monkeypatch):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+    settings.PROFILE_PICTURE_BACKFILL_BATCH_SIZE = 2
+    users = InstagramUserFactory.create_batch(3)
+    for user in users:
+        name = default_storage.save(
+            f"users/{user.username}/legacy.jpg",
+            ContentFile(_fake_media("/media/avatar.jpg")),
+        )
+        User.objects.filter(pk=user.pk).update(
+            profile_picture=name,
+            original_profile_picture_url=f"{server.url}/media/avatar.jpg",
+        )
+    queued = []
+    monkeypatch.setattr(
+        tasks.backfill_profile_picture_blobs,
+        "apply_async",
+        lambda kwargs: queued.append(kwargs),
+    )
+
+    first = tasks.backfill_profile_picture_blobs.apply().get()
+    second = tasks.backfill_profile_picture_blobs.apply(kwargs=queued[0]).get()
+
+    assert (first["hashed"], first["done"]) == (2, False)
+    assert (second["hashed"], second["done"]) == (1, True)
+    assert len(queued) == 1
+    blob = MediaBlob.objects.get()
+    assert blob.ref_count == 3  # noqa: PLR2004
+
+    monkeypatch.setattr(
+        default_storage,
+        "open",
+        mock.Mock(side_effect=AssertionError("read back")),
+    )
+    result = tasks.update_profile_picture_from_url.apply(
+        args=[str(users[0].uuid)],
+    ).get()
+
+    assert result["message"] == "No changes detected"
+
+
+@pytest.mark.django_db
+def test_backfill_collapses_duplicate_files(settings):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+    photo = StoryFactory()
+    other = StoryFactory()
+    names = [
+        default_storage.save(f"legacy/{n}.jpg", ContentFile(b"same")) for n in range(3)
+    ]
+    unique = default_storage.save("legacy/unique.mp4", ContentFile(b"video"))
+    Story.objects.filter(pk=photo.pk).update(thumbnail=names[0], media=names[1])
+    Story.objects.filter(pk=other.pk).update(thumbnail=names[2], media=unique)
+    orphan = MediaBlob.objects.create(sha256="0" * 64, file="blobs/orphan", size=1)
+
+    call_command(
+        "backfill_media_blobs",
+        "--delete-duplicates",
+        "--prune",
+        stdout=StringIO(),
+    )
+
+    shared = MediaBlob.objects.get(sha256=hashlib.sha256(b"same").hexdigest())
+    assert shared.ref_count == 3  # noqa: PLR2004
+    assert MediaBlob.objects.get(file=unique).ref_count == 1
+    for story in Story.objects.all():
+        assert story.thumbnail.name == shared.file.name
+        assert story.thumbnail_blob == shared
+    assert [name for name in names if default_storage.exists(name)] == [
+        shared.file.name,
+    ]
+    assert not MediaBlob.objects.filter(pk=orphan.pk).exists()
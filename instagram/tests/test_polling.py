@@ -0,0 +1,143 @@
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from instagram.polling import STORY_LIFETIME_SECONDS
+from instagram.polling import PollingPolicy
+from instagram.polling import simulate
+from instagram.polling import story_gaps
+from instagram.tests.factories import InstagramUserFactory
+from instagram.tests.factories import StoryFactory
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+HOUR = 60 * 60
+
+
+@pytest.fixture
+def policy():
+    return PollingPolicy(
+        min_interval=15 * 60,
+        max_interval=12 * HOUR,
+        initial_interval=HOUR,
+        smoothing=0.3,
+        gap_fraction=0.5,
+        miss_backoff=1.5,
+    )
+
+
+def test_misses_back_off_up_to_the_maximum(policy):
+    gap_ewma, interval = None, None
+    for _ in range(20):
+        gap_ewma, interval = policy.update(gap_ewma, interval, new_stories=0, gaps=[])
+
+    assert interval == policy.max_interval
+
+
+def test_hits_follow_the_smoothed_gap(policy):
+    gap_ewma, interval = policy.update(
+        4 * HOUR,
+        10 * HOUR,
+        new_stories=1,
+        gaps=[2 * HOUR],
+    )
+
+    assert gap_ewma == pytest.approx(0.3 * 2 * HOUR + 0.7 * 4 * HOUR)
+    assert interval == pytest.approx(gap_ewma / 2)
+
+
+def test_maximum_stays_below_the_story_lifetime(settings):
+    settings.STORIES_POLL_MAX_INTERVAL = 48 * HOUR
+
+    policy = PollingPolicy.from_settings()
+
+    assert policy.max_interval < STORY_LIFETIME_SECONDS
+
+
+def test_story_gaps_start_from_the_newest_known_story():
+    times = [START + timedelta(hours=3), (START + timedelta(hours=1)).isoformat()]
+
+    assert story_gaps(START, times) == [HOUR, 2 * HOUR]
+
+
+def test_simulation_saves_calls_on_rare_posters_without_missing(policy):
+    stories = [START + timedelta(days=day, hours=9) for day in range(0, 30, 3)]
+    end = START + timedelta(days=30)
+
+    adaptive = simulate(stories, start=START, end=end, policy=policy)
+    fixed = simulate(stories, start=START, end=end, fixed_interval=HOUR)
+
+    assert fixed.missed == adaptive.missed == 0
+    assert adaptive.polls < fixed.polls / 5
+
+
+def test_simulation_reports_missed_stories(policy):
+    stories = [START + timedelta(hours=5)]
+    end = START + timedelta(days=3)
+
+    result = simulate(
+        stories,
+        start=START,
+        end=end,
+        fixed_interval=12 * HOUR,
+        lifetime=HOUR,
+    )
+
+    assert result.stories == 1
+    assert result.missed == 1
+
+
+@pytest.mark.django_db
+def test_story_check_plans_the_next_poll(monkeypatch):
+    user = InstagramUserFactory(allow_auto_update_stories=True)
+    StoryFactory(user=user, story_created_at=timezone.now() - timedelta(hours=4))
+    taken_at = timezone.now() - timedelta(hours=2)
+    monkeypatch.setattr(
+        "instagram.models.fetch_user_stories_by_username",
+        lambda username, **options: {
+            "data": {
+                "status": True,
+                "data": {
+                    "items": [
+                        {
+                            "id": "new-story",
+                            "thumbnail_url_original": "https://cdn.example.com/1.jpg",
+                            "taken_at_date": taken_at.isoformat(),
+                        },
+                    ],
+                },
+            },
+        },
+    )
+
+    user.update_stories_from_api()
+
+    user.refresh_from_db()
+    assert user.story_gap_ewma == pytest.approx(2 * HOUR, abs=1)
+    assert user.stories_poll_interval == pytest.approx(HOUR, abs=1)
+    assert user.stories_next_poll_at > timezone.now() + timedelta(minutes=59)
+
+
+@pytest.mark.django_db
+def test_simulate_command_reports_savings():
+    user = InstagramUserFactory()
+    for days_ago in (20, 12, 5):
+        StoryFactory(
+            user=user,
+            story_created_at=timezone.now() - timedelta(days=days_ago),
+        )
+    out = StringIO()
+
+    call_command("simulate_story_polling", "--days", "30", stdout=out)
+
+    assert "Calls saved" in out.getvalue()
+    assert "1 users, 3 stories" in out.getvalue()
+
+
+def test_simulation_needs_a_policy_or_an_interval():
+    with pytest.raises(ValueError, match="policy or a fixed interval"):
+        simulate([], start=START, end=START + timedelta(days=1))
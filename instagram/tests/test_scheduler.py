@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from instagram import scheduler
+from instagram.locks import PROFILE_LOCK
+from instagram.locks import user_lock
+from instagram.scheduler import PROFILE
+from instagram.scheduler import STORIES
+from instagram.scheduler import due_user_ids
+from instagram.scheduler import schedule_refreshes
+from instagram.scheduler import spread_countdowns
+from instagram.tasks import auto_update_user_profile
+from instagram.tasks import schedule_story_refreshes
+from instagram.tests.factories import InstagramUserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """Record the signatures published instead of sending them."""
+    signatures = []
+
+    class RecordingGroup:
+        def __init__(self, tasks):
+            signatures.extend(tasks)
+
+        def apply_async(self):
+            pass
+
+    monkeypatch.setattr(scheduler, "group", RecordingGroup)
+    return signatures
+
+
+def _profile_user(hours_ago):
+    checked_at = (
+        None if hours_ago is None else timezone.now() - timedelta(hours=hours_ago)
+    )
+    return InstagramUserFactory(
+        allow_auto_update_profile=True,
+        api_updated_at=checked_at,
+        profile_checked_at=checked_at,
+    )
+
+
+def test_due_users_are_stale_or_never_refreshed_stalest_first(settings):
+    settings.PROFILE_REFRESH_INTERVAL = 60 * 60
+    fresh = _profile_user(0.5)
+    stale = _profile_user(3)
+    staler = _profile_user(10)
+    never = _profile_user(None)
+    InstagramUserFactory(allow_auto_update_profile=False)
+
+    user_ids = due_user_ids(PROFILE, limit=10)
+
+    assert user_ids == [str(never.uuid), str(staler.uuid), str(stale.uuid)]
+    assert str(fresh.uuid) not in user_ids
+
+
+def test_budget_caps_the_tick(published, settings):
+    settings.PROFILE_REFRESH_INTERVAL = 60 * 60
+    for hours_ago in (2, 3, 4, 5):
+        _profile_user(hours_ago)
+
+    summary = schedule_refreshes(PROFILE, auto_update_user_profile, budget=3)
+
+    assert summary["due"] == 4  # noqa: PLR2004
+    assert summary["scheduled"] == 3  # noqa: PLR2004
+    assert summary["deferred"] == 1
+    assert len(published) == 3  # noqa: PLR2004
+
+
+def test_tasks_are_spread_over_the_tick(published, settings):
+    settings.REFRESH_SCHEDULER_TICK_SECONDS = 300
+    for _ in range(3):
+        _profile_user(None)
+
+    schedule_refreshes(PROFILE, auto_update_user_profile)
+
+    assert [signature.options["countdown"] for signature in published] == [
+        0,
+        100,
+        200,
+    ]
+
+
+def test_users_with_a_queued_refresh_are_skipped(published):
+    queued = _profile_user(None)
+    _profile_user(None)
+    user_lock(PROFILE_LOCK, queued.uuid).acquire(60)
+
+    summary = schedule_refreshes(PROFILE, auto_update_user_profile)
+
+    assert summary["scheduled"] == 1
+    assert summary["already_queued"] == 1
+    assert str(queued.uuid) not in [signature.args[0] for signature in published]
+
+    # Until those tasks finish, the next tick schedules nobody again
+    assert schedule_refreshes(PROFILE, auto_update_user_profile)["scheduled"] == 0
+
+
+def test_spread_countdowns():
+    assert spread_countdowns(0, 60) == []
+    assert spread_countdowns(4, 60) == [0, 15, 30, 45]
+
+
+def test_story_check_marks_user_even_on_failure(published, monkeypatch):
+    user = InstagramUserFactory(allow_auto_update_stories=True)
+    monkeypatch.setattr(
+        "instagram.models.fetch_user_stories_by_username",
+        lambda username, **options: {
+            "data": {"status": False, "errorMessage": "private"},
+        },
+    )
+
+    with pytest.raises(Exception, match="private"):
+        user.update_stories_from_api()
+
+    user.refresh_from_db()
+    assert user.stories_checked_at is not None
+    assert due_user_ids(STORIES, limit=10) == []
+
+
+def test_profile_check_marks_user_even_on_failure(monkeypatch):
+    user = _profile_user(None)
+    monkeypatch.setattr(
+        "instagram.models.fetch_user_info_by_username_v2",
+        lambda username, **options: {
+            "data": {"status": False, "errorMessage": "User not found"},
+        },
+    )
+
+    with pytest.raises(Exception, match="User not found"):
+        user.update_profile_from_api()
+
+    user.refresh_from_db()
+    assert user.api_updated_at is None
+    assert user.profile_checked_at is not None
+    assert due_user_ids(PROFILE, limit=10) == []
+
+
+def test_schedule_story_refreshes_task(published):
+    InstagramUserFactory(allow_auto_update_stories=True)
+
+    result = schedule_story_refreshes()
+
+    assert result["success"] is True
+    assert result["scheduled"] == 1
@@ -0,0 +1,337 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from unittest import mock
+
+import pytest
+from celery.exceptions import Retry
+from django.core.files.base import ContentFile
+
+from core.utils.upstream_errors import UpstreamNotFoundError
+from core.utils.upstream_errors import UpstreamUnavailableError
+from instagram import tasks
+from instagram.media import Download
+from instagram.media import TransferPolicy
+from instagram.media import transfer_story_media
+from instagram.models import MediaBlob
+from instagram.models import Story
+from instagram.tests.factories import InstagramUserFactory
+from instagram.tests.factories import StoryFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _item(story_id, url="https://cdn.test/1.jpg"):
+    return {
+        "id": story_id,
+        "thumbnail_url_original": url,
+        "taken_at_date": "2025-01-01T00:00:00Z",
+    }
+
+
+def _response(items):
+    return {"data": {"status": True, "data": {"items": items}}}
+
+
+@pytest.fixture
+def download_task(monkeypatch):
+    delay = mock.Mock()
+    monkeypatch.setattr(tasks.download_stories_media, "delay", delay)
+    return delay
+
+
+def _count_queries(django_assert_max_num_queries, user, items):
+    with django_assert_max_num_queries(100) as context:
+        user._update_stories_from_api(response=_response(items))  # noqa: SLF001
+    return len(context.captured_queries)
+
+
+def test_story_refresh_costs_a_fixed_number_of_queries(
+    django_assert_max_num_queries,
+    download_task,
+):
+    one = _count_queries(
+        django_assert_max_num_queries,
+        InstagramUserFactory(),
+        [_item("a-1")],
+    )
+    many = _count_queries(
+        django_assert_max_num_queries,
+        InstagramUserFactory(),
+        [_item(f"b-{n}") for n in range(25)],
+    )
+
+    assert many == one
+    assert Story.objects.count() == 26  # noqa: PLR2004
+
+
+def test_new_stories_are_queued_for_download_once(
+    django_capture_on_commit_callbacks,
+    download_task,
+):
+    user = InstagramUserFactory()
+    StoryFactory(story_id="known", user=user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        stories = user._update_stories_from_api(  # noqa: SLF001
+            response=_response([_item("new-2"), _item("known"), _item("new-1")]),
+        )
+
+    assert [story.story_id for story in stories] == ["new-2", "known", "new-1"]
+    download_task.assert_called_once_with(["new-1", "new-2"])
+
+
+def test_known_stories_are_updated_in_place(download_task):
+    user = InstagramUserFactory()
+    StoryFactory(story_id="known", user=user, thumbnail_url="https://cdn.test/1.jpg")
+
+    user._update_stories_from_api(  # noqa: SLF001
+        response=_response([_item("known", url="https://cdn.test/2.jpg")]),
+    )
+
+    story = Story.objects.get(story_id="known")
+    assert story.thumbnail_url == "https://cdn.test/2.jpg"
+    assert story.media_url == "https://cdn.test/2.jpg"
+    assert story.raw_api_data["id"] == "known"
+
+
+@pytest.fixture
+def memory_storage(settings):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+
+
+def _fake_download(monkeypatch, fetch):
+    """Serve downloads from ``fetch(url) -> (content, extension)``."""
+
+    def fake_fetch(url, policy):
+        content, extension = fetch(url)
+        return Download(
+            file=ContentFile(content),
+            size=len(content),
+            sha256=hashlib.sha256(content).hexdigest(),
+            extension=extension,
+            mime_type="",
+            etag="",
+        )
+
+    monkeypatch.setattr("instagram.media.fetch", fake_fetch)
+
+
+def _story_with_media(**urls):
+    story = StoryFactory()
+    Story.objects.filter(pk=story.pk).update(**urls)
+    return story
+
+
+def test_saving_a_story_queues_its_download_after_commit(
+    django_capture_on_commit_callbacks,
+    download_task,
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        story = StoryFactory(thumbnail_url="https://cdn.test/1.jpg")
+        download_task.assert_not_called()
+
+    download_task.assert_called_once_with([story.story_id])
+
+
+def test_download_task_stores_files_without_saving_the_story(
+    monkeypatch,
+    memory_storage,
+):
+    story = _story_with_media(
+        thumbnail_url="https://cdn.test/1.jpg",
+        media_url="https://cdn.test/1.mp4",
+    )
+    _fake_download(monkeypatch, lambda url: (url.encode(), url.rsplit(".", 1)[-1]))
+    save = mock.Mock()
+    monkeypatch.setattr(Story, "save", save)
+
+    result = tasks.download_stories_media.apply(args=[[story.story_id]]).get()
+
+    story.refresh_from_db()
+    assert result["downloaded"] == 2  # noqa: PLR2004
+    assert story.thumbnail.name.endswith(".jpg")
+    assert story.media.name.endswith(".mp4")
+    save.assert_not_called()
+
+
+def test_download_task_retries_only_transient_failures(monkeypatch, memory_storage):
+    ok = _story_with_media(thumbnail_url="https://cdn.test/ok.jpg")
+    flaky = _story_with_media(thumbnail_url="https://cdn.test/flaky.jpg")
+    expired = _story_with_media(thumbnail_url="https://cdn.test/expired.jpg")
+
+    def fetch(url):
+        if "flaky" in url:
+            raise UpstreamUnavailableError(url)
+        if "expired" in url:
+            raise UpstreamNotFoundError(url)
+        return b"content", "jpg"
+
+    _fake_download(monkeypatch, fetch)
+    retry = mock.Mock(side_effect=Retry())
+    monkeypatch.setattr(tasks.download_stories_media, "retry", retry)
+
+    tasks.download_stories_media.apply(
+        args=[[ok.story_id, flaky.story_id, expired.story_id]],
+    )
+
+    retry.assert_called_once()
+    assert retry.call_args.kwargs["args"] == [[flaky.story_id]]
+    assert Story.objects.get(pk=ok.pk).thumbnail
+
+
+def test_downloads_are_bounded_per_host(monkeypatch, memory_storage):
+    stories = [
+        _story_with_media(thumbnail_url=f"https://cdn-{n % 2}.test/{n}.jpg")
+        for n in range(8)
+    ]
+    lock = threading.Lock()
+    in_flight: defaultdict[str, int] = defaultdict(int)
+    peak: defaultdict[str, int] = defaultdict(int)
+
+    def fetch(url):
+        host = url.split("/")[2]
+        with lock:
+            in_flight[host] += 1
+            peak[host] = max(peak[host], in_flight[host])
+        time.sleep(0.02)
+        with lock:
+            in_flight[host] -= 1
+        return url.encode(), "jpg"
+
+    _fake_download(monkeypatch, fetch)
+
+    transfers = transfer_story_media(
+        Story.objects.filter(pk__in=[story.pk for story in stories]),
+        TransferPolicy(
+            concurrency=8,
+            per_host=2,
+            timeout=5,
+            deadline=60,
+            chunk_size=1024,
+            spool_size=1024,
+        ),
+    )
+
+    assert all(transfer.error is None for transfer in transfers)
+    assert max(peak.values()) == 2  # noqa: PLR2004
+
+
+def test_downloads_held_are_bounded_by_the_concurrency(monkeypatch, memory_storage):
+    stories = [
+        _story_with_media(thumbnail_url=f"https://cdn.test/{n}.jpg") for n in range(12)
+    ]
+    lock = threading.Lock()
+    held = {"now": 0, "peak": 0}
+
+    class SpooledFile(ContentFile):
+        released = False
+
+        def close(self):
+            with lock:
+                if not self.released:
+                    self.released = True
+                    held["now"] -= 1
+            super().close()
+
+    def fake_fetch(url, policy):
+        with lock:
+            held["now"] += 1
+            held["peak"] = max(held["peak"], held["now"])
+        time.sleep(0.01)
+        content = url.encode()
+        return Download(
+            file=SpooledFile(content),
+            size=len(content),
+            sha256=hashlib.sha256(content).hexdigest(),
+            extension="jpg",
+            mime_type="",
+            etag="",
+        )
+
+    monkeypatch.setattr("instagram.media.fetch", fake_fetch)
+
+    transfers = transfer_story_media(
+        Story.objects.filter(pk__in=[story.pk for story in stories]),
+        TransferPolicy(
+            concurrency=3,
+            per_host=3,
+            timeout=5,
+            deadline=60,
+            chunk_size=1024,
+            spool_size=1024,
+        ),
+    )
+
+    assert all(transfer.error is None for transfer in transfers)
+    assert Story.objects.filter(thumbnail_blob=None).count() == 0
+    assert held["peak"] <= 3  # noqa: PLR2004
+    assert held["now"] == 0
+
+
+def test_identical_content_is_stored_once(monkeypatch, memory_storage):
+    photo = _story_with_media(
+        thumbnail_url="https://cdn.test/photo.jpg",
+        media_url="https://cdn.test/photo.jpg",
+    )
+    repost = _story_with_media(thumbnail_url="https://cdn-2.test/repost.jpg")
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return b"same bytes", "jpg"
+
+    _fake_download(monkeypatch, fetch)
+
+    tasks.download_stories_media.apply(args=[[photo.story_id, repost.story_id]])
+
+    assert sorted(fetched) == [
+        "https://cdn-2.test/repost.jpg",
+        "https://cdn.test/photo.jpg",
+    ]
+    blob = MediaBlob.objects.get()
+    assert blob.ref_count == 3  # noqa: PLR2004
+    assert blob.size == len(b"same bytes")
+    photo.refresh_from_db()
+    repost.refresh_from_db()
+    assert photo.thumbnail_blob == photo.media_blob == repost.thumbnail_blob == blob
+    assert photo.media.name == repost.thumbnail.name == blob.file.name
+    assert blob.file.read() == b"same bytes"
+
+
+def test_known_content_is_not_uploaded_again(monkeypatch, memory_storage):
+    content = b"known bytes"
+    sha256 = hashlib.sha256(content).hexdigest()
+    MediaBlob.objects.create(
+        sha256=sha256,
+        file="blobs/known.jpg",
+        size=len(content),
+        ref_count=1,
+    )
+    story = _story_with_media(thumbnail_url="https://cdn.test/again.jpg")
+    _fake_download(monkeypatch, lambda url: (content, "jpg"))
+    save = mock.Mock()
+    monkeypatch.setattr("instagram.media.default_storage.save", save)
+
+    tasks.download_stories_media.apply(args=[[story.story_id]])
+
+    save.assert_not_called()
+    story.refresh_from_db()
+    assert story.thumbnail.name == "blobs/known.jpg"
+    assert MediaBlob.objects.get().ref_count == 2  # noqa: PLR2004
+
+
+def test_deleting_a_story_releases_its_blobs(memory_storage):
+    blob = MediaBlob.objects.create(sha256="a" * 64, file="blobs/a.jpg", size=1)
+    MediaBlob.acquire(blob.sha256, name=blob.file.name, size=1, count=2)
+    story = StoryFactory()
+    Story.objects.filter(pk=story.pk).update(thumbnail_blob=blob, media_blob=blob)
+
+    Story.objects.filter(pk=story.pk).delete()
+
+    blob.refresh_from_db()
+    assert blob.ref_count == 0
@@ -0,0 +1,92 @@
+from unittest import mock
+
+import pytest
+from celery.exceptions import Retry
+from django.urls import reverse
+
+from core.utils.upstream_errors import UpstreamRateLimitedError
+from instagram import tasks
+from instagram.models import User
+from instagram.tests.factories import InstagramUserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize(
+    ("task", "queue"),
+    [
+        (tasks.auto_update_users_profile, "fanout"),
+        (tasks.schedule_story_refreshes, "fanout"),
+        (tasks.auto_update_user_profile, "upstream"),
+        (tasks.batch_update_users_story, "upstream"),
+        (tasks.update_profile_picture_from_url, "media"),
+        (tasks.download_stories_media, "media"),
+        (tasks.backfill_profile_picture_blobs, "media"),
+        (tasks.update_user_stories_from_api, "interactive"),
+    ],
+)
+def test_tasks_are_routed_to_their_queue(task, queue):
+    assert task.app.amqp.router.route({}, task.name)["queue"].name == queue
+
+
+@pytest.fixture
+def retry(monkeypatch):
+    """Record retries of auto_update_user_story instead of running them."""
+    retry = mock.Mock(side_effect=Retry())
+    monkeypatch.setattr(tasks.auto_update_user_story, "retry", retry)
+    return retry
+
+
+def _stories_response(monkeypatch, response=None, error=None):
+    fetch = mock.Mock(return_value=response, side_effect=error)
+    monkeypatch.setattr("instagram.models.fetch_user_stories_by_username", fetch)
+    return fetch
+
+
+def test_rate_limited_story_update_waits_for_retry_after(monkeypatch, retry):
+    user = InstagramUserFactory(allow_auto_update_stories=True)
+    _stories_response(
+        monkeypatch,
+        error=UpstreamRateLimitedError("slow down", retry_after=900),
+    )
+
+    tasks.auto_update_user_story.apply(args=[str(user.uuid)])
+
+    retry.assert_called_once()
+    assert retry.call_args.kwargs["countdown"] >= 900  # noqa: PLR2004
+
+
+def test_private_account_is_not_retried(monkeypatch, retry):
+    user = InstagramUserFactory(allow_auto_update_stories=True)
+    _stories_response(
+        monkeypatch,
+        response={"data": {"status": False, "errorMessage": "Account is private"}},
+    )
+
+    result = tasks.auto_update_user_story.apply(args=[str(user.uuid)]).get()
+
+    retry.assert_not_called()
+    assert result["success"] is False
+    assert result["error_type"] == "PrivateAccountError"
+
+
+def test_requested_story_update_bypasses_the_response_cache(monkeypatch):
+    user = InstagramUserFactory()
+    fetch = _stories_response(
+        monkeypatch,
+        response={"data": {"status": True, "data": {"items": []}}},
+    )
+
+    tasks.update_user_stories_from_api.apply(args=[str(user.uuid)])
+
+    fetch.assert_called_once_with(user.username, force_refresh=True)
+
+
+def test_admin_profile_update_bypasses_the_response_cache(admin_client, monkeypatch):
+    user = InstagramUserFactory()
+    update = mock.Mock()
+    monkeypatch.setattr(User, "update_profile_from_api", update)
+
+    admin_client.get(reverse("admin:instagram_user_update_from_api", args=(user.pk,)))
+
+    update.assert_called_once_with(force_refresh=True)
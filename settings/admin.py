@@ -2,13 +2,21 @@ from django.contrib import admin
 from django.http import HttpRequest
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
+from django.utils.html import format_html
+from django.utils.html import format_html_join
 from django.utils.translation import gettext_lazy as _
 from solo.admin import SingletonModelAdmin
 from unfold.admin import ModelAdmin
 from unfold.decorators import action
 
 from core.utils import openai
+from core.utils.async_core_api import USER_INFO_BY_USER_ID_ENDPOINT
+from core.utils.async_core_api import USER_INFO_BY_USERNAME_V2_ENDPOINT
+from core.utils.async_core_api import USER_STORIES_BY_USERNAME_ENDPOINT
+from core.utils.circuit_breaker import CircuitBreaker
+from core.utils.core_api import get_endpoint_name
 
+from .models import APILogSetting
 from .models import CoreAPISetting
 from .models import FirebaseAdminSetting
 from .models import OpenAISetting
@@ -54,6 +62,20 @@ class OpenAISettingAdmin(SingletonModelAdmin, ModelAdmin):
         )
 
 
+CIRCUIT_BREAKER_ENDPOINTS = (
+    USER_INFO_BY_USERNAME_V2_ENDPOINT,
+    USER_INFO_BY_USER_ID_ENDPOINT,
+    USER_STORIES_BY_USERNAME_ENDPOINT,
+)
+
+
+def _circuit_breakers():
+    return [
+        CircuitBreaker(get_endpoint_name(endpoint))
+        for endpoint in CIRCUIT_BREAKER_ENDPOINTS
+    ]
+
+
 @admin.register(CoreAPISetting)
 class CoreAPISettingAdmin(SingletonModelAdmin, ModelAdmin):
     fieldsets = (
@@ -64,6 +86,120 @@ class CoreAPISettingAdmin(SingletonModelAdmin, ModelAdmin):
                 "description": "Configure Core API settings",
             },
         ),
+        (
+            "Rate Limiting",
+            {
+                "fields": (
+                    "rate_limit_enabled",
+                    "rate_limit_per_second",
+                    "rate_limit_burst",
+                    "endpoint_rate_limits",
+                    "rate_limit_max_wait",
+                ),
+                "description": (
+                    "Shared token bucket applied to Core API calls from every "
+                    "worker. Budgets apply per endpoint."
+                ),
+            },
+        ),
+        (
+            "Circuit Breakers",
+            {
+                "fields": ("circuit_breaker_status",),
+                "description": (
+                    "Endpoints with an open circuit fail fast until a probe "
+                    "request succeeds."
+                ),
+            },
+        ),
+        (
+            "Timestamps",
+            {
+                "fields": ("created_at", "updated_at"),
+            },
+        ),
+    )
+    readonly_fields = ("circuit_breaker_status", "created_at", "updated_at")
+
+    actions_detail = ["reset_circuit_breakers"]
+
+    @admin.display(description=_("Status"))
+    def circuit_breaker_status(self, obj):
+        rows = format_html_join(
+            "",
+            "<tr><td>{}</td><td>{}</td><td>{} / {} ({:.0%})</td><td>{:.0f}s</td></tr>",
+            (
+                (
+                    state["endpoint"],
+                    state["state"],
+                    state["failures"],
+                    state["requests"],
+                    state["failure_rate"],
+                    state["retry_after"],
+                )
+                for state in (breaker.get_state() for breaker in _circuit_breakers())
+            ),
+        )
+        return format_html(
+            "<table><thead><tr><th>{}</th><th>{}</th><th>{}</th><th>{}</th></tr>"
+            "</thead><tbody>{}</tbody></table>",
+            _("Endpoint"),
+            _("State"),
+            _("Failures"),
+            _("Retry in"),
+            rows,
+        )
+
+    @action(
+        description=_("Reset Circuit Breakers"),
+        url_path="reset-circuit-breakers",
+    )
+    def reset_circuit_breakers(self, request: HttpRequest, object_id: int):
+        for breaker in _circuit_breakers():
+            breaker.reset()
+        self.message_user(request, _("Circuit breakers have been reset."))
+
+        return redirect(
+            reverse_lazy("admin:settings_coreapisetting_change", args=(object_id,)),
+        )
+
+
+@admin.register(APILogSetting)
+class APILogSettingAdmin(SingletonModelAdmin, ModelAdmin):
+    fieldsets = (
+        (
+            "Sampling",
+            {
+                "fields": ("success_sample_rate",),
+                "description": (
+                    "Errors and timeouts are always logged; successful calls "
+                    "are kept at this rate"
+                ),
+            },
+        ),
+        (
+            "Stored Parts",
+            {
+                "fields": (
+                    "max_body_bytes",
+                    "keep_request_headers",
+                    "keep_request_params",
+                    "keep_request_body",
+                    "keep_response_headers",
+                    "keep_response_body",
+                ),
+            },
+        ),
+        (
+            "Per-Endpoint Policies",
+            {
+                "fields": ("endpoint_policies",),
+                "description": (
+                    "Override the sample rate, body size cap or stored parts "
+                    "for individual endpoints"
+                ),
+            },
+        ),
         (
             "Timestamps",
             {
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import cast
+
+from django.conf import settings
+from django.core.cache import cache
+from solo.models import SingletonModel
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY_PREFIX = "settings:version"
+
+
+@dataclass
+class _Entry:
+    instance: SingletonModel
+    version: str
+    checked_at: float
+
+
+_memo: dict[str, _Entry] = {}
+_lock = threading.Lock()
+
+
+def _version_key(model: type[SingletonModel]) -> str:
+    return f"{VERSION_KEY_PREFIX}:{model._meta.label_lower}"  # noqa: SLF001
+
+
+def _get_shared_version(model: type[SingletonModel]) -> str:
+    """Return the shared version token for ``model``, creating it if missing."""
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_setting[T: SingletonModel](model: type[T]) -> T:
+    """Return the singleton row for ``model`` without a DB query per call.
+
+    The instance is memoised in-process. At most once every
+    ``SETTINGS_CACHE_MAX_STALENESS`` seconds the memo is checked against a
+    version token in the shared cache, which is bumped whenever the singleton
+    is saved, so every process picks up admin edits within that window.
+    The returned instance is shared; treat it as read-only.
+    """
+    label = model._meta.label_lower  # noqa: SLF001
+    now = time.monotonic()
+
+    entry = _memo.get(label)
+    if entry and now - entry.checked_at < settings.SETTINGS_CACHE_MAX_STALENESS:
+        return cast("T", entry.instance)
+
+    version = _get_shared_version(model)
+    if entry and entry.version == version:
+        entry.checked_at = now
+        return cast("T", entry.instance)
+
+    instance = model.get_solo()
+    with _lock:
+        _memo[label] = _Entry(instance=instance, version=version, checked_at=now)
+    logger.debug("Loaded %s into settings cache (version %s)", label, version)
+    return instance
+
+
+def invalidate_setting(model: type[SingletonModel]) -> None:
+    """Drop the memoised instance and bump the shared version for ``model``."""
+    with _lock:
+        _memo.pop(model._meta.label_lower, None)  # noqa: SLF001
+    cache.set(_version_key(model), uuid.uuid4().hex, timeout=None)
+
+
+def clear_settings_cache() -> None:
+    """Drop every in-process memo (shared versions are left untouched)."""
+    with _lock:
+        _memo.clear()
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings', '0008_firebaseadminsetting_service_account_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coreapisetting',
+            name='endpoint_rate_limits',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-endpoint overrides keyed by endpoint name, e.g. {"fetch_user_stories_by_username": {"rate": 2, "burst": 5}}'),
+        ),
+        migrations.AddField(
+            model_name='coreapisetting',
+            name='rate_limit_burst',
+            field=models.PositiveIntegerField(default=10, help_text='Default bucket size per endpoint (maximum burst of requests)'),
+        ),
+        migrations.AddField(
+            model_name='coreapisetting',
+            name='rate_limit_enabled',
+            field=models.BooleanField(default=False, help_text='Throttle Core API calls from all workers with a shared token bucket'),
+        ),
+        migrations.AddField(
+            model_name='coreapisetting',
+            name='rate_limit_max_wait',
+            field=models.FloatField(default=30.0, help_text='Seconds a blocking call waits for a token before giving up'),
+        ),
+        migrations.AddField(
+            model_name='coreapisetting',
+            name='rate_limit_per_second',
+            field=models.FloatField(default=5.0, help_text='Default sustained request rate per endpoint (requests/second)'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings', '0009_coreapisetting_rate_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APILogSetting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('success_sample_rate', models.FloatField(default=1.0, help_text='Fraction of successful calls that are logged (errors and timeouts are always logged)', validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)])),
+                ('max_body_bytes', models.PositiveIntegerField(default=0, help_text='Truncate request/response bodies larger than this many bytes, keeping a digest of the dropped remainder (0 keeps full bodies)')),
+                ('keep_request_headers', models.BooleanField(default=True)),
+                ('keep_request_params', models.BooleanField(default=True)),
+                ('keep_request_body', models.BooleanField(default=True)),
+                ('keep_response_headers', models.BooleanField(default=True)),
+                ('keep_response_body', models.BooleanField(default=True)),
+                ('endpoint_policies', models.JSONField(blank=True, default=dict, help_text='Per-endpoint overrides keyed by endpoint name, e.g. {"fetch_user_stories_by_username": {"sample_rate": 0.1, "max_body_bytes": 16384, "keep": ["request_params", "response_body"]}}')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'API Log Setting',
+            },
+        ),
+    ]
@@ -2,6 +2,8 @@ import json
 import logging
 
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator
+from django.core.validators import MinValueValidator
 from django.db import models
 from solo.models import SingletonModel
 
@@ -46,6 +48,31 @@ class CoreAPISetting(SingletonModel):
         help_text="Core API Token",
     )
 
+    rate_limit_enabled = models.BooleanField(
+        default=False,
+        help_text="Throttle Core API calls from all workers with a shared token bucket",
+    )
+    rate_limit_per_second = models.FloatField(
+        default=5.0,
+        help_text="Default sustained request rate per endpoint (requests/second)",
+    )
+    rate_limit_burst = models.PositiveIntegerField(
+        default=10,
+        help_text="Default bucket size per endpoint (maximum burst of requests)",
+    )
+    endpoint_rate_limits = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=(
+            "Per-endpoint overrides keyed by endpoint name, e.g. "
+            '{"fetch_user_stories_by_username": {"rate": 2, "burst": 5}}'
+        ),
+    )
+    rate_limit_max_wait = models.FloatField(
+        default=30.0,
+        help_text="Seconds a blocking call waits for a token before giving up",
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -56,6 +83,88 @@ class CoreAPISetting(SingletonModel):
         verbose_name = "Core API Setting"
 
 
+class APILogSetting(SingletonModel):
+    LOG_PARTS = (
+        "request_headers",
+        "request_params",
+        "request_body",
+        "response_headers",
+        "response_body",
+    )
+    ENDPOINT_POLICY_KEYS = ("sample_rate", "max_body_bytes", "keep")
+
+    success_sample_rate = models.FloatField(
+        default=1.0,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        help_text=(
+            "Fraction of successful calls that are logged (errors and timeouts "
+            "are always logged)"
+        ),
+    )
+    max_body_bytes = models.PositiveIntegerField(
+        default=0,
+        help_text=(
+            "Truncate request/response bodies larger than this many bytes, "
+            "keeping a digest of the dropped remainder (0 keeps full bodies)"
+        ),
+    )
+    keep_request_headers = models.BooleanField(default=True)
+    keep_request_params = models.BooleanField(default=True)
+    keep_request_body = models.BooleanField(default=True)
+    keep_response_headers = models.BooleanField(default=True)
+    keep_response_body = models.BooleanField(default=True)
+    endpoint_policies = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=(
+            "Per-endpoint overrides keyed by endpoint name, e.g. "
+            '{"fetch_user_stories_by_username": {"sample_rate": 0.1, '
+            '"max_body_bytes": 16384, "keep": ["request_params", '
+            '"response_body"]}}'
+        ),
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        super().clean()
+        if not isinstance(self.endpoint_policies, dict):
+            raise ValidationError(
+                {"endpoint_policies": "Must be an object keyed by endpoint name"},
+            )
+        for name, policy in self.endpoint_policies.items():
+            if not isinstance(policy, dict):
+                raise ValidationError(
+                    {"endpoint_policies": f"Policy for {name} must be an object"},
+                )
+            unknown = set(policy) - set(self.ENDPOINT_POLICY_KEYS)
+            if unknown:
+                raise ValidationError(
+                    {
+                        "endpoint_policies": (
+                            f"Unknown keys for {name}: {', '.join(sorted(unknown))}"
+                        ),
+                    },
+                )
+            unknown_parts = set(policy.get("keep", [])) - set(self.LOG_PARTS)
+            if unknown_parts:
+                raise ValidationError(
+                    {
+                        "endpoint_policies": (
+                            f"Unknown parts for {name}: "
+                            f"{', '.join(sorted(unknown_parts))}"
+                        ),
+                    },
+                )
+
+    def __str__(self):
+        return "API Log Settings"
+
+    class Meta:
+        verbose_name = "API Log Setting"
+
+
 class FirebaseAdminSetting(SingletonModel):
     service_account_file = models.FileField(
         upload_to="firebase/",
@@ -0,0 +1,27 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from solo.models import SingletonModel
+
+from .cache import invalidate_setting
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_singleton_setting(sender, **kwargs):
+    """Invalidate the settings cache whenever a singleton setting changes.
+
+    The version is bumped immediately for this process and again after commit,
+    so other processes cannot re-cache the pre-commit row.
+    """
+    if not isinstance(sender, type) or not issubclass(sender, SingletonModel):
+        return
+
+    invalidate_setting(sender)
+    transaction.on_commit(lambda: invalidate_setting(sender))
+    logger.info("Settings cache invalidated for %s", sender._meta.label)  # noqa: SLF001
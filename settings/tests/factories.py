@@ -1,6 +1,7 @@
 from factory import Faker
 from factory.django import DjangoModelFactory
 
+from settings.models import APILogSetting
 from settings.models import CoreAPISetting
 from settings.models import OpenAISetting
 
@@ -36,3 +37,8 @@ class CoreAPISettingFactory(DjangoModelFactory):
 
     class Meta:
         model = CoreAPISetting
+
+
+class APILogSettingFactory(DjangoModelFactory):
+    class Meta:
+        model = APILogSetting
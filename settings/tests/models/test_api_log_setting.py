@@ -0,0 +1,56 @@
+import pytest
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from settings.models import APILogSetting
+from settings.tests.factories import APILogSettingFactory
+
+
+class APILogSettingModelTest(TestCase):
+    def test_defaults_keep_everything(self):
+        """Test that the default policy logs every call in full."""
+        setting = APILogSettingFactory()
+
+        assert setting.success_sample_rate == 1.0
+        assert setting.max_body_bytes == 0
+        assert all(getattr(setting, f"keep_{part}") for part in setting.LOG_PARTS)
+        assert str(setting) == "API Log Settings"
+
+    def test_valid_endpoint_policies(self):
+        """Test that well-formed endpoint policies pass validation."""
+        setting = APILogSetting(
+            endpoint_policies={
+                "fetch_user_stories_by_username": {
+                    "sample_rate": 0.1,
+                    "max_body_bytes": 1024,
+                    "keep": ["response_body"],
+                },
+            },
+        )
+
+        setting.full_clean()
+
+    def test_unknown_endpoint_policy_keys_are_rejected(self):
+        """Test that typos in endpoint policy keys are reported."""
+        setting = APILogSetting(
+            endpoint_policies={"fetch_user_stories_by_username": {"rate": 0.1}},
+        )
+
+        with pytest.raises(ValidationError, match="Unknown keys"):
+            setting.full_clean()
+
+    def test_unknown_parts_are_rejected(self):
+        """Test that only known log parts can be kept."""
+        setting = APILogSetting(
+            endpoint_policies={"fetch_user_stories_by_username": {"keep": ["body"]}},
+        )
+
+        with pytest.raises(ValidationError, match="Unknown parts"):
+            setting.full_clean()
+
+    def test_sample_rate_is_bounded(self):
+        """Test that the sample rate must be between 0 and 1."""
+        setting = APILogSetting(success_sample_rate=1.5)
+
+        with pytest.raises(ValidationError):
+            setting.full_clean()
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.test import override_settings
+
+from settings.cache import clear_settings_cache
+from settings.cache import get_setting
+from settings.models import CoreAPISetting
+from settings.tests.factories import CoreAPISettingFactory
+
+
+@override_settings(SETTINGS_CACHE_MAX_STALENESS=60)
+class SettingsCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_settings_cache()
+
+    def tearDown(self):
+        clear_settings_cache()
+
+    def test_get_setting_returns_singleton(self):
+        """Test that the cached accessor returns the singleton row."""
+        setting = CoreAPISettingFactory()
+
+        cached = get_setting(CoreAPISetting)
+
+        assert cached.pk == setting.pk
+        assert cached.api_url == setting.api_url
+
+    def test_get_setting_does_not_query_database_when_memoised(self):
+        """Test that repeated reads are served from the in-process memo."""
+        CoreAPISettingFactory()
+        get_setting(CoreAPISetting)
+
+        with self.assertNumQueries(0):
+            get_setting(CoreAPISetting)
+            get_setting(CoreAPISetting)
+
+    def test_save_invalidates_cached_setting(self):
+        """Test that saving the singleton makes the new values visible."""
+        setting = CoreAPISettingFactory(api_url="https://old.example.com")
+        assert get_setting(CoreAPISetting).api_url == "https://old.example.com"
+
+        setting.api_url = "https://new.example.com"
+        setting.save()
+
+        assert get_setting(CoreAPISetting).api_url == "https://new.example.com"
+
+    @override_settings(SETTINGS_CACHE_MAX_STALENESS=0)
+    def test_other_process_picks_up_shared_version_bump(self):
+        """Test that a bumped shared version forces a reload of a stale memo."""
+        CoreAPISettingFactory(api_url="https://old.example.com")
+        get_setting(CoreAPISetting)
+
+        # Simulate an edit made by another process: the row changes without
+        # touching this process' memo, and only the shared version is bumped.
+        CoreAPISetting.objects.update(api_url="https://new.example.com")
+        cache.set("settings:version:settings.coreapisetting", "bumped", timeout=None)
+
+        assert get_setting(CoreAPISetting).api_url == "https://new.example.com"